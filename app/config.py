@@ -47,6 +47,78 @@ class Settings(BaseSettings):
     FHIR_SERVER_CLIENT_ID: str = ""
     FHIR_SERVER_CLIENT_SECRET: EncryptedField = EncryptedField("")
     FHIR_SERVER_TIMEOUT: int = 20
+    FHIR_SERVER_HTTP2: bool = True
+    FHIR_SERVER_MAX_CONNECTIONS: int = 100
+    FHIR_SERVER_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    FHIR_SERVER_KEEPALIVE_EXPIRY: float = 30.0
+    FHIR_PAGE_SIZE: int = 50
+    FHIR_PAGE_MIN_SIZE: int = 10
+    FHIR_PAGE_MAX_SIZE: int = 500
+    FHIR_PAGE_TARGET_BYTES: int = 1_000_000
+    FHIR_FETCH_ALL_MAX_ENTRIES: int = 5_000
+    FHIR_FETCH_ALL_MAX_BYTES: int = 20_000_000
+    FHIR_BATCH_MAX_ENTRIES: int = 50
+    FHIR_BATCH_CONCURRENCY: int = 4
+    PATIENT_SUMMARY_CONCURRENCY: int = 4
+    PATIENT_SUMMARY_TIMEOUT: float = 10.0
+    PATIENT_SUMMARY_MAX_ENTRIES: int = 20
+    OBSERVATION_ANALYSIS_MAX_ENTRIES: int = 50_000
+    OBSERVATION_ANALYSIS_MAX_BYTES: int = 200_000_000
+    OBSERVATION_ANALYSIS_MAX_POINTS: int = 100
+    FHIR_CACHE_ENABLED: bool = False
+    FHIR_CACHE_TTL: float = 60.0
+    FHIR_CACHE_MAX_ENTRIES: int = 1_000
+    FHIR_CACHE_MAX_BYTES: int = 64_000_000
+    FHIR_SINGLE_FLIGHT_ENABLED: bool = True
+    FHIR_LIMITER_ENABLED: bool = True
+    FHIR_LIMITER_INITIAL_LIMIT: int = 20
+    FHIR_LIMITER_MIN_LIMIT: int = 1
+    FHIR_LIMITER_MAX_LIMIT: int = 100
+    FHIR_LIMITER_MAX_QUEUE: int = 200
+    FHIR_LIMITER_QUEUE_TIMEOUT: float = 10.0
+    FHIR_RETRY_MAX_ATTEMPTS: int = 3
+    FHIR_RETRY_BASE_DELAY: float = 0.5
+    FHIR_RETRY_MAX_DELAY: float = 30.0
+    FHIR_CIRCUIT_FAILURE_THRESHOLD: int = 10
+    FHIR_CIRCUIT_RESET_TIMEOUT: float = 30.0
+    FHIR_SESSION_POOL_MAX_SIZE: int = 500
+    FHIR_SESSION_POOL_IDLE_TIMEOUT: float = 1800.0
+    FHIR_TOKEN_CACHE_ENABLED: bool = False
+    FHIR_TOKEN_CACHE_PATH: str = "~/.cache/fhir-mcp-server/tokens.bin"
+    FHIR_TOKEN_CACHE_LOCK_TIMEOUT: float = 10.0
+    FHIR_MIRROR_ENABLED: bool = False
+    FHIR_MIRROR_PATH: str = ":memory:"
+    FHIR_MIRROR_MAX_AGE: float = 300.0
+    FHIR_MIRROR_RESOURCE_TYPES: list[str] = [
+        "Patient",
+        "Condition",
+        "MedicationRequest",
+        "MedicationStatement",
+        "Observation",
+        "AllergyIntolerance",
+        "Immunization",
+        "Encounter",
+    ]
+    FHIR_MIRROR_SYNC_INTERVAL: float = 60.0
+    FHIR_MIRROR_SYNC_OVERLAP: float = 30.0
+    FHIR_MIRROR_SYNC_MAX_ENTRIES: int = 5000
+    FHIR_SUBSCRIPTIONS_ENABLED: bool = False
+    FHIR_SUBSCRIPTION_ENDPOINT: str = ""
+    FHIR_SUBSCRIPTION_RESOURCE_TYPES: list[str] = [
+        "Patient",
+        "Condition",
+        "MedicationRequest",
+        "MedicationStatement",
+        "Observation",
+        "AllergyIntolerance",
+        "Immunization",
+        "Encounter",
+    ]
+    FHIR_BULK_EXPORT_DIR: str = "~/.cache/fhir-mcp-server/bulk-export"
+    FHIR_BULK_EXPORT_CONCURRENCY: int = 4
+    FHIR_BULK_EXPORT_POLL_INTERVAL: float = 5.0
+    FHIR_BULK_EXPORT_TIMEOUT: float = 3600.0
+    FHIR_BULK_EXPORT_JOB_TTL: float = 86_400.0
 
     # LOINC
     LOINC_ENDPOINT: str = "https://loinc.regenstrief.org/searchapi/loincs"
@@ -55,6 +127,17 @@ class Settings(BaseSettings):
     LOINC_TIMEOUT: int = 60
     LOINC_MAX_CODES: int = 5
     LOINC_MAX_FETCH: int = 50
+    LOINC_MAX_RECORDS: int = 1_000
+    LOINC_PAGE_CONCURRENCY: int = 4
+    LOINC_BATCH_CONCURRENCY: int = 8
+    LOINC_MAX_CONNECTIONS: int = 10
+    LOINC_CACHE_ENABLED: bool = True
+    LOINC_CACHE_PATH: str = "~/.cache/fhir-mcp-server/loinc.sqlite"
+    LOINC_CACHE_TTL: float = 2_592_000.0
+    LOINC_CACHE_MAX_ENTRIES: int = 10_000
+    LOINC_INDEX_PATH: str = ""
+    LOINC_EMBEDDINGS_PATH: str = ""
+    LOINC_SEMANTIC_RANK_WEIGHT: float = 0.1
 
     PINECONE_API_KEY: EncryptedField = EncryptedField("")
     PINECONE_NAMESPACE: str = "fhir-papers"
@@ -68,6 +151,14 @@ class Settings(BaseSettings):
     EMBED_METRIC: str = "cosine"
     EMBED_BATCH_SIZE: int = 96
     TOP_K_RETRIEVAL_RESULTS: int = 10
+    DOCUMENT_MAX_BYTES: int = 250_000_000
+    DOCUMENT_CONNECT_TIMEOUT: float = 10.0
+    DOCUMENT_READ_TIMEOUT: float = 60.0
+    DOCUMENT_DOWNLOAD_TIMEOUT: float = 600.0
+    DOCUMENT_DOWNLOAD_DIR: str = ""
+    PDF_EXTRACT_WORKERS: int = 0
+    PDF_EXTRACT_PAGES_PER_TASK: int = 16
+    CHUNK_SEGMENT_CHARS: int = 50_000
 
     @field_validator(
         "LOINC_PASSWORD",
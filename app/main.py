@@ -1,28 +1,104 @@
+import asyncio
 import sys
 
 import uvicorn
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
 from app.config import settings
+from app.mcp.middleware import FhirSessionMiddleware
 from app.mcp.v1.mcp import mcp_router
+from app.services.fhir.fhir_client import fhir_client
+from app.services.fhir.models import AuthMethod
+from app.services.loinc_client import loinc_client
+from app.services.rag.pdf_extraction import shutdown_pool, start_pool
 
 print("SETUP -> Setting up the app", file=sys.stderr)
 
 mcp = FastMCP(settings.PROJECT_NAME)
 
 mcp.mount(mcp_router)
+mcp.add_middleware(FhirSessionMiddleware())
 
-# run: uv run fastmcp run app/main.py --transport http
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> JSONResponse:
+    """FHIR client and LOINC cache counters (hit rates etc.), available in http/https mode."""
+    loinc_cache = loinc_client.cache
+    return JSONResponse(
+        {
+            **fhir_client.get_metrics(),
+            "loinc_cache": loinc_cache.stats() if loinc_cache is not None else None,
+        },
+    )
+
+
+@mcp.custom_route("/fhir-notifications/{path:path}", methods=["POST", "PUT"])
+async def fhir_notification(request: Request) -> Response:
+    """Rest-hook endpoint of the FHIR Subscriptions keeping cached resources current."""
+    subscriptions = fhir_client.subscriptions
+    path = request.path_params["path"]
+    if subscriptions is None or not subscriptions.is_subscriber(path):
+        return Response(status_code=404)
+    if not subscriptions.is_authorized(request.headers.get("Authorization")):
+        return Response(status_code=401)
+    try:
+        await subscriptions.handle(path, await request.body())
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return Response(status_code=200)
+
+
+@mcp.custom_route("/oauth/callback", methods=["GET"])
+async def oauth_callback(request: Request) -> Response:
+    """OAUTH2_REDIRECT_URI target: gives the code to the MCP session that asked for sign-in."""
+    if fhir_client.auth_method != AuthMethod.AUTHORIZATION_CODE:
+        return Response(status_code=404)
+    code, state = request.query_params.get("code"), request.query_params.get("state")
+    if not code or not state:
+        error = request.query_params.get("error", "missing code or state")
+        return PlainTextResponse(f"Sign-in failed: {error}", status_code=400)
+    try:
+        fhir_client.set_authorization_code(code, state)
+    except ValueError as e:
+        return PlainTextResponse(f"Sign-in failed: {e}", status_code=400)
+    return PlainTextResponse("Signed in. You can return to your conversation.")
+
+
+async def shutdown() -> None:
+    """Release what the server holds on to: its FHIR Subscriptions (deleted on the server), the
+    mirror sync, connection pools, the mirror and the PDF extraction workers."""
+    await fhir_client.aclose()
+    await loinc_client.aclose()
+    shutdown_pool()
+
+
+async def serve() -> None:
+    """Serve on the configured transport until stopped, then shut down.
+
+    Not a FastMCP lifespan: over HTTP that runs once per MCP session, not once per process.
+    """
+    try:
+        if settings.TRANSPORT_MODE == "stdio":
+            await mcp.run_stdio_async()
+        elif settings.TRANSPORT_MODE == "http":
+            await mcp.run_http_async(transport="http")
+        elif settings.TRANSPORT_MODE == "https":
+            config = uvicorn.Config(
+                mcp.http_app(),
+                host=settings.MCP_SERVER_HOST,
+                port=settings.MCP_SERVER_PORT,
+                ssl_keyfile=settings.MCP_SERVER_SSL_KEYFILE,
+                ssl_certfile=settings.MCP_SERVER_SSL_CERTFILE,
+            )
+            await uvicorn.Server(config).serve()
+    finally:
+        await shutdown()
+
+
+# run: uv run fastmcp run app/main.py --transport http (without the shutdown cleanup)
 if __name__ == "__main__":
     # uv run python -m app.main
-    if settings.TRANSPORT_MODE in ["stdio", "http"]:
-        mcp.run(transport=settings.TRANSPORT_MODE)
-
-    elif settings.TRANSPORT_MODE == "https":
-        uvicorn.run(
-            mcp.http_app,
-            host=settings.MCP_SERVER_HOST,
-            port=settings.MCP_SERVER_PORT,
-            ssl_keyfile=settings.MCP_SERVER_SSL_KEYFILE,
-            ssl_certfile=settings.MCP_SERVER_SSL_CERTFILE,
-        )
+    start_pool()  # forks the PDF workers while this process has a single thread
+    asyncio.run(serve())
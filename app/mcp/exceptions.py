@@ -21,6 +21,8 @@ class APICustomError(Exception):
         self.message = message
         self.ctx = ctx
 
+        super().__init__(message)
+
 
 class APIErrorDetail(BaseModel):
     code: str | None = None
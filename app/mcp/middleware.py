@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+from app.services.fhir.token_pool import current_session
+
+
+class FhirSessionMiddleware(Middleware):
+    """Makes the MCP session id available to the FHIR client during a tool call.
+
+    The FHIR client uses it to pick the session's own OAuth token manager.
+    """
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        session_id = context.fastmcp_context.session_id if context.fastmcp_context else None
+        token = current_session.set(session_id)
+        try:
+            return await call_next(context)
+        finally:
+            current_session.reset(token)
@@ -0,0 +1,14 @@
+from fastmcp.tools.tool import ToolResult
+from mcp.types import TextContent
+
+from app.services.fhir.models import FhirRawResponse
+
+
+def raw_tool_result(response: FhirRawResponse) -> ToolResult:
+    """Tool result with the FHIR response as JSON text, emitted without a pydantic round-trip.
+
+    Tools returning it are registered with `output_schema=None`, so FastMCP does not also
+    build structured content from the (possibly multi-megabyte) response.
+    """
+    text = response.to_json().decode("utf-8", errors="replace")
+    return ToolResult(content=[TextContent(type="text", text=text)])
@@ -2,6 +2,9 @@ from fastmcp import FastMCP
 
 from app.mcp.v1.tools import (
     allergy_intolerance,
+    authorization,
+    batch,
+    bulk_export,
     condition,
     document_reference,
     encounter,
@@ -17,6 +20,8 @@ mcp_router = FastMCP(name="Main MCP")
 
 mcp_router.mount(patient.patient_router)
 mcp_router.mount(generic.generic_router)
+mcp_router.mount(batch.batch_router)
+mcp_router.mount(bulk_export.bulk_export_router)
 mcp_router.mount(observation.observation_router)
 mcp_router.mount(encounter.encounter_router)
 mcp_router.mount(condition.condition_router)
@@ -25,3 +30,4 @@ mcp_router.mount(immunization.immunization_router)
 mcp_router.mount(family_member_history.family_member_history_router)
 mcp_router.mount(medication.medication_router)
 mcp_router.mount(document_reference.document_reference_router)
+mcp_router.mount(authorization.authorization_router)
@@ -0,0 +1,50 @@
+"""
+This module contains the tools letting a user sign in to the FHIR server (authorization code flow).
+"""
+
+from fastmcp import FastMCP
+
+from app.schemas.fhir_schemas import FhirError
+from app.services.fhir.fhir_client import fhir_client
+
+authorization_router = FastMCP(name="Authorization MCP")
+
+
+@authorization_router.tool
+async def get_fhir_authorization_url() -> str | FhirError:
+    """
+    Gets the URL where the user signs in to the FHIR server for this conversation.
+    Use this tool when a FHIR request fails because no authorization code was set.
+
+    Rules:
+        - Give the URL to the user and ask them to open it and sign in.
+        - If the server's redirect page shows an authorization code, ask the user for it and
+          pass it to set_fhir_authorization_code; otherwise the sign-in completes by itself.
+
+    Returns:
+        The authorization URL
+    """
+
+    try:
+        return fhir_client.get_authorization_url()
+    except Exception as e:
+        return FhirError(error_message=str(e), method="GET", path="/oauth2/authorize", body=None)
+
+
+@authorization_router.tool
+async def set_fhir_authorization_code(code: str) -> str | FhirError:
+    """
+    Sets the authorization code the user received after signing in, for this conversation only.
+
+    Args:
+        code: The authorization code shown after signing in
+
+    Returns:
+        A confirmation message
+    """
+
+    try:
+        fhir_client.set_authorization_code(code)
+    except Exception as e:
+        return FhirError(error_message=str(e), method="POST", path="/oauth2/token", body=None)
+    return "Authorization code set; FHIR requests of this conversation now use it."
@@ -0,0 +1,58 @@
+"""
+This module contains the tool for sending many FHIR requests in a single round trip.
+"""
+
+from fastmcp import FastMCP
+
+from app.schemas.fhir_schemas import (
+    FhirBundleType,
+    FhirError,
+    FhirQueryRequest,
+    FhirQueryResponse,
+)
+from app.services.fhir.fhir_client import fhir_client
+
+batch_router = FastMCP(name="Batch Request MCP")
+
+
+@batch_router.tool
+async def request_batch(
+    requests: list[FhirQueryRequest],
+    bundle_type: FhirBundleType = "batch",
+) -> list[FhirQueryResponse | FhirError]:
+    """
+    Sends several HTTP requests to the FHIR server in one FHIR batch or transaction Bundle.
+    Use this tool instead of calling the resource tools many times when you already know
+    all the requests you need (e.g. reading ten resources, or creating related resources).
+
+    Rules:
+        - The same rules as for the individual resource tools apply to every request.
+        - Use bundle_type="transaction" only when the requests must succeed or fail together
+          (e.g. creating resources that reference each other).
+        - When deleting resources, ask the user for confirmation with details of the
+          resources and wait for the user's confirmation.
+        - Provide links to the app (not api) resources in the final response.
+
+    Args:
+        requests: List of requests, each with:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            path: Resource path (e.g., "/Patient/123", "/Condition?patient=Patient/123")
+            body: Optional JSON data for POST/PUT requests
+        bundle_type: "batch" (requests are independent) or "transaction" (all or nothing)
+
+    Returns:
+        One JSON response or error per request, in the same order as the requests
+    """
+
+    try:
+        return await fhir_client.batch(requests, bundle_type=bundle_type)
+    except Exception as e:
+        return [
+            FhirError(
+                error_message=str(e),
+                method=request.method,
+                path=request.path,
+                body=request.body,
+            )
+            for request in requests
+        ]
@@ -0,0 +1,88 @@
+"""
+This module contains the tools for exporting large populations with FHIR Bulk Data `$export`.
+"""
+
+from fastmcp import FastMCP
+
+from app.schemas.fhir_schemas import BulkExportLevel, BulkExportStatus, FhirError
+from app.services.fhir.bulk_export import bulk_export_service
+
+bulk_export_router = FastMCP(name="Bulk Export MCP")
+
+
+@bulk_export_router.tool
+async def start_bulk_export(
+    resource_types: list[str] | None = None,
+    level: BulkExportLevel = "patient",
+    group_id: str | None = None,
+    since: str | None = None,
+) -> BulkExportStatus | FhirError:
+    """
+    Starts a FHIR Bulk Data export, which the server prepares asynchronously, and returns
+    a job handle. The output is downloaded in the background to local NDJSON files.
+    Use this tool instead of paged searches when data for many patients is needed.
+
+    Rules:
+        - Check progress with get_bulk_export_status; do not start the same export twice.
+        - An export can take minutes on large servers; tell the user it is running.
+
+    Args:
+        resource_types: Resource types to export (e.g. ["Patient", "Observation"]);
+            all types if omitted
+        level: "patient" (all patients' data), "group" (members of a Group) or
+            "system" (everything on the server)
+        group_id: FHIR id of the Group, required when level is "group"
+        since: Only resources changed after this instant (e.g. "2025-01-01T00:00:00Z");
+            use the transaction_time of a previous export for an incremental one
+
+    Returns:
+        The job handle with its current progress
+    """
+
+    try:
+        return await bulk_export_service.start(resource_types, level, group_id, since)
+    except Exception as e:
+        return FhirError(
+            error_message=getattr(e, "message", None) or str(e),
+            method="GET",
+            path="/$export",
+            body=None,
+        )
+
+
+@bulk_export_router.tool
+async def get_bulk_export_status(job_id: str) -> BulkExportStatus | FhirError:
+    """
+    Gets the progress of a bulk export started with start_bulk_export.
+
+    Args:
+        job_id: The job_id returned by start_bulk_export
+
+    Returns:
+        The job state, the number of files and resources downloaded so far, the local
+        output directory and, if the job failed, the reason
+    """
+
+    try:
+        return bulk_export_service.get_status(job_id)
+    except Exception as e:
+        return FhirError(error_message=str(e), method="GET", path="/$export", body=None)
+
+
+@bulk_export_router.tool
+async def cancel_bulk_export(job_id: str) -> BulkExportStatus | FhirError:
+    """
+    Cancels a running bulk export and asks the server to discard it.
+    Files already downloaded are kept.
+
+    Args:
+        job_id: The job_id returned by start_bulk_export
+
+    Returns:
+        The final state of the job
+    """
+
+    try:
+        return await bulk_export_service.cancel(job_id)
+    except Exception as e:
+        return FhirError(error_message=str(e), method="DELETE", path="/$export", body=None)
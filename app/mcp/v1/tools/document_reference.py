@@ -1,8 +1,16 @@
+import asyncio
+
 from fastmcp import FastMCP
+from fastmcp.tools.tool import ToolResult
 
 from app.config import settings
+from app.mcp.utils import raw_tool_result
 from app.schemas.document_schemas import Document
-from app.schemas.fhir_schemas import FhirError, FhirQueryRequest, FhirQueryResponse
+from app.schemas.fhir_schemas import (
+    FhirError,
+    FhirProjection,
+    FhirQueryRequest,
+)
 from app.schemas.vector_store_schemas import (
     PineconeError,
     PineconeSearchResponse,
@@ -15,10 +23,12 @@ from app.services.rag.search_query_processor import search_query_processor
 document_reference_router = FastMCP(name="Document Reference Request MCP")
 
 
-@document_reference_router.tool
+@document_reference_router.tool(output_schema=None)
 async def request_document_reference_resource(
     request: FhirQueryRequest,
-) -> FhirQueryResponse | FhirError:
+    fetch_all: bool = False,
+    projection: FhirProjection | None = None,
+) -> ToolResult | FhirError:
     """
     Makes an HTTP request to the FHIR server.
     Use this tool to perform CRUD operations only on the FHIR DocumentReference resource.
@@ -34,6 +44,11 @@ async def request_document_reference_resource(
         method: HTTP method (GET, POST, PUT, DELETE)
         path: Resource path (e.g., "/DocumentReference", "/DocumentReference?patient=Patient/123")
         body: Optional JSON data for POST/PUT requests
+        fetch_all: For GET searches, follow all result pages and return them merged into
+            one Bundle in a single call (e.g. a patient's full history).
+        projection: For GET requests, return only some elements to keep the response small:
+            a preset ("clinical-minimal" or "no-narrative") and/or element paths
+            (e.g. ["status", "code.coding.code", "value[x]"]).
 
     Returns:
         JSON response from the FHIR server
@@ -41,10 +56,12 @@ async def request_document_reference_resource(
     """
 
     try:
-        response = fhir_client.request(
+        response = await fhir_client.request_raw(
             method=request.method,
             path=request.path,
             json=request.body,
+            fetch_all=fetch_all,
+            projection=projection,
         )
     except Exception as e:
         return FhirError(
@@ -54,7 +71,7 @@ async def request_document_reference_resource(
             body=request.body,
         )
 
-    return response
+    return raw_tool_result(response)
 
 
 @document_reference_router.tool
@@ -88,7 +105,8 @@ async def add_document_to_pinecone(document: Document) -> str | PineconeError:
         if not document.format:
             return PineconeError(error_message="Document format is required")
         if not pinecone_client.check_if_document_exists(fhir_document_id=document.fhir_document_id):
-            document_processor.process_document(document=document)
+            # extraction, chunking and embedding take a while; keep serving other tools
+            await asyncio.to_thread(document_processor.process_document, document=document)
             return "Document added to Pinecone index"
 
         return "Document already exists in Pinecone index"
@@ -1,15 +1,23 @@
 from fastmcp import FastMCP
-
-from app.schemas.fhir_schemas import FhirError, FhirQueryRequest, FhirQueryResponse
+from fastmcp.tools.tool import ToolResult
+
+from app.mcp.utils import raw_tool_result
+from app.schemas.fhir_schemas import (
+    FhirError,
+    FhirProjection,
+    FhirQueryRequest,
+)
 from app.services.fhir.fhir_client import fhir_client
 
 encounter_router = FastMCP(name="Encounter Request MCP")
 
 
-@encounter_router.tool
+@encounter_router.tool(output_schema=None)
 async def request_encounter_resource(
     request: FhirQueryRequest,
-) -> FhirQueryResponse | FhirError:
+    fetch_all: bool = False,
+    projection: FhirProjection | None = None,
+) -> ToolResult | FhirError:
     """
     Makes an HTTP request to the FHIR server.
     Use this tool to perform CRUD operations only on the FHIR Encounter resource.
@@ -24,16 +32,23 @@ async def request_encounter_resource(
         method: HTTP method (GET, POST, PUT, DELETE)
         path: Resource path (e.g., "/Encounter", "/Encounter?patient=Patient/123")
         body: Optional JSON data for POST/PUT requests)
+        fetch_all: For GET searches, follow all result pages and return them merged into
+            one Bundle in a single call (e.g. a patient's full history).
+        projection: For GET requests, return only some elements to keep the response small:
+            a preset ("clinical-minimal" or "no-narrative") and/or element paths
+            (e.g. ["status", "code.coding.code", "value[x]"]).
 
     Returns:
         JSON response from the FHIR server
     """
 
     try:
-        response = fhir_client.request(
+        response = await fhir_client.request_raw(
             method=request.method,
             path=request.path,
             json=request.body,
+            fetch_all=fetch_all,
+            projection=projection,
         )
     except Exception as e:
         return FhirError(
@@ -43,4 +58,4 @@ async def request_encounter_resource(
             body=request.body,
         )
 
-    return response
+    return raw_tool_result(response)
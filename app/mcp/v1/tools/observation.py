@@ -1,9 +1,20 @@
 from fastmcp import FastMCP
+from fastmcp.tools.tool import ToolResult
 
 from app.config import settings
-from app.schemas.fhir_schemas import FhirError, FhirQueryRequest, FhirQueryResponse
+from app.mcp.utils import raw_tool_result
+from app.schemas.fhir_schemas import (
+    FhirError,
+    FhirProjection,
+    FhirQueryRequest,
+    LoincObservationSearch,
+    ObservationAnalysis,
+)
 from app.services.fhir.fhir_client import fhir_client
+from app.services.fhir.loinc_observations import loinc_observation_service
+from app.services.fhir.observation_analysis import observation_analysis_service
 from app.services.loinc_client import loinc_client
+from app.services.loinc_semantic import loinc_semantic_matcher
 
 observation_router = FastMCP(name="Observation Request MCP")
 
@@ -21,6 +32,7 @@ async def get_loinc_codes(
     - Filters for STATUS="ACTIVE" codes only
     - Sorts by COMMON_TEST_RANK (lower rank = more commonly used)
     - Returns codes in popularity order (most common first)
+    - Pages through the search results until max_codes active codes are found
 
     Your job is to:
     1. Analyze returned codes for semantic relevance to the search query
@@ -28,7 +40,7 @@ async def get_loinc_codes(
     3. Select codes that best match the intended observation
 
     Strategy:
-    1. Start with default parameters (max_codes=5, max_fetch=50)
+    1. Start with default parameters (max_codes=5)
     2. Check if result contains "Error" key in first element
     3. If "Authentication failed" or "Authorization" error:
         - STOP using this tool immediately.
@@ -38,9 +50,8 @@ async def get_loinc_codes(
         - Ask the user if they want to use your knowledge to find a LOINC code and wait for
           the confirmation.
           Add warning that this may cause wrong results.
-    3. If "No active LOINC codes found in current fetch":
-        - Increase max_fetch progressively (50→100→200→RecordsFound).
-        - Keep trying until max_fetch >= RecordsFound or you find active codes.
+    3. If "No active LOINC codes found": all records searched were inactive; do not retry
+       with the same term, try alternative search terms instead.
     4. If "No LOINC codes found": Try alternative search terms or report failure.
     5. If you get codes but they don't semantically match your query:
         - Increase max_codes to see more options.
@@ -51,18 +62,18 @@ async def get_loinc_codes(
     - Don't automatically pick the first (most common) codes.
     - Prioritize semantic relevance: exact matches in COMPONENT > SHORTNAME > partial matches.
     - Balance popularity with relevance (very rare codes might not be clinically useful).
-    - Keep increasing max_fetch until you exhaust all available records (max_fetch >= RecordsFound).
     - Increase max_codes only when you need more options to find better semantic matches.
 
     Args:
         component_name: The name of the observation to get the LOINC code for (i.e. "glucose").
         max_codes: The maximum number of LOINC codes to return.
-        max_fetch: The maximum number of LOINC codes to fetch from the API.
+        max_fetch: LOINC records requested per result page; later pages are fetched
+            automatically, so there is no need to raise it.
     Returns:
         LOINC codes sorted by popularity - you must select the most semantically relevant ones.
     """
 
-    return loinc_client.get_common_loinc_codes(
+    return await loinc_client.get_common_loinc_codes(
         component_name,
         max_codes=max_codes,
         max_fetch=max_fetch,
@@ -70,9 +81,73 @@ async def get_loinc_codes(
 
 
 @observation_router.tool
+async def get_loinc_codes_batch(
+    component_names: list[str],
+    max_codes: int = settings.LOINC_MAX_CODES,
+    max_fetch: int = settings.LOINC_MAX_FETCH,
+) -> dict[str, list[dict]]:
+    """
+    Get the most relevant LOINC codes for many observation names in a single call.
+    Use this tool instead of calling get_loinc_codes once per name, e.g. to map the lab
+    names of an intake form or a lab report.
+
+    Each name is looked up exactly like get_loinc_codes (active codes only, most common
+    first) and the lookups run concurrently. Apply the rules of get_loinc_codes to the
+    result of each name: select the semantically relevant codes, and check the first
+    element of each result for an "Error" key. An authentication error affects all names.
+
+    Args:
+        component_names: The names of the observations (e.g. ["glucose", "creatinine"]).
+        max_codes: The maximum number of LOINC codes to return per name.
+        max_fetch: LOINC records requested per result page.
+    Returns:
+        The LOINC codes of each name, keyed by name, sorted by popularity.
+    """
+
+    return await loinc_client.get_common_loinc_codes_batch(
+        component_names,
+        max_codes=max_codes,
+        max_fetch=max_fetch,
+    )
+
+
+@observation_router.tool
+async def find_loinc_codes(
+    description: str,
+    max_codes: int = settings.LOINC_MAX_CODES,
+) -> list[dict]:
+    """
+    Find the LOINC codes whose meaning best matches a description of an observation,
+    ranked by relevance (semantic similarity of the long common name, blended with how
+    commonly the test is used). Prefer this tool over get_loinc_codes when it is available:
+    the first codes returned are the best matches, no further relevance filtering is needed.
+
+    Only active codes are returned. Each code has a "Similarity" (0-1) and the blended
+    "Score" it was ranked by. If the first element contains an "Error" key, semantic search
+    is not available; use get_loinc_codes instead.
+
+    Args:
+        description: What was measured, in words (e.g. "fasting blood sugar",
+            "LDL cholesterol in serum").
+        max_codes: The maximum number of LOINC codes to return.
+    Returns:
+        LOINC codes, most relevant first.
+    """
+
+    if loinc_semantic_matcher is None:
+        return [{"Error": "Semantic LOINC search is not configured, use get_loinc_codes"}]
+    try:
+        return await loinc_semantic_matcher.search(description, max_codes)
+    except Exception as e:
+        return [{"Error": f"Semantic LOINC search failed: {e}"}]
+
+
+@observation_router.tool(output_schema=None)
 async def request_observation_resource(
     request: FhirQueryRequest,
-) -> FhirQueryResponse | FhirError:
+    fetch_all: bool = False,
+    projection: FhirProjection | None = None,
+) -> ToolResult | FhirError:
     """
     Makes an HTTP request to the FHIR server.
     Use this tool to perform CRUD operations only on the FHIR Observation resource.
@@ -80,6 +155,8 @@ async def request_observation_resource(
     IMPORTANT: Before fetching observations that require LOINC codes:
     1. First use get_loinc_code() tool to find appropriate LOINC codes
     2. Then use this tool to fetch the observation with the LOINC code
+    To only read a patient's observations of a measurement, use search_observations_by_loinc
+    instead, which does both steps in one call.
 
     Rules:
         - When creating or updating an observation, use only the data explicitly provided
@@ -93,16 +170,23 @@ async def request_observation_resource(
         method: HTTP method (GET, POST, PUT, DELETE)
         path: Resource path (e.g., "/Observation?subject:Patient.name=Homer%20Simpson")
         body: Optional JSON data for POST/PUT requests)
+        fetch_all: For GET searches, follow all result pages and return them merged into
+            one Bundle in a single call (e.g. a patient's full history).
+        projection: For GET requests, return only some elements to keep the response small:
+            a preset ("clinical-minimal" or "no-narrative") and/or element paths
+            (e.g. ["status", "code.coding.code", "value[x]"]).
 
     Returns:
         JSON response from the FHIR server
     """
 
     try:
-        response = fhir_client.request(
+        response = await fhir_client.request_raw(
             method=request.method,
             path=request.path,
             json=request.body,
+            fetch_all=fetch_all,
+            projection=projection,
         )
     except Exception as e:
         return FhirError(
@@ -112,4 +196,126 @@ async def request_observation_resource(
             body=request.body,
         )
 
-    return response
+    return raw_tool_result(response)
+
+
+@observation_router.tool
+async def search_observations_by_loinc(
+    patient_id: str,
+    component_name: str | None = None,
+    loinc_codes: list[str] | None = None,
+    max_codes: int = settings.LOINC_MAX_CODES,
+    count: int = settings.FHIR_PAGE_SIZE,
+    fetch_all: bool = False,
+    projection: FhirProjection | None = None,
+) -> LoincObservationSearch | FhirError:
+    """
+    Finds a patient's observations of a measurement by name in a single call: resolves the
+    most common active LOINC codes for the name and searches the observations of all of
+    them at once, grouped by code.
+    Use this tool instead of get_loinc_codes followed by request_observation_resource.
+
+    Rules:
+        - Check "loinc_codes" for the codes that were searched; if none of them matches the
+          measurement the user meant, call again with better loinc_codes.
+        - If "more_available" is true, not all observations were returned; use
+          fetch_all=true if all of them are needed.
+        - Provide links to the app (not api) observation resources in the final response.
+
+    Args:
+        patient_id: The FHIR id of the patient (e.g., "123", not "Patient/123")
+        component_name: Name of the measurement (e.g. "hemoglobin A1c", "glucose")
+        loinc_codes: LOINC codes to search directly (e.g. ["4548-4", "17856-6"]); skips the
+            LOINC lookup, component_name is then ignored
+        max_codes: Maximum number of LOINC codes to search for
+        count: Observations per result page
+        fetch_all: Follow all result pages and return every matching observation
+        projection: Return only some elements to keep the response small: a preset
+            ("clinical-minimal" or "no-narrative") and/or element paths
+
+    Returns:
+        The LOINC codes searched, the matching observations grouped by LOINC code and the
+        total number of matches
+    """
+
+    try:
+        return await loinc_observation_service.search(
+            patient_id,
+            component_name=component_name,
+            loinc_codes=loinc_codes,
+            max_codes=max_codes,
+            count=count,
+            fetch_all=fetch_all,
+            projection=projection,
+        )
+    except Exception as e:
+        return FhirError(
+            error_message=getattr(e, "message", None) or str(e),
+            method="GET",
+            path=f"/Observation?patient={patient_id}",
+            body=None,
+        )
+
+
+@observation_router.tool
+async def analyze_observations(
+    patient_id: str,
+    code: str,
+    component_code: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    unit: str | None = None,
+    low: float | None = None,
+    high: float | None = None,
+    max_points: int = settings.OBSERVATION_ANALYSIS_MAX_POINTS,
+) -> ObservationAnalysis | FhirError:
+    """
+    Analyzes all numeric Observations of a patient for one code (e.g. every HbA1c result)
+    and returns statistics and a downsampled time series instead of the raw resources.
+    Use this tool for questions about trends, ranges or control over time; its output has
+    the same size for ten readings or ten thousand.
+
+    IMPORTANT: Use get_loinc_codes() first to find the LOINC code of the measurement.
+
+    Rules:
+        - Report the unit with every value; values were converted to "unit".
+        - If "skipped" or "truncated" is set, tell the user that not every reading was used.
+        - Out-of-range counts use each reading's own reference range unless low/high are given.
+
+    Args:
+        patient_id: The FHIR id of the patient (e.g., "123", not "Patient/123")
+        code: Observation code, as a token (e.g. "http://loinc.org|4548-4" or "4548-4")
+        component_code: Analyze the component with this code instead of the value
+            (e.g. "8480-6" for the systolic pressure of a blood pressure panel)
+        since: Only readings on or after this date (e.g. "2023-01-01")
+        until: Only readings on or before this date
+        unit: UCUM unit to convert the values to (e.g. "mg/dL"); the most frequent unit
+            if omitted
+        low: Lower bound of the normal range, in `unit`, overriding the recorded ranges
+        high: Upper bound of the normal range, in `unit`, overriding the recorded ranges
+        max_points: Number of points of the downsampled series (at least 3)
+
+    Returns:
+        Count, first/latest/min/max readings, mean, standard deviation, percentiles, the
+        trend per year, out-of-range counts and the downsampled series
+    """
+
+    try:
+        return await observation_analysis_service.analyze(
+            patient_id,
+            code,
+            component_code=component_code,
+            since=since,
+            until=until,
+            unit=unit,
+            low=low,
+            high=high,
+            max_points=max_points,
+        )
+    except Exception as e:
+        return FhirError(
+            error_message=getattr(e, "message", None) or str(e),
+            method="GET",
+            path=f"/Observation?patient={patient_id}&code={code}",
+            body=None,
+        )
@@ -1,15 +1,25 @@
 from fastmcp import FastMCP
+from fastmcp.tools.tool import ToolResult
 
-from app.schemas.fhir_schemas import FhirError, FhirQueryRequest, FhirQueryResponse
+from app.mcp.utils import raw_tool_result
+from app.schemas.fhir_schemas import (
+    FhirError,
+    FhirProjection,
+    FhirQueryRequest,
+    PatientSummary,
+)
 from app.services.fhir.fhir_client import fhir_client
+from app.services.fhir.patient_summary import patient_summary_service
 
 patient_router = FastMCP(name="Patient Request MCP")
 
 
-@patient_router.tool
+@patient_router.tool(output_schema=None)
 async def request_patient_resource(
     request: FhirQueryRequest,
-) -> FhirQueryResponse | FhirError:
+    fetch_all: bool = False,
+    projection: FhirProjection | None = None,
+) -> ToolResult | FhirError:
     """
     Makes an HTTP request to the FHIR server.
     Use this tool to perform CRUD operations only on the FHIR Patient resource.
@@ -24,16 +34,23 @@ async def request_patient_resource(
         method: HTTP method (GET, POST, PUT, DELETE)
         path: Resource path (e.g., "/Patient", "/Patient?name=John%20Doe")
         body: Optional JSON data for POST/PUT requests)
+        fetch_all: For GET searches, follow all result pages and return them merged into
+            one Bundle in a single call (e.g. a patient's full history).
+        projection: For GET requests, return only some elements to keep the response small:
+            a preset ("clinical-minimal" or "no-narrative") and/or element paths
+            (e.g. ["status", "code.coding.code", "value[x]"]).
 
     Returns:
         JSON response from the FHIR server
     """
 
     try:
-        response = fhir_client.request(
+        response = await fhir_client.request_raw(
             method=request.method,
             path=request.path,
             json=request.body,
+            fetch_all=fetch_all,
+            projection=projection,
         )
     except Exception as e:
         return FhirError(
@@ -43,4 +60,43 @@ async def request_patient_resource(
             body=request.body,
         )
 
-    return response
+    return raw_tool_result(response)
+
+
+@patient_router.tool
+async def get_patient_summary(
+    patient_id: str,
+    projection: FhirProjection | None = None,
+) -> PatientSummary | FhirError:
+    """
+    Gets an overview of a patient's record in a single call: the Patient resource and the
+    most recent conditions, medication requests, allergies, immunizations, encounters and
+    observations.
+    Use this tool first when the user asks a general question about a patient, instead of
+    calling the individual resource tools one after another.
+
+    Rules:
+        - Sections listed in "errors" could not be fetched; mention this to the user and,
+          if needed, retry them with the dedicated resource tool.
+        - Each section holds only the most recent resources; "total" tells how many exist.
+          Use the dedicated resource tool with fetch_all=true to get all of them.
+        - Provide links to the app (not api) patient resource in the final response.
+
+    Args:
+        patient_id: The FHIR id of the patient (e.g., "123", not "Patient/123")
+        projection: Elements to return for each resource; defaults to the "clinical-minimal"
+            preset. Use "no-narrative" to get whole resources without their narrative.
+
+    Returns:
+        The patient, resources grouped by section and per-section errors
+    """
+
+    try:
+        return await patient_summary_service.get_summary(patient_id, projection)
+    except Exception as e:
+        return FhirError(
+            error_message=str(e),
+            method="GET",
+            path=f"/Patient/{patient_id}",
+            body=None,
+        )
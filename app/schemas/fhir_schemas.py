@@ -3,6 +3,10 @@ from typing import Any, Literal
 from pydantic import BaseModel, Field
 
 type FhirMethod = Literal["GET", "POST", "PUT", "DELETE"]
+type FhirBundleType = Literal["batch", "transaction"]
+type FhirProjectionPreset = Literal["clinical-minimal", "no-narrative"]
+type BulkExportLevel = Literal["system", "patient", "group"]
+type BulkExportState = Literal["in_progress", "downloading", "completed", "failed", "cancelled"]
 
 
 class FhirQueryRequest(BaseModel):
@@ -17,13 +21,181 @@ class FhirQueryRequest(BaseModel):
     )
 
 
+class FhirPagingSummary(BaseModel):
+    """Summary of a search that was followed across all of its result pages."""
+
+    pages: int = Field(..., description="Number of pages fetched")
+    entries: int = Field(..., description="Number of entries returned")
+    bytes: int = Field(..., description="Total size of the fetched pages in bytes")
+    truncated: bool = Field(
+        ...,
+        description="True if more results exist but the entry or byte budget was exhausted",
+    )
+
+
+class FhirProjection(BaseModel):
+    """Subset of resource elements to return, to keep responses small."""
+
+    preset: FhirProjectionPreset | None = Field(
+        None,
+        description="Named projection: 'clinical-minimal' keeps the clinically relevant elements "
+        "of each resource type, 'no-narrative' only drops the narrative `text`",
+    )
+    elements: list[str] | None = Field(
+        None,
+        description="Element paths to keep for the requested resource type, "
+        "e.g. ['status', 'code.coding.code', 'value[x]']",
+    )
+
+
+class FhirProjectionReport(BaseModel):
+    """How a projection was applied and how much it saved."""
+
+    server_parameter: str | None = Field(
+        None,
+        description="Parameter pushed to the server, e.g. '_summary=data'",
+    )
+    received_bytes: int = Field(..., description="Size of the response received from the server")
+    returned_bytes: int = Field(..., description="Size of the response after local pruning")
+    saved_bytes: int = Field(..., description="Bytes removed by local pruning")
+
+
 class FhirQueryResponse(FhirQueryRequest):
     """Response from the FHIR resource with extra fields from the request."""
 
     response: Any = Field(..., description="The response from the FHIR resource")
+    paging: FhirPagingSummary | None = Field(
+        None,
+        description="Paging summary, present only when all result pages were fetched",
+    )
+    projection: FhirProjectionReport | None = Field(
+        None,
+        description="Projection summary, present only when a projection was requested",
+    )
 
 
 class FhirError(FhirQueryRequest):
     """Error response from the FHIR resource."""
 
     error_message: str
+
+
+class PatientSummarySection(BaseModel):
+    """Resources of one type belonging to the patient."""
+
+    total: int | None = Field(None, description="Total number of matches on the server")
+    resources: list[dict[str, Any]] = Field(
+        default_factory=list,
+        description="The most recent matching resources",
+    )
+
+
+class PatientSummary(BaseModel):
+    """Overview of a patient's record assembled from several concurrent searches."""
+
+    patient: dict[str, Any] | None = Field(None, description="The Patient resource")
+    sections: dict[str, PatientSummarySection] = Field(
+        default_factory=dict,
+        description="Clinical sections keyed by name (conditions, medications, ...)",
+    )
+    errors: dict[str, str] = Field(
+        default_factory=dict,
+        description="Sections that could not be fetched, with the reason",
+    )
+
+
+class ObservationPoint(BaseModel):
+    """One reading of an Observation time series."""
+
+    date: str = Field(..., description="Effective date of the reading, as recorded")
+    value: float = Field(..., description="Value in the unit of the analysis")
+
+
+class ObservationAnalysis(BaseModel):
+    """Statistics of all matching numeric Observations of a patient, oldest to newest."""
+
+    code: str = Field(..., description="The analyzed Observation code")
+    component_code: str | None = Field(None, description="The analyzed component, if any")
+    unit: str | None = Field(None, description="Unit all values were converted to")
+    count: int = Field(0, description="Number of readings analyzed")
+    skipped: int = Field(
+        0,
+        description="Readings left out: no numeric value or date, entered in error, or a unit "
+        "that cannot be converted",
+    )
+    other_units: list[str] = Field(
+        default_factory=list,
+        description="Units of the readings that could not be converted",
+    )
+    truncated: bool = Field(
+        False,
+        description="True if more readings exist than the analysis budget allowed to read",
+    )
+    first: ObservationPoint | None = Field(None, description="Oldest reading")
+    latest: ObservationPoint | None = Field(None, description="Most recent reading")
+    min: ObservationPoint | None = Field(None, description="Lowest reading")
+    max: ObservationPoint | None = Field(None, description="Highest reading")
+    mean: float | None = Field(None, description="Mean value")
+    std: float | None = Field(None, description="Standard deviation")
+    percentiles: dict[str, float] = Field(
+        default_factory=dict,
+        description="5th, 25th, 50th (median), 75th and 95th percentiles",
+    )
+    slope_per_year: float | None = Field(
+        None,
+        description="Least-squares trend of the value, in units per year",
+    )
+    with_range: int = Field(0, description="Readings with a reference range")
+    below_range: int = Field(0, description="Readings below their reference range")
+    above_range: int = Field(0, description="Readings above their reference range")
+    series: list[ObservationPoint] = Field(
+        default_factory=list,
+        description="The readings downsampled to a fixed number of points, keeping peaks",
+    )
+
+
+class LoincObservationSearch(BaseModel):
+    """Observations of a patient for a set of LOINC codes, fetched with one search."""
+
+    path: str = Field(..., description="The FHIR search that was sent")
+    loinc_codes: list[dict[str, Any]] = Field(
+        default_factory=list,
+        description="The LOINC codes searched for, most common first",
+    )
+    observations: dict[str, list[dict[str, Any]]] = Field(
+        default_factory=dict,
+        description="Matching Observations grouped by LOINC code",
+    )
+    total: int | None = Field(None, description="Total number of matches on the server")
+    more_available: bool = Field(
+        False,
+        description="True if more matches exist than were returned",
+    )
+    paging: FhirPagingSummary | None = Field(
+        None,
+        description="Paging summary, present only when all result pages were fetched",
+    )
+
+
+class BulkExportStatus(BaseModel):
+    """Handle and progress of a FHIR Bulk Data `$export` job."""
+
+    job_id: str = Field(..., description="Identifier to pass to the status and cancel tools")
+    state: BulkExportState = Field(..., description="Current stage of the job")
+    progress: str | None = Field(
+        None,
+        description="Progress reported by the server while it prepares the export",
+    )
+    transaction_time: str | None = Field(
+        None,
+        description="Server time the export reflects, usable as `since` for the next export",
+    )
+    output_dir: str = Field(..., description="Local directory receiving the NDJSON files")
+    files_total: int = Field(0, description="Number of files listed in the export manifest")
+    files_done: int = Field(0, description="Number of files downloaded completely")
+    resources: dict[str, int] = Field(
+        default_factory=dict,
+        description="Resources downloaded so far, by resource type",
+    )
+    bytes_downloaded: int = Field(0, description="Size of the downloaded NDJSON data")
+    error: str | None = Field(None, description="Reason the job failed")
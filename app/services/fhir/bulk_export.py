@@ -0,0 +1,326 @@
+"""FHIR Bulk Data `$export`: kick-off, status polling and streaming download of the output."""
+
+import asyncio
+import re
+import time
+import uuid
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import urljoin
+
+import httpx
+
+from app.config import settings
+from app.schemas.fhir_schemas import BulkExportLevel, BulkExportStatus
+from app.services.fhir.fhir_client import FhirClient, fhir_client
+from app.services.fhir.resilience import RETRYABLE_STATUS_CODES, backoff_delay
+from app.services.fhir.utils import parse_retry_after
+
+# Upper bound of the wait between two status polls, whatever `Retry-After` asks for.
+MAX_POLL_INTERVAL = 60.0
+# Downloaded lines are written to disk, in a worker thread, once this many bytes are buffered.
+WRITE_BUFFER_SIZE = 1 << 20
+# Manifest resource types end up in file names, so anything but a plain type name is refused.
+RESOURCE_TYPE_PATTERN = re.compile(r"[A-Za-z]+")
+
+
+async def iter_ndjson_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into NDJSON lines, skipping blank ones.
+
+    Only the current partial line is buffered, so files of any size stream in constant memory.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            line = bytes(buffer[start:end]).strip()
+            if line:
+                yield line
+            start = end + 1
+        del buffer[:start]
+    if line := bytes(buffer).strip():
+        yield line
+
+
+@dataclass
+class BulkExportJob:
+    """Server-side handle and local progress of one export."""
+
+    status: BulkExportStatus
+    directory: Path
+    status_url: str | None = None
+    task: asyncio.Task | None = None
+    finished_at: float | None = None
+
+
+class BulkExportService:
+    """Runs Bulk Data exports in the background and stores their output as NDJSON files.
+
+    The kick-off returns immediately with a job handle. A background task then polls the
+    status endpoint (honouring `Retry-After`) and, once the manifest is ready, downloads the
+    output files concurrently. Each file is streamed line by line to
+    `<directory>/<job id>/<type>-<n>.ndjson`, so no file is ever held in memory; disk writes
+    run in a worker thread. Finished jobs are forgotten `job_ttl` seconds later.
+
+    Args:
+        client (FhirClient): Client used for the export requests
+        directory (Path): Parent directory of the job directories
+        concurrency (int): Maximum number of files downloaded at once
+        poll_interval (float): Seconds between status polls when the server gives no hint
+        timeout (float): Deadline of a whole export in seconds
+        job_ttl (float): Seconds a finished job stays queryable
+    """
+
+    def __init__(
+        self,
+        client: FhirClient,
+        directory: Path,
+        concurrency: int = settings.FHIR_BULK_EXPORT_CONCURRENCY,
+        poll_interval: float = settings.FHIR_BULK_EXPORT_POLL_INTERVAL,
+        timeout: float = settings.FHIR_BULK_EXPORT_TIMEOUT,
+        job_ttl: float = settings.FHIR_BULK_EXPORT_JOB_TTL,
+    ):
+        self.client = client
+        self.directory = directory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.job_ttl = job_ttl
+        self.jobs: dict[str, BulkExportJob] = {}
+
+    def _kickoff_url(self, level: BulkExportLevel, group_id: str | None) -> str:
+        if level == "system":
+            return f"{self.client.base_url}/$export"
+        if level == "patient":
+            return f"{self.client.base_url}/Patient/$export"
+        if not group_id:
+            raise ValueError("group_id is required for a group export")
+        return f"{self.client.base_url}/Group/{group_id}/$export"
+
+    async def start(
+        self,
+        resource_types: list[str] | None = None,
+        level: BulkExportLevel = "patient",
+        group_id: str | None = None,
+        since: str | None = None,
+    ) -> BulkExportStatus:
+        """Kick off an export and return its handle; the job then runs in the background."""
+        url = self._kickoff_url(level, group_id)
+        params = {}
+        if resource_types:
+            params["_type"] = ",".join(resource_types)
+        if since:
+            params["_since"] = since
+
+        # a retried kick-off could start a second export on the server
+        response = await self.client.send(
+            "GET",
+            url,
+            retry=False,
+            params=params,
+            headers={"Accept": "application/fhir+json", "Prefer": "respond-async"},
+        )
+        content_location = response.headers.get("Content-Location")
+        if response.status_code != httpx.codes.ACCEPTED or not content_location:
+            raise ValueError(
+                f"FHIR server did not accept the export (HTTP {response.status_code}).",
+            )
+
+        self._evict_finished()
+        job_id = uuid.uuid4().hex
+        directory = self.directory / job_id
+        job = BulkExportJob(
+            status=BulkExportStatus(job_id=job_id, state="in_progress", output_dir=str(directory)),
+            directory=directory,
+            status_url=urljoin(str(response.url), content_location),
+        )
+        self.jobs[job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job.status.model_copy(deep=True)
+
+    def _evict_finished(self) -> None:
+        """Forget jobs that finished more than `job_ttl` seconds ago."""
+        expired = time.monotonic() - self.job_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and job.finished_at < expired:
+                del self.jobs[job_id]
+
+    def _get_job(self, job_id: str) -> BulkExportJob:
+        self._evict_finished()
+        if job_id not in self.jobs:
+            raise ValueError(f"Unknown bulk export job: {job_id}")
+        return self.jobs[job_id]
+
+    def get_status(self, job_id: str) -> BulkExportStatus:
+        return self._get_job(job_id).status.model_copy(deep=True)
+
+    async def cancel(self, job_id: str) -> BulkExportStatus:
+        """Stop the job and ask the server to discard the export if it is still running."""
+        job = self._get_job(job_id)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await job.task
+            if job.status_url is not None:
+                with suppress(Exception):
+                    await self.client.send("DELETE", job.status_url)
+        return job.status.model_copy(deep=True)
+
+    async def _run(self, job: BulkExportJob) -> None:
+        try:
+            async with asyncio.timeout(self.timeout):
+                manifest = await self._poll(job)
+                await self._download_all(job, manifest)
+        except asyncio.CancelledError:
+            job.status.state = "cancelled"
+            raise
+        except Exception as e:
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]  # the download that failed first
+            job.status.state = "failed"
+            job.status.error = (
+                f"Timed out after {self.timeout} s"
+                if isinstance(e, TimeoutError)
+                else getattr(e, "message", None) or str(e) or type(e).__name__
+            )
+        else:
+            job.status.state = "completed"
+        finally:
+            job.finished_at = time.monotonic()
+
+    async def _poll(self, job: BulkExportJob) -> dict:
+        assert job.status_url is not None
+        while True:
+            response = await self.client.send(
+                "GET",
+                job.status_url,
+                headers={"Accept": "application/json"},
+            )
+            if response.status_code != httpx.codes.ACCEPTED:
+                return response.json()
+
+            job.status.progress = response.headers.get("X-Progress")
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            await asyncio.sleep(min(retry_after or self.poll_interval, MAX_POLL_INTERVAL))
+
+    async def _download_all(self, job: BulkExportJob, manifest: dict) -> None:
+        job.status.state = "downloading"
+        job.status.transaction_time = manifest.get("transactionTime")
+        for item in manifest.get("output", []):
+            resource_type = item.get("type")
+            if not isinstance(resource_type, str) or not RESOURCE_TYPE_PATTERN.fullmatch(
+                resource_type,
+            ):
+                raise ValueError(
+                    f"Export manifest lists an invalid resource type: {resource_type!r}",
+                )
+        files = [
+            (f"{item['type']}-{index}", item["type"], item["url"])
+            for index, item in enumerate(manifest.get("output", []))
+        ]
+        # errors are OperationOutcome NDJSON files, kept next to the output
+        files += [
+            (f"error-{index}", "OperationOutcome", item["url"])
+            for index, item in enumerate(manifest.get("error", []))
+        ]
+        job.status.files_total = len(files)
+        await asyncio.to_thread(job.directory.mkdir, parents=True, exist_ok=True)
+
+        authenticated = manifest.get("requiresAccessToken", True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with asyncio.TaskGroup() as group:
+            for name, resource_type, url in files:
+                group.create_task(
+                    self._download(job, semaphore, name, resource_type, url, authenticated),
+                )
+
+    async def _download(
+        self,
+        job: BulkExportJob,
+        semaphore: asyncio.Semaphore,
+        name: str,
+        resource_type: str,
+        url: str,
+        authenticated: bool,
+    ) -> None:
+        """Download one file, starting over on transient failures."""
+        path = job.directory / f"{name}.ndjson"
+        async with semaphore:
+            attempt = 0
+            while True:
+                try:
+                    await self._download_file(job, path, resource_type, url, authenticated)
+                    break
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    retryable = (
+                        not isinstance(e, httpx.HTTPStatusError)
+                        or e.response.status_code in RETRYABLE_STATUS_CODES
+                    )
+                    if not retryable or attempt >= settings.FHIR_RETRY_MAX_ATTEMPTS - 1:
+                        raise
+                await asyncio.sleep(
+                    backoff_delay(
+                        attempt,
+                        settings.FHIR_RETRY_BASE_DELAY,
+                        settings.FHIR_RETRY_MAX_DELAY,
+                    ),
+                )
+                attempt += 1
+        job.status.files_done += 1
+
+    async def _download_file(
+        self,
+        job: BulkExportJob,
+        path: Path,
+        resource_type: str,
+        url: str,
+        authenticated: bool,
+    ) -> None:
+        resources = 0
+        size = 0
+        buffer = bytearray()
+        try:
+            file = await asyncio.to_thread(_open_output, path)
+            try:
+                async with self.client.stream(
+                    url,
+                    authenticated=authenticated,
+                    headers={"Accept": "application/fhir+ndjson"},
+                ) as response:
+                    async for line in iter_ndjson_lines(response.aiter_bytes()):
+                        buffer += line
+                        buffer += b"\n"
+                        resources += 1
+                        size += len(line) + 1
+                        _count(job, resource_type, 1, len(line) + 1)
+                        if len(buffer) >= WRITE_BUFFER_SIZE:
+                            await asyncio.to_thread(file.write, buffer)
+                            buffer.clear()
+                if buffer:
+                    await asyncio.to_thread(file.write, buffer)
+            finally:
+                await asyncio.to_thread(file.close)
+        except BaseException:
+            # a retry starts the file over, so take back what this attempt counted
+            _count(job, resource_type, -resources, -size)
+            raise
+
+
+def _open_output(path: Path) -> BinaryIO:
+    return path.open("wb")
+
+
+def _count(job: BulkExportJob, resource_type: str, resources: int, size: int) -> None:
+    counts = job.status.resources
+    counts[resource_type] = counts.get(resource_type, 0) + resources
+    job.status.bytes_downloaded += size
+
+
+bulk_export_service = BulkExportService(
+    fhir_client,
+    Path(settings.FHIR_BULK_EXPORT_DIR).expanduser(),
+)
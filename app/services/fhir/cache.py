@@ -0,0 +1,152 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class CacheEntry:
+    """A cached FHIR GET response.
+
+    Attributes:
+        content: Raw JSON body, decoded only by the callers that need objects
+        resource_type: FHIR resource type the URL targets (used for invalidation)
+        resource_id: Resource id for reads, None for searches
+        etag: `ETag` validator returned by the server
+        last_modified: `Last-Modified` validator returned by the server
+        stored_at: Monotonic time of the last (re)validation
+    """
+
+    content: bytes
+    resource_type: str | None
+    resource_id: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.monotonic() - self.stored_at < ttl
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers used to revalidate a stale entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def is_cacheable(response: httpx.Response) -> bool:
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    return response.status_code == httpx.codes.OK and "no-store" not in cache_control
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of FHIR GET responses with TTL-based revalidation.
+
+    Entries are keyed by auth principal and normalized URL. Within the TTL an entry is served
+    directly; after it, the entry is revalidated with `If-None-Match`/`If-Modified-Since`.
+    Writes invalidate every entry of the affected resource type, and entries of unknown type
+    (e.g. operations). Every invalidation starts a new `generation`: a response fetched before
+    it may predate the write, so `put` drops it.
+
+    Args:
+        ttl (float): Seconds an entry is served without revalidation
+        max_entries (int): Maximum number of entries
+        max_bytes (int): Maximum total size of cached bodies
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._keys_by_type: dict[str | None, set[tuple[str, str]]] = {}
+        self._bytes = 0
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    def get(self, key: tuple[str, str]) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple[str, str], entry: CacheEntry, generation: int) -> None:
+        """Store an entry fetched when the cache was at `generation`."""
+        if generation != self.generation:
+            self.stale_fills += 1
+            return
+        if entry.size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self._keys_by_type.setdefault(entry.resource_type, set()).add(key)
+        self._bytes += entry.size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def touch(self, key: tuple[str, str]) -> None:
+        """Mark an entry as revalidated (the server answered 304 Not Modified)."""
+        if entry := self._entries.get(key):
+            entry.stored_at = time.monotonic()
+
+    def invalidate(self, resource_type: str | None, resource_id: str | None = None) -> None:
+        """Drop entries affected by a write to `resource_type` (or everything if unknown).
+
+        Any write can change search results of its type, so all searches of the type are
+        dropped together with reads of the written resource, and with entries of unknown type.
+        """
+        self.generation += 1
+        if resource_type is None:
+            self.invalidations += len(self._entries)
+            self.clear()
+            return
+
+        keys = [*self._keys_by_type.get(resource_type, ()), *self._keys_by_type.get(None, ())]
+        for key in keys:
+            entry = self._entries[key]
+            if resource_id is None or entry.resource_id in (None, resource_id):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_type.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_fills": self.stale_fills,
+        }
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        keys = self._keys_by_type.get(entry.resource_type)
+        if keys is not None:
+            keys.discard(key)
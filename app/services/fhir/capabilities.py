@@ -0,0 +1,42 @@
+"""What the FHIR server says it supports, read from its CapabilityStatement (`/metadata`)."""
+
+
+class ServerCapabilities:
+    """Search parameters and interactions the server advertises, overall and per resource type.
+
+    Args:
+        statement: The CapabilityStatement resource
+    """
+
+    def __init__(self, statement: dict):
+        self.common_search_params: set[str] = set()
+        self.search_params: dict[str, set[str]] = {}
+        self.interactions: dict[str, set[str]] = {}
+
+        for rest in statement.get("rest", []):
+            if rest.get("mode", "server") != "server":
+                continue
+            self.common_search_params.update(
+                param["name"] for param in rest.get("searchParam", []) if "name" in param
+            )
+            for resource in rest.get("resource", []):
+                names = self.search_params.setdefault(resource.get("type", ""), set())
+                names.update(
+                    param["name"] for param in resource.get("searchParam", []) if "name" in param
+                )
+                self.interactions.setdefault(resource.get("type", ""), set()).update(
+                    interaction["code"]
+                    for interaction in resource.get("interaction", [])
+                    if "code" in interaction
+                )
+
+    def supports_search_param(self, resource_type: str | None, name: str) -> bool:
+        """True if `name` is declared for all resources or for `resource_type`."""
+        return name in self.common_search_params or name in self.search_params.get(
+            resource_type or "",
+            set(),
+        )
+
+    def supports_interaction(self, resource_type: str, code: str) -> bool:
+        """True if the server declares interaction `code` (e.g. "history-type") for the type."""
+        return code in self.interactions.get(resource_type, set())
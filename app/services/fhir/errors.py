@@ -1,7 +1,9 @@
+import httpx
 from fastapi import status
-from requests.exceptions import HTTPError, RequestException
 
 from app.mcp.exceptions import APICustomError
+from app.services.fhir.resilience import rate_limit_error
+from app.services.fhir.utils import parse_retry_after
 
 
 def handle_requests_exceptions(e: Exception, url: str) -> None:
@@ -16,15 +18,18 @@ def handle_requests_exceptions(e: Exception, url: str) -> None:
         APICustomError: A standardized API error with appropriate status and message
     """
 
-    if isinstance(e, HTTPError):
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+        retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+        raise rate_limit_error("FHIR server rate limit exceeded.", retry_after)
+    if isinstance(e, httpx.HTTPStatusError):
         response = e.response
         raise APICustomError(
-            status=response.status_code if response else status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status=response.status_code,
             code="fhir_api_error",
-            message=f"FHIR API returned HTTP error: {response.text if response else str(e)}",
+            message=f"FHIR API returned HTTP error: {response.text}",
             ctx={"url": url},
         )
-    if isinstance(e, RequestException):
+    if isinstance(e, httpx.RequestError):
         raise APICustomError(
             status=status.HTTP_502_BAD_GATEWAY,
             code="fhir_connection_error",
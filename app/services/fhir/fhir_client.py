@@ -1,12 +1,62 @@
-import requests
-from requests.exceptions import RequestException
+import asyncio
+import secrets
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
 
 from app.config import settings
-from app.schemas.fhir_schemas import FhirMethod, FhirQueryResponse
+from app.mcp.exceptions import APICustomError
+from app.schemas.fhir_schemas import (
+    FhirBundleType,
+    FhirError,
+    FhirMethod,
+    FhirPagingSummary,
+    FhirProjection,
+    FhirProjectionReport,
+    FhirQueryRequest,
+    FhirQueryResponse,
+)
+from app.services.fhir.cache import CacheEntry, ResponseCache, is_cacheable
+from app.services.fhir.capabilities import ServerCapabilities
 from app.services.fhir.errors import handle_requests_exceptions
-from app.services.fhir.models import AuthMethod
+from app.services.fhir.mirror import ResourceMirror
+from app.services.fhir.mirror_sync import MirrorSync
+from app.services.fhir.models import AuthMethod, FhirPage, FhirRawResponse
+from app.services.fhir.oauth_client import OAuthClient
+from app.services.fhir.projection import Projector
+from app.services.fhir.resilience import (
+    IDEMPOTENT_METHODS,
+    RETRYABLE_STATUS_CODES,
+    AdaptiveLimiter,
+    CircuitBreaker,
+    HostGuard,
+    backoff_delay,
+)
+from app.services.fhir.single_flight import SingleFlight
+from app.services.fhir.subscriptions import SubscriptionManager
+from app.services.fhir.token_cache import TokenCache
 from app.services.fhir.token_manager import AccessTokenManager
+from app.services.fhir.token_pool import TokenManagerPool, current_session
+from app.services.fhir.utils import (
+    adapt_page_size,
+    build_bundle_entry,
+    get_next_link,
+    get_query_param,
+    get_status_code,
+    normalize_url,
+    parse_resource_path,
+    parse_retry_after,
+    set_query_param,
+    token_principal,
+)
 from app.utils.auth import BearerAuth
+from app.utils.http_utils import build_async_client
 
 
 class FhirClient:
@@ -15,40 +65,378 @@ class FhirClient:
 
     This class provides a wrapper around the FHIR API, handling authentication
     and request management. It uses the AccessTokenManager to maintain valid tokens
-    for API requests.
+    for API requests; with the authorization code flow every MCP session gets its own
+    manager, so one process can serve many users.
+
+    All requests go through a single pooled `httpx.AsyncClient`, so connections are kept
+    alive and (with HTTP/2) multiplexed between concurrent tool calls instead of being
+    opened for every request.
+
+    GET responses are kept in a `ResponseCache` (when enabled) and revalidated with
+    `If-None-Match`/`If-Modified-Since`; writes invalidate the affected resource type.
+    Identical GETs issued at the same time are coalesced into a single upstream request.
+    With the mirror enabled, reads and patient-scoped searches it can answer completely never
+    reach the server while its copy is fresh.
 
     Attributes:
         base_url (str): The base URL of the FHIR API server
-        token_manager (AccessTokenManager): Manages token lifecycle
+        token_managers (TokenManagerPool): Token managers keyed by MCP session
+        token_cache (TokenCache | None): Encrypted on-disk token cache, None if disabled
+        cache (ResponseCache | None): GET response cache, None if disabled
+        single_flight (SingleFlight | None): Coalesces concurrent identical GETs
+        mirror (ResourceMirror | None): Local SQLite copy answering repeat reads and searches
+        mirror_sync (MirrorSync | None): Applies server-side changes to the mirror in the background
+        subscriptions (SubscriptionManager | None): Rest-hook Subscriptions pushing changes
     """
 
     def __init__(self):
         """Initialize the FHIR server client with settings configuration."""
         self.base_url = settings.FHIR_SERVER_HOST + settings.FHIR_BASE_URL
+        self._http_client: httpx.AsyncClient | None = None
+        self._capabilities: ServerCapabilities | None = None
+        self._guards: dict[str, HostGuard] = {}
+        self.cache = (
+            ResponseCache(
+                ttl=settings.FHIR_CACHE_TTL,
+                max_entries=settings.FHIR_CACHE_MAX_ENTRIES,
+                max_bytes=settings.FHIR_CACHE_MAX_BYTES,
+            )
+            if settings.FHIR_CACHE_ENABLED
+            else None
+        )
+        self.single_flight = SingleFlight() if settings.FHIR_SINGLE_FLIGHT_ENABLED else None
+        self.mirror = (
+            ResourceMirror(
+                str(Path(settings.FHIR_MIRROR_PATH).expanduser()),
+                self.base_url,
+                max_age=settings.FHIR_MIRROR_MAX_AGE,
+                resource_types=settings.FHIR_MIRROR_RESOURCE_TYPES,
+            )
+            if settings.FHIR_MIRROR_ENABLED
+            else None
+        )
 
         # Determine authentication method from settings
-        auth_method = AuthMethod(settings.OAUTH2_AUTH_METHOD)
-
-        # Initialize token manager based on authentication method
-        if auth_method == AuthMethod.CLIENT_CREDENTIALS:
-            self.token_manager = AccessTokenManager(
-                settings.FHIR_SERVER_CLIENT_ID,
-                settings.FHIR_SERVER_CLIENT_SECRET,
-                settings.FHIR_SERVER_HOST,
-                auth_method=auth_method,
+        self.auth_method = AuthMethod(settings.OAUTH2_AUTH_METHOD)
+        if self.auth_method not in (AuthMethod.CLIENT_CREDENTIALS, AuthMethod.AUTHORIZATION_CODE):
+            raise ValueError(f"Unsupported authentication method: {self.auth_method}")
+
+        # One token manager per MCP session for the authorization code flow (a single shared
+        # one for client credentials); all of them share the token endpoint connection pool.
+        self.oauth_client = OAuthClient(settings.FHIR_SERVER_HOST)
+        self.token_cache = self._create_token_cache()
+        # the background sync acts without a session, so only as the client itself
+        self.mirror_sync = (
+            MirrorSync(
+                self,
+                self.mirror,
+                interval=settings.FHIR_MIRROR_SYNC_INTERVAL,
+                overlap=settings.FHIR_MIRROR_SYNC_OVERLAP,
+                max_entries=settings.FHIR_MIRROR_SYNC_MAX_ENTRIES,
             )
-        elif auth_method == AuthMethod.AUTHORIZATION_CODE:
-            self.token_manager = AccessTokenManager(
-                settings.FHIR_SERVER_CLIENT_ID,
-                settings.FHIR_SERVER_CLIENT_SECRET,
-                settings.FHIR_SERVER_HOST,
-                auth_method=auth_method,
-                redirect_uri=settings.OAUTH2_REDIRECT_URI,
+            if self.mirror is not None
+            and settings.FHIR_MIRROR_SYNC_INTERVAL > 0
+            and self.auth_method == AuthMethod.CLIENT_CREDENTIALS
+            else None
+        )
+        # notifications need the HTTP transport to be received
+        self.subscriptions = (
+            SubscriptionManager(
+                self,
+                settings.FHIR_SUBSCRIPTION_ENDPOINT,
+                settings.FHIR_SUBSCRIPTION_RESOURCE_TYPES,
             )
-        else:
-            raise ValueError(f"Unsupported authentication method: {auth_method}")
+            if settings.FHIR_SUBSCRIPTIONS_ENABLED
+            and settings.FHIR_SUBSCRIPTION_ENDPOINT
+            and settings.TRANSPORT_MODE != "stdio"
+            and (self.cache is not None or self.mirror is not None)
+            and self.auth_method == AuthMethod.CLIENT_CREDENTIALS
+            else None
+        )
+        self.token_managers = TokenManagerPool(
+            self._create_token_manager,
+            max_size=settings.FHIR_SESSION_POOL_MAX_SIZE,
+            idle_timeout=settings.FHIR_SESSION_POOL_IDLE_TIMEOUT,
+        )
+        # OAuth `state` of each authorization URL handed out -> MCP session that asked for it
+        self._pending_authorizations: OrderedDict[str, str | None] = OrderedDict()
+
+    def _create_token_manager(self) -> AccessTokenManager:
+        return AccessTokenManager(
+            settings.FHIR_SERVER_CLIENT_ID,
+            settings.FHIR_SERVER_CLIENT_SECRET,
+            settings.FHIR_SERVER_HOST,
+            auth_method=self.auth_method,
+            redirect_uri=(
+                settings.OAUTH2_REDIRECT_URI
+                if self.auth_method == AuthMethod.AUTHORIZATION_CODE
+                else None
+            ),
+            oauth_client=self.oauth_client,
+            token_cache=self.token_cache,
+        )
+
+    def _create_token_cache(self) -> TokenCache | None:
+        """On-disk token cache for client credentials; needs a master key to encrypt it."""
+        cipher = settings.FERNET_DECRYPTOR
+        if (
+            not settings.FHIR_TOKEN_CACHE_ENABLED
+            or self.auth_method != AuthMethod.CLIENT_CREDENTIALS
+            or cipher is None
+            or not cipher.has_master_key
+        ):
+            return None
+        return TokenCache(
+            Path(settings.FHIR_TOKEN_CACHE_PATH).expanduser(),
+            cipher,
+            lock_timeout=settings.FHIR_TOKEN_CACHE_LOCK_TIMEOUT,
+        )
+
+    @property
+    def token_manager(self) -> AccessTokenManager:
+        """Token manager of the MCP session being served (shared for client credentials)."""
+        if self.auth_method == AuthMethod.CLIENT_CREDENTIALS:
+            return self.token_managers.get(None)
+        return self.token_managers.get(current_session.get())
+
+    async def principal(self) -> str:
+        """Identity cached responses and mirrored resources are scoped to.
+
+        Client credentials always act as the same client, so the key survives token refreshes;
+        with the authorization code flow each token stands for the user it was issued to.
+        """
+        if self.auth_method == AuthMethod.CLIENT_CREDENTIALS:
+            return token_principal(f"{settings.FHIR_SERVER_HOST}\0{settings.FHIR_SERVER_CLIENT_ID}")
+        return token_principal(await self.token_manager.get_token())
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared connection pool, created lazily inside the running event loop."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = build_async_client(
+                timeout=settings.FHIR_SERVER_TIMEOUT,
+                max_connections=settings.FHIR_SERVER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.FHIR_SERVER_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.FHIR_SERVER_KEEPALIVE_EXPIRY,
+                http2=settings.FHIR_SERVER_HTTP2,
+            )
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Stop watching for changes, delete the Subscriptions and close the pooled connections
+        and the mirror."""
+        if self.mirror_sync is not None:
+            await self.mirror_sync.stop()
+        if self.subscriptions is not None:
+            await self.subscriptions.stop()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        await self.oauth_client.aclose()
+        if self.mirror is not None:
+            self.mirror.close()
+
+    def _guard(self, url: str) -> HostGuard | None:
+        """The limiter and circuit breaker of the host `url` points to (None if disabled)."""
+        if not settings.FHIR_LIMITER_ENABLED:
+            return None
+        host = urlsplit(url).netloc.lower()
+        if host not in self._guards:
+            self._guards[host] = HostGuard(
+                AdaptiveLimiter(
+                    initial_limit=settings.FHIR_LIMITER_INITIAL_LIMIT,
+                    min_limit=settings.FHIR_LIMITER_MIN_LIMIT,
+                    max_limit=settings.FHIR_LIMITER_MAX_LIMIT,
+                    max_queue=settings.FHIR_LIMITER_MAX_QUEUE,
+                    queue_timeout=settings.FHIR_LIMITER_QUEUE_TIMEOUT,
+                ),
+                CircuitBreaker(
+                    failure_threshold=settings.FHIR_CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=settings.FHIR_CIRCUIT_RESET_TIMEOUT,
+                ),
+            )
+        return self._guards[host]
+
+    async def _send_once(self, method: FhirMethod, url: str, **kwargs) -> httpx.Response:
+        auth = BearerAuth(await self.token_manager.get_token())
+        return await self.http_client.request(method, url, auth=auth, **kwargs)
+
+    async def _send(
+        self,
+        method: FhirMethod,
+        url: str,
+        retry: bool = True,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request through the host's limiter, retrying transient failures.
+
+        429/502/503/504 responses and transport errors of idempotent methods are retried with
+        jittered exponential backoff, added on top of the wait requested by `Retry-After`.
+        `retry=False` sends a request that has side effects despite its method exactly once.
+        """
+        guard = self._guard(url)
+        if guard is None:
+            response = await self._send_once(method, url, **kwargs)
+            # 304 is the expected answer to a conditional revalidation, not an error
+            if response.status_code != httpx.codes.NOT_MODIFIED:
+                response.raise_for_status()
+            return response
+
+        retry = retry and method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            last_attempt = not retry or attempt >= settings.FHIR_RETRY_MAX_ATTEMPTS - 1
+            delay = backoff_delay(
+                attempt,
+                settings.FHIR_RETRY_BASE_DELAY,
+                settings.FHIR_RETRY_MAX_DELAY,
+            )
+
+            async with guard.slot():
+                try:
+                    response = await self._send_once(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    guard.record_failure(overload=isinstance(e, httpx.TimeoutException))
+                    if last_attempt:
+                        raise
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        if response.status_code >= 500:
+                            guard.record_failure(overload=False)
+                        else:
+                            guard.record_success()
+                        if response.status_code != httpx.codes.NOT_MODIFIED:
+                            response.raise_for_status()
+                        return response
+
+                    if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+                        guard.record_throttled()
+                    else:
+                        guard.record_failure(overload=True)
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after is not None:
+                        guard.limiter.pause(min(retry_after, settings.FHIR_RETRY_MAX_DELAY))
+                        delay += retry_after  # keep the jitter so retries do not arrive at once
+                    if last_attempt or delay > settings.FHIR_RETRY_MAX_DELAY:
+                        response.raise_for_status()
+
+            attempt += 1
+            guard.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _get(self, url: str) -> bytes:
+        """GET `url` through the response cache; returns the raw JSON body.
+
+        Concurrent identical GETs (same principal and normalized URL) share one upstream call.
+        """
+        key = (await self.principal(), normalize_url(url))
 
-    def request(self, method: FhirMethod, path: str, **kwargs) -> FhirQueryResponse:
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None and entry.is_fresh(self.cache.ttl):
+                self.cache.hits += 1
+                return entry.content
+
+        if self.single_flight is None:
+            return await self._fetch(url, key)
+        return await self.single_flight.do(("GET", *key), lambda: self._fetch(url, key))
+
+    async def _fetch(self, url: str, key: tuple[str, str]) -> bytes:
+        if self.cache is None:
+            response = await self._send("GET", url)
+            return response.content
+
+        generation = self.cache.generation
+        entry = self.cache.get(key)
+        response = await self._send("GET", url, headers=entry.validators() if entry else None)
+        if entry is not None and response.status_code == httpx.codes.NOT_MODIFIED:
+            self.cache.revalidations += 1
+            self.cache.touch(key)
+            return entry.content
+
+        self.cache.misses += 1
+        if is_cacheable(response):
+            path = url.removeprefix(self.base_url)
+            resource_type, resource_id = parse_resource_path(path)
+            if "$" in urlsplit(path).path:
+                resource_type = None  # operations may return resources of any type
+            self.cache.put(
+                key,
+                CacheEntry(
+                    content=response.content,
+                    resource_type=resource_type,
+                    resource_id=resource_id,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                ),
+                generation,
+            )
+            self._watch_changes()
+        return response.content
+
+    def invalidate_cache(self, path: str) -> None:
+        """Drop cached responses affected by a write to `path` (relative to the base URL)."""
+        if self.cache is not None:
+            self.cache.invalidate(*parse_resource_path(path))
+        if self.mirror is not None:
+            self.mirror.submit(self.mirror.invalidate, *parse_resource_path(path))
+
+    def _record_in_mirror(
+        self,
+        principal: str | None,
+        path: str,
+        data: Any,
+        complete: bool,
+        generation: int,
+    ) -> None:
+        """Store a server response in the mirror, in the background.
+
+        `generation` is the mirror's generation of the type when the request was started.
+        """
+        if self.mirror is not None and principal is not None:
+            self.mirror.submit(self.mirror.record, principal, path, data, complete, generation)
+            self._watch_changes()
+
+    def _watch_changes(self) -> None:
+        """Start keeping stored responses current, once there are some."""
+        if self.mirror_sync is not None:
+            self.mirror_sync.start()
+        if self.subscriptions is not None:
+            self.subscriptions.start()
+
+    async def get_capabilities(self) -> ServerCapabilities | None:
+        """The server's CapabilityStatement, fetched once; None if it cannot be read."""
+        if self._capabilities is None:
+            try:
+                statement = orjson.loads(await self._get(f"{self.base_url}/metadata"))
+            except (httpx.HTTPError, ValueError):
+                return None
+            self._capabilities = ServerCapabilities(statement)
+        return self._capabilities
+
+    async def _push_projection(self, url: str, projector: Projector) -> tuple[str, str | None]:
+        """Add the projection's `_elements`/`_summary` parameter if the server supports it."""
+        parameter = projector.server_parameter()
+        if parameter is None or any(get_query_param(url, p) for p in ("_elements", "_summary")):
+            return url, None
+
+        capabilities = await self.get_capabilities()
+        name, value = parameter
+        if capabilities is None or not capabilities.supports_search_param(
+            projector.resource_type,
+            name,
+        ):
+            return url, None
+        return set_query_param(url, name, value), f"{name}={value}"
+
+    async def request(
+        self,
+        method: FhirMethod,
+        path: str,
+        fetch_all: bool = False,
+        projection: FhirProjection | None = None,
+        **kwargs,
+    ) -> FhirQueryResponse:
         """
         Performs a token-authenticated HTTP request to the FHIR API.
 
@@ -57,52 +445,454 @@ class FhirClient:
         Args:
             method (str): HTTP method.
             path (str): API endpoint path.
-            **kwargs: Extra arguments for `requests.request`.
+            fetch_all (bool): For GET searches, follow `next` links and merge all result
+                pages into one Bundle (bounded by the fetch-all budget settings).
+            projection (FhirProjection | None): For GET requests, the elements to keep.
+                Pushed to the server as `_elements`/`_summary` when its CapabilityStatement
+                allows it, and always applied locally.
+            **kwargs: Extra arguments for `httpx.AsyncClient.request`.
 
         Returns:
             Any: JSON-decoded response.
         """
 
-        auth = BearerAuth(self.token_manager.get_token())
+        raw = await self.request_raw(method, path, fetch_all, projection, **kwargs)
+        try:
+            data = raw.json()
+        except ValueError as e:
+            handle_requests_exceptions(e, raw.path)
+            raise e
+
+        return FhirQueryResponse(
+            method=method,
+            path=raw.path,
+            body=raw.body,
+            response=data,
+            paging=raw.paging,
+            projection=raw.projection,
+        )
+
+    async def request_raw(
+        self,
+        method: FhirMethod,
+        path: str,
+        fetch_all: bool = False,
+        projection: FhirProjection | None = None,
+        **kwargs,
+    ) -> FhirRawResponse:
+        """
+        Same as `request`, but keeps the response as the raw JSON body.
+
+        Plain reads, searches and writes are passed through without being decoded; the body is
+        only parsed when paging or a projection needs to look inside it.
+
+        Returns:
+            FhirRawResponse: The response body with request details.
+        """
+
         url = f"{self.base_url}{path}"
+        body = kwargs.get("json", {})
 
         try:
-            response = requests.request(
-                method,
-                url,
-                auth=auth,
-                timeout=settings.FHIR_SERVER_TIMEOUT,
-                **kwargs,
-            )
-            response.raise_for_status()
-            return FhirQueryResponse(
-                method=method,
-                path=url,
-                body=kwargs.get("json", {}),
-                response=response.json(),
-            )
-        except (RequestException, ValueError) as e:
+            if method == "GET" and (fetch_all or not body):
+                principal = None
+                mirrored = None
+                generation = 0
+                if self.mirror is not None:
+                    principal = await self.principal()
+                    generation = self.mirror.generation(parse_resource_path(path)[0])
+                    mirrored = await self.mirror.run(self.mirror.lookup, principal, path)
+
+                projector = None
+                server_parameter = None
+                if projection is not None:
+                    projector = Projector(projection, parse_resource_path(path)[0])
+                    if mirrored is None:
+                        url, server_parameter = await self._push_projection(url, projector)
+
+                paging = None
+                if mirrored is not None:
+                    content, entries = mirrored
+                    if fetch_all:
+                        paging = FhirPagingSummary(
+                            pages=1,
+                            entries=entries,
+                            bytes=len(content),
+                            truncated=False,
+                        )
+                    if projector is None:
+                        # stored by the mirror as serialized JSON
+                        return FhirRawResponse(method, url, body, content, paging, validated=True)
+                    data, size = orjson.loads(content), len(content)
+                elif not fetch_all and projector is None:
+                    content = await self._get(url)
+                    self._record_in_mirror(principal, path, content, True, generation)
+                    return FhirRawResponse(method, url, body, content)
+                else:
+                    if fetch_all:
+                        data, size, paging = await self._request_all_pages(url)
+                    else:
+                        content = await self._get(url)
+                        data, size = orjson.loads(content), len(content)
+                    if server_parameter is None:  # the server returned whole resources
+                        complete = paging is None or not paging.truncated
+                        self._record_in_mirror(principal, path, data, complete, generation)
+
+                report = None
+                if projector is not None:
+                    data = projector.apply(data)
+                content = orjson.dumps(data)
+                if projector is not None:
+                    report = FhirProjectionReport(
+                        server_parameter=server_parameter,
+                        received_bytes=size,
+                        returned_bytes=len(content),
+                        saved_bytes=max(size - len(content), 0),
+                    )
+
+                return FhirRawResponse(
+                    method,
+                    url,
+                    body,
+                    content,
+                    paging,
+                    report,
+                    validated=True,
+                )
+
+            try:
+                response = await self._send(method, url, **kwargs)
+            finally:
+                if method != "GET":
+                    self.invalidate_cache(path)
+            return FhirRawResponse(method, url, body, response.content)
+        except (httpx.HTTPError, ValueError) as e:
+            handle_requests_exceptions(e, url)
+            raise e
+
+    async def send(
+        self,
+        method: FhirMethod,
+        url: str,
+        retry: bool = True,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Sends an authenticated request to an absolute URL and returns the whole response.
+
+        For FHIR operations whose headers matter (e.g. the bulk export kick-off and status
+        endpoints). Goes through the same limiter and retries as `request`, but bypasses the
+        response cache. `retry=False` disables the retries, e.g. for a GET that starts a job.
+        """
+        try:
+            return await self._send(method, url, retry=retry, **kwargs)
+        except httpx.HTTPError as e:
             handle_requests_exceptions(e, url)
             raise e
 
+    @asynccontextmanager
+    async def stream(
+        self,
+        url: str,
+        authenticated: bool = True,
+        **kwargs,
+    ) -> AsyncGenerator[httpx.Response]:
+        """
+        Streams the body of a GET response (e.g. a bulk export NDJSON file) without buffering.
+
+        The request holds a slot of the host's limiter until the body has been consumed.
+        Error responses are raised as `httpx.HTTPStatusError`; they are not retried here.
+
+        Args:
+            url (str): Absolute URL of the file.
+            authenticated (bool): Send the access token (not wanted for pre-signed URLs).
+            **kwargs: Extra arguments for `httpx.AsyncClient.stream`.
+        """
+        if authenticated:
+            kwargs["auth"] = BearerAuth(await self.token_manager.get_token())
+        guard = self._guard(url)
+        async with guard.slot() if guard is not None else nullcontext():
+            try:
+                async with self.http_client.stream("GET", url, **kwargs) as response:
+                    if guard is not None:
+                        if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+                            guard.record_throttled()
+                        elif response.status_code >= 500:
+                            guard.record_failure(
+                                overload=response.status_code in RETRYABLE_STATUS_CODES,
+                            )
+                        else:
+                            guard.record_success()
+                    if response.is_error:
+                        await response.aread()
+                        response.raise_for_status()
+                    yield response
+            except httpx.TransportError as e:
+                if guard is not None:
+                    guard.record_failure(overload=isinstance(e, httpx.TimeoutException))
+                raise
+
+    async def _fetch_page(self, url: str) -> tuple[dict, int]:
+        content = await self._get(url)
+        return orjson.loads(content), len(content)
+
+    async def _iter_pages(
+        self,
+        url: str,
+        max_entries: int,
+        max_bytes: int,
+    ) -> AsyncIterator[FhirPage]:
+        if get_query_param(url, "_count") is None:
+            url = set_query_param(url, "_count", str(min(settings.FHIR_PAGE_SIZE, max_entries)))
+
+        next_page: asyncio.Task | None = asyncio.create_task(self._fetch_page(url))
+        entries_left, bytes_left = max_entries, max_bytes
+
+        try:
+            while next_page is not None:
+                bundle, size = await next_page
+                next_page = None
+
+                entries = bundle.get("entry", []) if bundle.get("resourceType") == "Bundle" else []
+                truncated = len(entries) > entries_left
+                entries = entries[:entries_left]
+                entries_left -= len(entries)
+                bytes_left -= size
+
+                # Start downloading the next page before handing this one to the caller,
+                # so network waits overlap with whatever the consumer does with the entries.
+                if next_url := get_next_link(bundle):
+                    if entries_left > 0 and bytes_left > 0:
+                        page_size = adapt_page_size(
+                            page_bytes=size,
+                            page_entries=len(entries),
+                            target_bytes=settings.FHIR_PAGE_TARGET_BYTES,
+                            min_size=settings.FHIR_PAGE_MIN_SIZE,
+                            max_size=settings.FHIR_PAGE_MAX_SIZE,
+                        )
+                        next_url = set_query_param(
+                            next_url,
+                            "_count",
+                            str(min(page_size, entries_left)),
+                        )
+                        next_page = asyncio.create_task(self._fetch_page(next_url))
+                    else:
+                        truncated = True
+
+                yield FhirPage(bundle=bundle, entries=entries, size=size, truncated=truncated)
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def iter_pages(
+        self,
+        path: str,
+        max_entries: int = settings.FHIR_FETCH_ALL_MAX_ENTRIES,
+        max_bytes: int = settings.FHIR_FETCH_ALL_MAX_BYTES,
+    ) -> AsyncIterator[FhirPage]:
+        """
+        Streams the pages of a FHIR search, prefetching the next page in the background.
+
+        The `_count` of follow-up pages adapts to the observed entry size so that each page
+        weighs roughly `FHIR_PAGE_TARGET_BYTES`.
+
+        Args:
+            path (str): Search path, e.g. "/Observation?patient=123".
+            max_entries (int): Stop after this many entries.
+            max_bytes (int): Stop once this many bytes have been downloaded.
+
+        Yields:
+            FhirPage: Decoded page with the entries that fit within the budget.
+        """
+
+        url = f"{self.base_url}{path}"
+
+        try:
+            async for page in self._iter_pages(url, max_entries, max_bytes):
+                yield page
+        except (httpx.HTTPError, ValueError) as e:
+            handle_requests_exceptions(e, url)
+            raise e
+
+    async def _request_all_pages(self, url: str) -> tuple[Any, int, FhirPagingSummary | None]:
+        """Merge all result pages into one Bundle; returns it, its size and a paging summary."""
+        first_bundle: dict | None = None
+        entries: list[dict] = []
+        pages = size = 0
+        truncated = False
+
+        async for page in self._iter_pages(
+            url,
+            settings.FHIR_FETCH_ALL_MAX_ENTRIES,
+            settings.FHIR_FETCH_ALL_MAX_BYTES,
+        ):
+            first_bundle = first_bundle or page.bundle
+            entries.extend(page.entries)
+            pages += 1
+            size += page.size
+            truncated = page.truncated
+
+        assert first_bundle is not None
+        if first_bundle.get("resourceType") != "Bundle":
+            return first_bundle, size, None
+
+        bundle = {key: value for key, value in first_bundle.items() if key != "link"}
+        bundle["entry"] = entries
+        paging = FhirPagingSummary(
+            pages=pages,
+            entries=len(entries),
+            bytes=size,
+            truncated=truncated,
+        )
+        return bundle, size, paging
+
+    async def batch(
+        self,
+        requests: list[FhirQueryRequest],
+        bundle_type: FhirBundleType = "batch",
+    ) -> list[FhirQueryResponse | FhirError]:
+        """
+        Sends many requests as FHIR `batch` or `transaction` Bundles.
+
+        Batches larger than `FHIR_BATCH_MAX_ENTRIES` are split into several Bundles which are
+        sent concurrently. Transactions are never split, as that would break their atomicity.
+
+        Args:
+            requests (list[FhirQueryRequest]): Requests to execute.
+            bundle_type (str): "batch" (independent entries) or "transaction" (all or nothing).
+
+        Returns:
+            list: One `FhirQueryResponse` or `FhirError` per request, in request order.
+        """
+
+        if bundle_type == "transaction":
+            chunks = [requests]
+        else:
+            size = settings.FHIR_BATCH_MAX_ENTRIES
+            chunks = [requests[i : i + size] for i in range(0, len(requests), size)]
+
+        semaphore = asyncio.Semaphore(settings.FHIR_BATCH_CONCURRENCY)
+
+        async def send_chunk(chunk: list[FhirQueryRequest]) -> list[FhirQueryResponse | FhirError]:
+            async with semaphore:
+                return await self._send_bundle(chunk, bundle_type)
+
+        results = await asyncio.gather(*(send_chunk(chunk) for chunk in chunks if chunk))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def _send_bundle(
+        self,
+        requests: list[FhirQueryRequest],
+        bundle_type: FhirBundleType,
+    ) -> list[FhirQueryResponse | FhirError]:
+        bundle = {
+            "resourceType": "Bundle",
+            "type": bundle_type,
+            "entry": [build_bundle_entry(r.method, r.path, r.body) for r in requests],
+        }
+
+        try:
+            response = await self._send("POST", self.base_url, json=bundle)
+            entries = orjson.loads(response.content).get("entry", [])
+        except (httpx.HTTPError, ValueError, APICustomError) as e:
+            reason = e.response.text if isinstance(e, httpx.HTTPStatusError) else str(e)
+            return [
+                FhirError(
+                    error_message=f"FHIR {bundle_type} request failed: {reason}",
+                    method=r.method,
+                    path=r.path,
+                    body=r.body,
+                )
+                for r in requests
+            ]
+        finally:
+            for request in requests:
+                if request.method != "GET":
+                    self.invalidate_cache(request.path)
+
+        results: list[FhirQueryResponse | FhirError] = []
+        for index, request in enumerate(requests):
+            entry = entries[index] if index < len(entries) else {}
+            entry_response = entry.get("response", {})
+            status_code = get_status_code(entry_response.get("status", ""))
+
+            if status_code is not None and status_code < 400:
+                results.append(
+                    FhirQueryResponse(
+                        method=request.method,
+                        path=f"{self.base_url}{request.path}",
+                        body=request.body,
+                        response=entry.get("resource", entry_response),
+                    ),
+                )
+            else:
+                results.append(
+                    FhirError(
+                        error_message="FHIR API returned HTTP error: "
+                        f"{entry_response.get('status', 'missing entry response')} "
+                        f"{entry_response.get('outcome', '')}".strip(),
+                        method=request.method,
+                        path=request.path,
+                        body=request.body,
+                    ),
+                )
+        return results
+
+    def get_metrics(self) -> dict[str, Any]:
+        """Counters of the client's internal components, for sizing and monitoring."""
+        return {
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "single_flight": (
+                self.single_flight.stats() if self.single_flight is not None else None
+            ),
+            "hosts": {host: guard.stats() for host, guard in self._guards.items()},
+            "token": self.token_managers.stats(),
+            "mirror": self.mirror.stats() if self.mirror is not None else None,
+            "mirror_sync": self.mirror_sync.stats() if self.mirror_sync is not None else None,
+            "subscriptions": (
+                self.subscriptions.stats() if self.subscriptions is not None else None
+            ),
+        }
+
     def get_authorization_url(self, state: str | None = None) -> str:
-        """Get the authorization URL for authorization code flow.
+        """Get the authorization URL for authorization code flow (current MCP session).
+
+        The `state` is remembered with the session, so the code the OAuth2 server sends back
+        with it is given to that session's token manager.
 
         Args:
-            state (str, optional): A random string to prevent CSRF attacks
+            state (str, optional): A random string to prevent CSRF attacks, generated if omitted
 
         Returns:
             str: The authorization URL
         """
-        return self.token_manager.get_authorization_url(state)
+        state = state or secrets.token_urlsafe(16)
+        url = self.token_manager.get_authorization_url(state)
+        self._pending_authorizations[state] = current_session.get()
+        while len(self._pending_authorizations) > settings.FHIR_SESSION_POOL_MAX_SIZE:
+            self._pending_authorizations.popitem(last=False)
+        return url
 
-    def set_authorization_code(self, code: str) -> None:
-        """Set the authorization code for token exchange.
+    def set_authorization_code(self, code: str, state: str | None = None) -> None:
+        """Set the authorization code for token exchange of an MCP session.
 
         Args:
             code (str): The authorization code received from the OAuth2 server
+            state (str, optional): State of the authorization URL the code answers; the code
+                goes to the session that requested that URL instead of the current one
+
+        Raises:
+            ValueError: If the state is unknown, or no session is being served over HTTP
         """
-        self.token_manager.set_authorization_code(code)
+        if state is not None:
+            if state not in self._pending_authorizations:
+                raise ValueError("Unknown or expired authorization state")
+            session = self._pending_authorizations.pop(state)
+        else:
+            session = current_session.get()
+            if session is None and settings.TRANSPORT_MODE != "stdio":
+                raise ValueError("An authorization code can only be set for an MCP session")
+        self.token_managers.get(session).set_authorization_code(code)
 
     def is_authorization_code_flow(self) -> bool:
         """Check if the client is configured for authorization code flow.
@@ -110,7 +900,7 @@ class FhirClient:
         Returns:
             bool: True if using authorization code flow
         """
-        return self.token_manager.auth_method == AuthMethod.AUTHORIZATION_CODE
+        return self.auth_method == AuthMethod.AUTHORIZATION_CODE
 
 
 fhir_client = FhirClient()
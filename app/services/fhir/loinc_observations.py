@@ -0,0 +1,107 @@
+from typing import Any
+from urllib.parse import urlencode
+
+from app.config import settings
+from app.schemas.fhir_schemas import FhirProjection, LoincObservationSearch
+from app.services.fhir.fhir_client import FhirClient, fhir_client
+from app.services.fhir.utils import get_next_link
+from app.services.loinc_client import LoincClient, loinc_client
+
+LOINC_SYSTEM = "http://loinc.org"
+
+
+class LoincObservationService:
+    """Finds a patient's Observations for a measurement name in one call.
+
+    The candidate LOINC codes are resolved first, then OR'ed into a single
+    `Observation?patient=...&code=a,b,c` search instead of one search per code, and the
+    matches are grouped by code.
+
+    Args:
+        client (FhirClient): Client used for the search
+        loinc (LoincClient): Client used to resolve the LOINC codes
+    """
+
+    def __init__(self, client: FhirClient, loinc: LoincClient):
+        self.client = client
+        self.loinc = loinc
+
+    async def _resolve(
+        self,
+        component_name: str | None,
+        loinc_codes: list[str] | None,
+        max_codes: int,
+        max_fetch: int,
+    ) -> list[dict[str, Any]]:
+        if loinc_codes:
+            return [{"LOINC_NUM": code} for code in dict.fromkeys(loinc_codes)]
+        if not component_name:
+            raise ValueError("Either component_name or loinc_codes is required")
+
+        records = await self.loinc.get_common_loinc_codes(component_name, max_codes, max_fetch)
+        if records and "Error" in records[0]:
+            raise ValueError(f"LOINC lookup failed: {records[0]['Error']}")
+        return records
+
+    async def search(
+        self,
+        patient_id: str,
+        component_name: str | None = None,
+        loinc_codes: list[str] | None = None,
+        max_codes: int = settings.LOINC_MAX_CODES,
+        max_fetch: int = settings.LOINC_MAX_FETCH,
+        count: int = settings.FHIR_PAGE_SIZE,
+        fetch_all: bool = False,
+        projection: FhirProjection | None = None,
+    ) -> LoincObservationSearch:
+        records = await self._resolve(component_name, loinc_codes, max_codes, max_fetch)
+        codes = [record["LOINC_NUM"] for record in records if record.get("LOINC_NUM")]
+        if not codes:
+            # an empty code parameter would match every Observation of the patient
+            raise ValueError("No LOINC codes resolved")
+        query = {
+            "patient": patient_id,
+            "code": ",".join(f"{LOINC_SYSTEM}|{code}" for code in codes),
+            "_count": count,
+        }
+        path = f"/Observation?{urlencode(query, safe=',|:/')}"
+        response = await self.client.request(
+            "GET",
+            path,
+            fetch_all=fetch_all,
+            projection=projection,
+        )
+        bundle = response.response if isinstance(response.response, dict) else {}
+
+        result = LoincObservationSearch(
+            path=path,
+            loinc_codes=records,
+            observations={code: [] for code in codes},
+            total=bundle.get("total"),
+            paging=response.paging,
+        )
+        returned = 0
+        for entry in bundle.get("entry", []):
+            observation = entry.get("resource", {})
+            if observation.get("resourceType") != "Observation":
+                continue
+            returned += 1
+            matched = [
+                coding.get("code")
+                for coding in observation.get("code", {}).get("coding", [])
+                if coding.get("system") == LOINC_SYSTEM and coding.get("code") in codes
+            ]
+            # the server matched the search, so a missing LOINC coding was projected away
+            for code in dict.fromkeys(matched) or ["other"]:
+                result.observations.setdefault(code, []).append(observation)
+
+        if response.paging is not None:
+            result.more_available = response.paging.truncated
+        else:
+            result.more_available = get_next_link(bundle) is not None or (
+                result.total is not None and result.total > returned
+            )
+        return result
+
+
+loinc_observation_service = LoincObservationService(fhir_client, loinc_client)
@@ -0,0 +1,727 @@
+"""Local mirror of FHIR resources in SQLite that answers repeated reads and searches offline.
+
+Resources fetched from the server are stored with secondary indexes on patient, code, date and
+status. A search can only be answered locally if the mirror is known to hold *every* match, so
+completeness is tracked per patient compartment: a complete `{type}?patient=...` result (one
+page without a `next` link, or an untruncated `fetch_all`) records a coverage row, and later
+searches of that type for that patient, filtered on the indexed parameters, are served from the
+mirror while the coverage is younger than `max_age`. Everything else falls through to the server.
+Responses that may hold partial resources (`_elements`, `_summary`, `_include`, ... or a
+`SUBSETTED` tag) are never stored, nor are responses to requests started before a write of
+their type was invalidated (tracked with a per-type generation).
+`apply_changes` (driven by `MirrorSync`) folds server-side changes in and keeps the data fresh.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+import orjson
+
+from app.services.fhir.utils import get_next_link, parse_resource_path
+
+
+@dataclass(frozen=True)
+class IndexedType:
+    """Search parameters indexed for a resource type and the elements they are read from."""
+
+    date_param: str | None = None
+    date_paths: tuple[str, ...] = ()
+    status_param: str | None = None
+    code_param: str | None = None
+    code_path: str | None = None
+
+
+INDEXED_TYPES: dict[str, IndexedType] = {
+    "Patient": IndexedType(),
+    "Observation": IndexedType(
+        "date",
+        ("effectiveDateTime", "effectivePeriod.start", "effectiveInstant", "issued"),
+        "status",
+        "code",
+        "code",
+    ),
+    "Condition": IndexedType(
+        "recorded-date",
+        ("recordedDate",),
+        "clinical-status",
+        "code",
+        "code",
+    ),
+    "MedicationRequest": IndexedType(
+        "authoredon",
+        ("authoredOn",),
+        "status",
+        "code",
+        "medicationCodeableConcept",
+    ),
+    "MedicationStatement": IndexedType(
+        "effective",
+        ("effectiveDateTime", "effectivePeriod.start"),
+        "status",
+        "code",
+        "medicationCodeableConcept",
+    ),
+    "AllergyIntolerance": IndexedType(
+        "date",
+        ("recordedDate",),
+        "clinical-status",
+        "code",
+        "code",
+    ),
+    "Immunization": IndexedType(
+        "date",
+        ("occurrenceDateTime",),
+        "status",
+        "vaccine-code",
+        "vaccineCode",
+    ),
+    "Encounter": IndexedType("date", ("period.start",), "status", "type", "type"),
+}
+
+# Search parameters that identify the patient compartment.
+PATIENT_PARAMS = ("patient", "subject")
+
+# Parameters that make the server return partial resources or resources of other types; their
+# responses are never stored.
+RESULT_MODIFIERS = {
+    "_elements",
+    "_summary",
+    "_include",
+    "_revinclude",
+    "_contained",
+    "_containedType",
+}
+
+# `meta.tag` the server puts on resources it did not return in full.
+SUBSETTED = "SUBSETTED"
+
+# Date prefixes that can be compared on the date part of the indexed value.
+DATE_OPERATORS = {"ge": ">=", "gt": ">", "le": "<=", "lt": "<"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    principal TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    patient TEXT,
+    date TEXT,
+    status TEXT,
+    last_updated TEXT,
+    stored_at REAL NOT NULL,
+    content BLOB NOT NULL,
+    PRIMARY KEY (principal, resource_type, id)
+);
+CREATE INDEX IF NOT EXISTS resources_patient
+    ON resources (principal, resource_type, patient, date);
+CREATE INDEX IF NOT EXISTS resources_status ON resources (principal, resource_type, status);
+CREATE TABLE IF NOT EXISTS resource_codes (
+    principal TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    system TEXT,
+    code TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resource_codes_code ON resource_codes (principal, resource_type, code);
+CREATE INDEX IF NOT EXISTS resource_codes_resource ON resource_codes (principal, resource_type, id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    principal TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    high_water_mark REAL NOT NULL,
+    PRIMARY KEY (principal, resource_type)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    principal TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    patient TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (principal, resource_type, patient)
+);
+"""
+
+
+def _get_path(value: Any, path: str) -> Any:
+    for name in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def _reference_id(reference: Any, resource_type: str = "Patient") -> str | None:
+    """The id of a `{"reference": "Patient/123"}` (relative or absolute) reference."""
+    if isinstance(reference, dict):
+        reference = reference.get("reference")
+    if not isinstance(reference, str):
+        return None
+    parts = reference.rstrip("/").split("/")
+    if len(parts) >= 2 and parts[-2] == resource_type:
+        return parts[-1]
+    return None
+
+
+def _codings(concepts: Any) -> list[tuple[str | None, str]]:
+    if not isinstance(concepts, list):
+        concepts = [concepts]
+    codes = []
+    for concept in concepts:
+        codings = concept.get("coding", []) if isinstance(concept, dict) else []
+        codes.extend(
+            (coding.get("system"), coding["code"])
+            for coding in codings
+            if isinstance(coding, dict) and isinstance(coding.get("code"), str)
+        )
+    return codes
+
+
+def _patient_of(resource: dict) -> str | None:
+    """Id of the patient whose compartment the resource belongs to."""
+    if resource.get("resourceType") == "Patient":
+        return resource.get("id")
+    for name in PATIENT_PARAMS:
+        if patient_id := _reference_id(resource.get(name)):
+            return patient_id
+    return None
+
+
+def _is_subsetted(resource: dict) -> bool:
+    tags = _get_path(resource, "meta.tag")
+    return isinstance(tags, list) and any(
+        isinstance(tag, dict) and tag.get("code") == SUBSETTED for tag in tags
+    )
+
+
+def has_result_modifier(query: str) -> bool:
+    """True if the query asks for partial resources (`_elements`, `_summary`) or extra ones."""
+    return any(
+        name.split(":", 1)[0] in RESULT_MODIFIERS
+        for name, _ in parse_qsl(query, keep_blank_values=True)
+    )
+
+
+def _status(resource: dict) -> str | None:
+    status = resource.get("status")
+    if isinstance(status, str):
+        return status
+    codes = _codings(resource.get("clinicalStatus"))
+    return codes[0][1] if codes else None
+
+
+@dataclass
+class LocalSearch:
+    """A search the mirror knows how to evaluate."""
+
+    resource_type: str
+    patient: str
+    codes: list[tuple[str | None, str]] = field(default_factory=list)
+    dates: list[tuple[str, str]] = field(default_factory=list)
+    statuses: list[str] = field(default_factory=list)
+    count: int | None = None
+    sort_descending: bool | None = None
+    # True if the query only selects the patient compartment, so its result can be recorded
+    # as complete coverage
+    whole_compartment: bool = True
+
+
+def _parse_date(value: str) -> tuple[str, str] | None:
+    """SQL condition (on the date part of the indexed value) for a FHIR date parameter."""
+    prefix, date = value[:2], value[2:]
+    if prefix not in (*DATE_OPERATORS, "eq"):
+        prefix, date = "eq", value
+    if prefix == "eq":
+        if len(date) in (4, 7, 10) and date[:4].isdigit():
+            return "LIKE", f"{date}%"
+        return None
+    if len(date) != 10 or not date[:4].isdigit():
+        return None
+    return DATE_OPERATORS[prefix], date
+
+
+def parse_search(resource_type: str, query: str) -> LocalSearch | None:
+    """Parse a search that the mirror can answer, or return None."""
+    indexed = INDEXED_TYPES.get(resource_type)
+    if indexed is None or resource_type == "Patient":
+        return None
+
+    patient = None
+    search = LocalSearch(resource_type, "")
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name in PATIENT_PARAMS or name == "subject:Patient":
+            patient_id = _reference_id(value) or (value if "/" not in value else None)
+            if not patient_id or "," in patient_id or patient not in (None, patient_id):
+                return None
+            patient = patient_id
+        elif name == "_count" and value.isdigit():
+            search.count = int(value)
+        elif name == "_sort" and indexed.date_param and value.lstrip("-") == indexed.date_param:
+            search.sort_descending = value.startswith("-")
+        elif name == indexed.code_param:
+            for item in value.split(","):
+                system, sep, code = item.partition("|")
+                if not sep:
+                    system, code = "", system
+                if not code:
+                    return None
+                search.codes.append((system or None, code))
+            search.whole_compartment = False
+        elif name == indexed.date_param:
+            condition = _parse_date(value)
+            if condition is None:
+                return None
+            search.dates.append(condition)
+            search.whole_compartment = False
+        elif name == indexed.status_param:
+            search.statuses.extend(value.split(","))
+            search.whole_compartment = False
+        else:
+            return None
+
+    if patient is None:
+        return None
+    search.patient = patient
+    return search
+
+
+class ResourceMirror:
+    """SQLite mirror of FHIR resources, scoped by auth principal.
+
+    Callers on the event loop go through `run` and `submit`, which execute the methods on one
+    dedicated thread in submission order: a response recorded before a write is always
+    invalidated by it, never stored after it.
+
+    Args:
+        path (str): Database file, or ":memory:" for a mirror that lives with the process
+        base_url (str): FHIR base URL, used for the `fullUrl` of local search results
+        max_age (float): Seconds a stored resource or coverage is used to answer requests
+        resource_types (Iterable[str]): Resource types to mirror
+    """
+
+    def __init__(
+        self,
+        path: str,
+        base_url: str,
+        max_age: float,
+        resource_types: Iterable[str],
+    ):
+        self.base_url = base_url
+        self.max_age = max_age
+        self.resource_types = {name for name in resource_types if name in INDEXED_TYPES}
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fhir-mirror")
+        self._lock = threading.Lock()  # the executor thread and `stats` share the connection
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        # bumped by `invalidate`; a response fetched at an older generation may predate a write
+        self._generation = 0
+        self._generations: dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.invalidations = 0
+        self.stale_records = 0
+        self.errors = 0
+
+    async def run[T](self, func: Callable[..., T], *args: Any) -> T:
+        """Run `func(*args)` on the mirror thread and wait for the result."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> None:
+        """Queue `func(*args)` on the mirror thread without waiting for it."""
+        self._executor.submit(func, *args)
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        with self._lock:
+            self._db.close()
+
+    def lookup(self, principal: str, path: str) -> tuple[bytes, int] | None:
+        """Answer a read or search from the mirror; returns the body and number of entries."""
+        resource_type, resource_id = parse_resource_path(path)
+        if resource_type not in self.resource_types:
+            return None
+
+        parts = urlsplit(path)
+        if parts.path.rstrip("/").count("/") != (1 if resource_id is None else 2):
+            return None  # versioned reads, compartment searches and operations go to the server
+        if resource_id is not None:
+            if parts.query:
+                return None
+            result = self._read(principal, resource_type, resource_id)
+        else:
+            search = parse_search(resource_type, parts.query)
+            result = self._search(principal, search) if search is not None else None
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _read(
+        self,
+        principal: str,
+        resource_type: str,
+        resource_id: str,
+    ) -> tuple[bytes, int] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content FROM resources WHERE principal = ? AND resource_type = ? AND id = ?"
+                " AND stored_at >= ?",
+                (principal, resource_type, resource_id, time.time() - self.max_age),
+            ).fetchone()
+        return (row[0], 1) if row is not None else None
+
+    def _search(self, principal: str, search: LocalSearch) -> tuple[bytes, int] | None:
+        sql = [
+            "SELECT r.resource_type, r.id, r.content FROM resources r WHERE r.principal = ?",
+            "AND r.resource_type = ? AND r.patient = ?",
+        ]
+        params: list[Any] = [principal, search.resource_type, search.patient]
+        if search.statuses:
+            sql.append(f"AND r.status IN ({', '.join('?' * len(search.statuses))})")
+            params.extend(search.statuses)
+        for operator, value in search.dates:
+            sql.append(f"AND substr(r.date, 1, 10) {operator} ?")
+            params.append(value)
+        if search.codes:
+            matches = []
+            for system, code in search.codes:
+                matches.append("(c.code = ?" + (" AND c.system = ?)" if system else ")"))
+                params.extend((code, system) if system else (code,))
+            sql.append(
+                "AND EXISTS (SELECT 1 FROM resource_codes c WHERE c.principal = r.principal"
+                " AND c.resource_type = r.resource_type AND c.id = r.id"
+                f" AND ({' OR '.join(matches)}))",
+            )
+        if search.sort_descending is not None:
+            sql.append(f"ORDER BY r.date {'DESC' if search.sort_descending else 'ASC'}")
+
+        with self._lock:
+            covered = self._db.execute(
+                "SELECT 1 FROM coverage WHERE principal = ? AND resource_type = ? AND patient = ?"
+                " AND stored_at >= ?",
+                (principal, search.resource_type, search.patient, time.time() - self.max_age),
+            ).fetchone()
+            if covered is None:
+                return None
+            rows = self._db.execute(" ".join(sql), params).fetchall()
+
+        # a partial page would need a `next` link the server can follow, so leave it to the server
+        if search.count is not None and len(rows) > search.count:
+            return None
+        entries = b",".join(
+            b'{"fullUrl":'
+            + orjson.dumps(f"{self.base_url}/{resource_type}/{resource_id}")
+            + b',"resource":'
+            + content
+            + b',"search":{"mode":"match"}}'
+            for resource_type, resource_id, content in rows
+        )
+        bundle = b'{"resourceType":"Bundle","type":"searchset","total":%d,"entry":[%b]}' % (
+            len(rows),
+            entries,
+        )
+        return bundle, len(rows)
+
+    def generation(self, resource_type: str | None) -> int:
+        """Counter advanced by every invalidation of `resource_type`; read before a request."""
+        return self._generation + self._generations.get(resource_type or "", 0)
+
+    def record(
+        self,
+        principal: str,
+        path: str,
+        data: Any,
+        complete: bool,
+        generation: int,
+    ) -> None:
+        """Store the resources of a server response to `path`.
+
+        Args:
+            principal: Auth principal the response was fetched for
+            path: Request path relative to the base URL
+            data: Decoded body, or the raw JSON bytes
+            complete: True if `data` holds every result of the search (no page left out)
+            generation: `generation` of the path's type when the request was started; the
+                response is dropped if a write was invalidated since
+        """
+        if generation != self.generation(parse_resource_path(path)[0]):
+            self.stale_records += 1
+            return
+        try:
+            self._record(principal, path, data, complete)
+        except (sqlite3.Error, orjson.JSONDecodeError):
+            # the mirror is an optimization; a response it cannot store is served anyway
+            self.errors += 1
+
+    def _record(self, principal: str, path: str, data: Any, complete: bool) -> None:
+        resource_type, resource_id = parse_resource_path(path)
+        if resource_type not in self.resource_types or has_result_modifier(urlsplit(path).query):
+            return
+        if isinstance(data, bytes):
+            data = orjson.loads(data)
+        if not isinstance(data, dict):
+            return
+
+        if data.get("resourceType") != "Bundle":
+            if resource_id is not None and data.get("resourceType") == resource_type:
+                self.upsert(principal, [data])
+            return
+
+        resources = [
+            entry["resource"]
+            for entry in data.get("entry", [])
+            if isinstance(entry, dict) and isinstance(entry.get("resource"), dict)
+        ]
+        if any(_is_subsetted(resource) for resource in resources):
+            return  # the server left elements out regardless of what was asked
+        search = None
+        parts = urlsplit(path)
+        is_search = resource_id is None and parts.path.rstrip("/").count("/") == 1
+        if is_search and complete and get_next_link(data) is None:
+            search = parse_search(resource_type, parts.query)
+        if search is None or not search.whole_compartment:
+            self.upsert(principal, resources)
+            return
+
+        now = time.time()
+        with self._lock, self._db:
+            # the compartment is replaced so resources deleted on the server disappear too
+            self._db.execute(
+                "DELETE FROM resource_codes WHERE principal = ? AND resource_type = ? AND id IN"
+                " (SELECT id FROM resources WHERE principal = ? AND resource_type = ?"
+                " AND patient = ?)",
+                (principal, resource_type, principal, resource_type, search.patient),
+            )
+            self._db.execute(
+                "DELETE FROM resources WHERE principal = ? AND resource_type = ? AND patient = ?",
+                (principal, resource_type, search.patient),
+            )
+            self._upsert(principal, resources, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+                (principal, resource_type, search.patient, now),
+            )
+
+    def upsert(self, principal: str, resources: list[dict]) -> None:
+        """Store (or refresh) resources of the mirrored types."""
+        with self._lock, self._db:
+            self._upsert(principal, resources, time.time())
+
+    def _upsert(self, principal: str, resources: list[dict], now: float) -> None:
+        for resource in resources:
+            resource_type = resource.get("resourceType")
+            resource_id = resource.get("id")
+            if (
+                resource_type not in self.resource_types
+                or not isinstance(resource_id, str)
+                or _is_subsetted(resource)
+            ):
+                continue
+            indexed = INDEXED_TYPES[resource_type]
+            patient = _patient_of(resource)
+            date = next(
+                (
+                    value
+                    for path in indexed.date_paths
+                    if isinstance(value := _get_path(resource, path), str)
+                ),
+                None,
+            )
+            last_updated = _get_path(resource, "meta.lastUpdated")
+            key = (principal, resource_type, resource_id)
+            # a response fetched before a newer version was applied must not overwrite it
+            cursor = self._db.execute(
+                "INSERT INTO resources VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT DO UPDATE SET patient = excluded.patient, date = excluded.date,"
+                " status = excluded.status, last_updated = excluded.last_updated,"
+                " stored_at = excluded.stored_at, content = excluded.content"
+                " WHERE excluded.last_updated IS NULL OR resources.last_updated IS NULL"
+                " OR excluded.last_updated >= resources.last_updated",
+                (
+                    *key,
+                    patient,
+                    date,
+                    _status(resource),
+                    last_updated if isinstance(last_updated, str) else None,
+                    now,
+                    orjson.dumps(resource),
+                ),
+            )
+            if cursor.rowcount == 0:
+                continue
+            self._db.execute(
+                "DELETE FROM resource_codes WHERE principal = ? AND resource_type = ? AND id = ?",
+                key,
+            )
+            if indexed.code_path is not None:
+                self._db.executemany(
+                    "INSERT INTO resource_codes VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (*key, system, code)
+                        for system, code in _codings(resource.get(indexed.code_path))
+                    ],
+                )
+            self.stored += 1
+
+    def invalidate(self, resource_type: str | None, resource_id: str | None = None) -> None:
+        """Forget what a write to `resource_type` may have changed.
+
+        The written resource is dropped and, since any write can change search results, so is
+        the coverage of the whole type; other stored resources still answer reads by id. An
+        unknown type (e.g. a transaction) clears the mirror.
+        """
+        if resource_type is None:
+            self._generation += 1
+        else:
+            self._generations[resource_type] = self._generations.get(resource_type, 0) + 1
+        with self._lock, self._db:
+            if resource_type is None:
+                for table in ("coverage", "resource_codes", "resources"):
+                    self._db.execute(f"DELETE FROM {table}")
+            else:
+                self._db.execute("DELETE FROM coverage WHERE resource_type = ?", (resource_type,))
+                if resource_id is not None:
+                    self._db.execute(
+                        "DELETE FROM resources WHERE resource_type = ? AND id = ?",
+                        (resource_type, resource_id),
+                    )
+                    self._db.execute(
+                        "DELETE FROM resource_codes WHERE resource_type = ? AND id = ?",
+                        (resource_type, resource_id),
+                    )
+        self.invalidations += 1
+
+    def _delete(self, principal: str, resource_type: str, resource_id: str) -> None:
+        key = (principal, resource_type, resource_id)
+        condition = "principal = ? AND resource_type = ? AND id = ?"
+        self._db.execute(f"DELETE FROM resources WHERE {condition}", key)
+        self._db.execute(f"DELETE FROM resource_codes WHERE {condition}", key)
+
+    def get_high_water_mark(self, principal: str, resource_type: str) -> float | None:
+        """Time (epoch seconds) up to which changes of `resource_type` have been applied."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT high_water_mark FROM sync_state WHERE principal = ? AND resource_type = ?",
+                (principal, resource_type),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def apply_changes(
+        self,
+        principal: str,
+        resource_type: str,
+        changed: list[dict],
+        deleted: list[str],
+        since: float,
+        until: float,
+    ) -> int:
+        """Apply the server-side changes of `resource_type` made between `since` and `until`.
+
+        Changed resources are updated where the mirror holds them, and added where they belong
+        to a covered patient compartment so the coverage stays complete. Everything stored
+        after `since` has now seen every change up to `until`, so it is kept fresh as of
+        `until`, and `until` becomes the new high-water mark.
+
+        Returns:
+            The number of mirrored resources updated, added or deleted
+        """
+        with self._lock, self._db:
+            applied = self._apply(principal, resource_type, changed, deleted, since, until)
+            for table in ("resources", "coverage"):
+                self._db.execute(
+                    f"UPDATE {table} SET stored_at = ? WHERE principal = ? AND resource_type = ?"
+                    " AND stored_at >= ? AND stored_at < ?",
+                    (until, principal, resource_type, since, until),
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (principal, resource_type, until),
+            )
+        return applied
+
+    def apply_notification(
+        self,
+        principal: str,
+        resource_type: str,
+        changed: list[dict],
+        deleted: list[str],
+    ) -> int:
+        """Apply changes pushed by the server as they happen; see `apply_changes`."""
+        now = time.time()
+        with self._lock, self._db:
+            return self._apply(principal, resource_type, changed, deleted, now - self.max_age, now)
+
+    def _apply(
+        self,
+        principal: str,
+        resource_type: str,
+        changed: list[dict],
+        deleted: list[str],
+        since: float,
+        stored_at: float,
+    ) -> int:
+        applied = 0
+        for resource in changed:
+            held = self._db.execute(
+                "SELECT 1 FROM resources WHERE principal = ? AND resource_type = ? AND id = ?",
+                (principal, resource_type, resource.get("id")),
+            ).fetchone()
+            covered = (
+                held
+                or self._db.execute(
+                    "SELECT 1 FROM coverage WHERE principal = ? AND resource_type = ?"
+                    " AND patient = ? AND stored_at >= ?",
+                    (principal, resource_type, _patient_of(resource), since),
+                ).fetchone()
+            )
+            if covered:
+                self._upsert(principal, [resource], stored_at)
+                applied += 1
+        for resource_id in deleted:
+            self._delete(principal, resource_type, resource_id)
+            applied += 1
+        return applied
+
+    def reset(self, principal: str, resource_type: str, until: float) -> None:
+        """Forget `resource_type` when too many changes are pending to apply them one by one.
+
+        It is fetched again on demand, and syncing resumes from `until`.
+        """
+        with self._lock, self._db:
+            for table in ("resources", "resource_codes", "coverage"):
+                self._db.execute(
+                    f"DELETE FROM {table} WHERE principal = ? AND resource_type = ?",
+                    (principal, resource_type),
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (principal, resource_type, until),
+            )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            resources = self._db.execute("SELECT count(*) FROM resources").fetchone()[0]
+            compartments = self._db.execute("SELECT count(*) FROM coverage").fetchone()[0]
+        return {
+            "resources": resources,
+            "covered_compartments": compartments,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "invalidations": self.invalidations,
+            "stale_records": self.stale_records,
+            "errors": self.errors,
+        }
@@ -0,0 +1,195 @@
+"""Background sync that keeps the resource mirror current with changes made on the server."""
+
+import asyncio
+import time
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+import orjson
+
+from app.config import settings
+from app.services.fhir.capabilities import ServerCapabilities
+from app.services.fhir.mirror import ResourceMirror
+from app.services.fhir.utils import get_next_link
+
+if TYPE_CHECKING:
+    from app.services.fhir.fhir_client import FhirClient
+
+
+def _entry_id(entry: dict, resource_type: str) -> str | None:
+    """Id of the resource a history entry is about, also for deletions (which carry none)."""
+    resource = entry.get("resource")
+    if isinstance(resource, dict) and isinstance(resource.get("id"), str):
+        return resource["id"]
+    for url in (entry.get("request", {}).get("url"), entry.get("fullUrl")):
+        if not isinstance(url, str):
+            continue
+        segments = url.split("?", 1)[0].split("/")
+        if resource_type in segments[:-1]:
+            return segments[segments.index(resource_type) + 1] or None
+    return None
+
+
+class MirrorSync:
+    """Applies resources changed on the server to the mirror, one pass every `interval` seconds.
+
+    Changes of each mirrored type are read from `{type}/_history?_since=...` when the server
+    declares the `history-type` interaction (which also reports deletions), and from a
+    `_lastUpdated=ge...` search otherwise. Only these deltas are fetched: held resources are
+    updated, covered patient compartments gain their new resources, and everything that was
+    current stays fresh, so the mirror keeps answering without refetching whole records.
+
+    Each pass starts `overlap` seconds before the previous high-water mark to absorb clock skew
+    (applying a change twice is harmless). When more than `max_entries` changes are pending,
+    the type is dropped from the mirror instead and fetched again on demand.
+
+    Args:
+        client (FhirClient): Client used for the change queries
+        mirror (ResourceMirror): Mirror to update
+        interval (float): Seconds between two passes
+        overlap (float): Seconds each pass reaches back before the high-water mark
+        max_entries (int): Maximum number of changes applied per type and pass
+    """
+
+    def __init__(
+        self,
+        client: "FhirClient",
+        mirror: ResourceMirror,
+        interval: float,
+        overlap: float,
+        max_entries: int,
+    ):
+        self.client = client
+        self.mirror = mirror
+        self.interval = interval
+        self.overlap = overlap
+        self.max_entries = max_entries
+        self._task: asyncio.Task | None = None
+
+        self.passes = 0
+        self.applied = 0
+        self.resets = 0
+        self.failures = 0
+        self.last_pass_duration: float | None = None
+        self.last_error: str | None = None
+
+    def start(self) -> None:
+        """Start syncing in the background (no-op if already running)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the background sync and wait until it has let go of the mirror."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.sync_once()
+            await asyncio.sleep(self.interval)
+
+    async def sync_once(self) -> None:
+        """Run one pass over all mirrored types; failures are counted, not raised."""
+        started = time.perf_counter()
+        try:
+            principal = await self.client.principal()
+            capabilities = await self.client.get_capabilities()
+        except Exception as e:
+            self._record_failure(None, e)
+            return
+
+        for resource_type in sorted(self.mirror.resource_types):
+            try:
+                await self._sync_type(principal, resource_type, capabilities)
+            except Exception as e:
+                self._record_failure(resource_type, e)
+        self.passes += 1
+        self.last_pass_duration = time.perf_counter() - started
+
+    def _record_failure(self, resource_type: str | None, e: Exception) -> None:
+        self.failures += 1
+        reason = getattr(e, "message", None) or str(e) or type(e).__name__
+        self.last_error = f"{resource_type}: {reason}" if resource_type else reason
+
+    async def _sync_type(
+        self,
+        principal: str,
+        resource_type: str,
+        capabilities: ServerCapabilities | None,
+    ) -> None:
+        until = time.time()
+        high_water_mark = await self.mirror.run(
+            self.mirror.get_high_water_mark,
+            principal,
+            resource_type,
+        )
+        # without a mark, nothing older than the mirror's staleness bound is served anyway
+        since = (high_water_mark or until - self.mirror.max_age) - self.overlap
+        instant = datetime.fromtimestamp(since, timezone.utc).isoformat(timespec="seconds")
+
+        if capabilities is not None and capabilities.supports_interaction(
+            resource_type,
+            "history-type",
+        ):
+            path = f"/{resource_type}/_history"
+            params: dict[str, Any] = {"_since": instant}
+        else:
+            path = f"/{resource_type}"
+            params = {"_lastUpdated": f"ge{instant}"}
+        params["_count"] = settings.FHIR_PAGE_MAX_SIZE
+        url: str | None = f"{self.client.base_url}{path}?{urlencode(params)}"
+
+        changed: dict[str, dict] = {}
+        deleted: set[str] = set()
+        while url is not None:
+            response = await self.client.send("GET", url)
+            bundle = orjson.loads(response.content)
+            # history lists the newest version of a resource first
+            for entry in bundle.get("entry", []):
+                resource_id = _entry_id(entry, resource_type)
+                if resource_id is None or resource_id in changed or resource_id in deleted:
+                    continue
+                resource = entry.get("resource")
+                if entry.get("request", {}).get("method") == "DELETE" or resource is None:
+                    deleted.add(resource_id)
+                elif resource.get("resourceType") == resource_type:
+                    changed[resource_id] = resource
+
+            if len(changed) + len(deleted) > self.max_entries:
+                await self.mirror.run(self.mirror.reset, principal, resource_type, until)
+                self._invalidate_cache(resource_type)
+                self.resets += 1
+                return
+            url = get_next_link(bundle)
+
+        applied = await self.mirror.run(
+            self.mirror.apply_changes,
+            principal,
+            resource_type,
+            list(changed.values()),
+            list(deleted),
+            since,
+            until,
+        )
+        if changed or deleted:
+            self._invalidate_cache(resource_type)
+        self.applied += applied
+
+    def _invalidate_cache(self, resource_type: str) -> None:
+        if self.client.cache is not None:
+            self.client.cache.invalidate(resource_type)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "passes": self.passes,
+            "applied": self.applied,
+            "resets": self.resets,
+            "failures": self.failures,
+            "last_pass_duration": self.last_pass_duration,
+            "last_error": self.last_error,
+        }
@@ -1,5 +1,11 @@
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from typing import Any
+
+import orjson
+
+from app.schemas.fhir_schemas import FhirPagingSummary, FhirProjectionReport
 
 
 class AuthMethod(Enum):
@@ -8,11 +14,97 @@ class AuthMethod(Enum):
 
 
 class Token:
-    def __init__(self, access_token: str | None = None, expires_at: datetime | None = None):
+    def __init__(
+        self,
+        access_token: str | None = None,
+        expires_at: datetime | None = None,
+        refresh_token: str | None = None,
+    ):
         """
         Args:
             access_token (str): The access token
             expires_at (datetime): The expiration timestamp
+            refresh_token (str): Refresh token issued with it (authorization code flow)
         """
         self.access_token = access_token
         self.expires_at = expires_at
+        self.refresh_token = refresh_token
+
+
+@dataclass
+class FhirPage:
+    """A single page of a FHIR search.
+
+    Attributes:
+        bundle: The decoded searchset Bundle
+        entries: Entries of this page that fit within the paging budget
+        size: Size of the page body in bytes
+        truncated: True if more results were available but the budget ran out
+    """
+
+    bundle: dict
+    entries: list[dict] = field(default_factory=list)
+    size: int = 0
+    truncated: bool = False
+
+
+@dataclass
+class FhirRawResponse:
+    """A FHIR response kept as the raw JSON body returned by the server.
+
+    The body is only decoded when the caller asks for objects, so large Bundles can be handed
+    to the MCP client without building (and re-serializing) a Python object tree.
+
+    Attributes:
+        method: HTTP method of the request
+        path: Requested URL
+        body: Request body
+        content: Raw JSON response body
+        paging: Paging summary when all result pages were fetched
+        projection: Projection summary when a projection was applied
+        validated: True if `content` is known to be valid JSON (e.g. serialized locally)
+    """
+
+    method: str
+    path: str
+    body: dict | None
+    content: bytes
+    paging: FhirPagingSummary | None = None
+    projection: FhirProjectionReport | None = None
+    validated: bool = False
+
+    def json(self) -> Any:
+        """Decode the response body (an empty body decodes to None)."""
+        return orjson.loads(self.content) if self.content.strip() else None
+
+    def to_json(self) -> bytes:
+        """Serialize in the shape of `FhirQueryResponse`, splicing in the body as is.
+
+        A body passed through from the server is checked first, as it may not be JSON at all.
+        """
+        content = self.content.strip()
+        if not content:
+            content = b"null"
+        elif not self.validated and not _is_json_document(content):
+            # e.g. a plain-text or HTML error page: pass it on as a string
+            content = orjson.dumps(content.decode("utf-8", errors="replace"))
+        head = orjson.dumps({"method": self.method, "path": self.path, "body": self.body})
+        tail = orjson.dumps(
+            {
+                "paging": self.paging.model_dump() if self.paging else None,
+                "projection": self.projection.model_dump() if self.projection else None,
+            },
+        )
+        return b"".join(
+            (head[:-1], b',"response":', content, b",", tail[1:]),
+        )
+
+
+def _is_json_document(content: bytes) -> bool:
+    if content[:1] not in (b"{", b"["):
+        return False
+    try:
+        orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return False
+    return True
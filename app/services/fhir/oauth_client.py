@@ -1,7 +1,8 @@
-import requests
+import httpx
 from fastapi import HTTPException, status
 
 from app.config import settings
+from app.utils.http_utils import build_async_client
 
 
 class OAuthClient:
@@ -12,8 +13,26 @@ class OAuthClient:
         self.timeout = timeout or settings.FHIR_SERVER_TIMEOUT
         self.token_url = f"{self.base_url}/oauth2/token"
         self.headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        self._http_client: httpx.AsyncClient | None = None
 
-    def exchange_client_credentials(
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Keep-alive pool for the token endpoint, created lazily."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = build_async_client(
+                timeout=self.timeout,
+                max_connections=settings.FHIR_SERVER_MAX_KEEPALIVE_CONNECTIONS,
+                max_keepalive_connections=settings.FHIR_SERVER_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.FHIR_SERVER_KEEPALIVE_EXPIRY,
+            )
+        return self._http_client
+
+    async def aclose(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def exchange_client_credentials(
         self,
         client_id: str,
         client_secret: str,
@@ -25,12 +44,7 @@ class OAuthClient:
             "client_secret": client_secret,
         }
 
-        response = requests.post(
-            self.token_url,
-            data=data,
-            headers=self.headers,
-            timeout=self.timeout,
-        )
+        response = await self.http_client.post(self.token_url, data=data, headers=self.headers)
 
         if response.status_code != status.HTTP_200_OK:
             raise HTTPException(
@@ -40,7 +54,7 @@ class OAuthClient:
 
         return response.json()
 
-    def exchange_authorization_code(
+    async def exchange_authorization_code(
         self,
         client_id: str,
         code: str,
@@ -63,12 +77,7 @@ class OAuthClient:
             "redirect_uri": redirect_uri,
         }
 
-        response = requests.post(
-            self.token_url,
-            data=data,
-            headers=self.headers,
-            timeout=self.timeout,
-        )
+        response = await self.http_client.post(self.token_url, data=data, headers=self.headers)
 
         if response.status_code != status.HTTP_200_OK:
             raise HTTPException(
@@ -77,3 +86,25 @@ class OAuthClient:
             )
 
         return response.json()
+
+    async def exchange_refresh_token(
+        self,
+        client_id: str,
+        refresh_token: str,
+    ) -> dict:
+        """Exchange a refresh token for a new access token."""
+        data = {
+            "grant_type": "refresh_token",
+            "client_id": client_id,
+            "refresh_token": refresh_token,
+        }
+
+        response = await self.http_client.post(self.token_url, data=data, headers=self.headers)
+
+        if response.status_code != status.HTTP_200_OK:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token",
+            )
+
+        return response.json()
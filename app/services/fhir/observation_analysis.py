@@ -0,0 +1,336 @@
+"""Statistics of numeric Observation time series, computed with NumPy over all matching readings."""
+
+from collections import Counter
+from datetime import UTC, datetime
+from typing import Any
+from urllib.parse import urlencode
+
+import numpy as np
+
+from app.config import settings
+from app.schemas.fhir_schemas import ObservationAnalysis, ObservationPoint
+from app.services.fhir.fhir_client import FhirClient, fhir_client
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+PERCENTILES = (5, 25, 50, 75, 95)
+# readings that never happened or were withdrawn
+EXCLUDED_STATUSES = {"entered-in-error", "cancelled"}
+
+# UCUM unit -> (base unit, factor, offset): value in the base unit = value * factor + offset.
+# Only dimension conversions; analyte-specific ones (e.g. glucose mg/dL -> mmol/L) are not made.
+UNIT_CONVERSIONS: dict[str, tuple[str, float, float]] = {
+    "g/L": ("g/L", 1.0, 0.0),
+    "g/dL": ("g/L", 10.0, 0.0),
+    "mg/dL": ("g/L", 0.01, 0.0),
+    "mg/L": ("g/L", 0.001, 0.0),
+    "ug/L": ("g/L", 1e-6, 0.0),
+    "mol/L": ("mol/L", 1.0, 0.0),
+    "mmol/L": ("mol/L", 1e-3, 0.0),
+    "umol/L": ("mol/L", 1e-6, 0.0),
+    "nmol/L": ("mol/L", 1e-9, 0.0),
+    "pmol/L": ("mol/L", 1e-12, 0.0),
+    "kg": ("kg", 1.0, 0.0),
+    "g": ("kg", 1e-3, 0.0),
+    "[lb_av]": ("kg", 0.45359237, 0.0),
+    "m": ("m", 1.0, 0.0),
+    "cm": ("m", 0.01, 0.0),
+    "mm": ("m", 0.001, 0.0),
+    "[in_i]": ("m", 0.0254, 0.0),
+    "Cel": ("Cel", 1.0, 0.0),
+    "[degF]": ("Cel", 5 / 9, -160 / 9),
+    "mm[Hg]": ("mm[Hg]", 1.0, 0.0),
+    "kPa": ("mm[Hg]", 7.500617, 0.0),
+    "%": ("%", 1.0, 0.0),
+    "1": ("%", 100.0, 0.0),
+}
+# spellings seen in `valueQuantity.unit` when no UCUM code is given
+UNIT_ALIASES = {
+    "mg/dl": "mg/dL",
+    "g/dl": "g/dL",
+    "mmol/l": "mmol/L",
+    "umol/l": "umol/L",
+    "µmol/l": "umol/L",
+    "kgs": "kg",
+    "lb": "[lb_av]",
+    "lbs": "[lb_av]",
+    "in": "[in_i]",
+    "°c": "Cel",
+    "degc": "Cel",
+    "°f": "[degF]",
+    "degf": "[degF]",
+    "mmhg": "mm[Hg]",
+}
+
+
+def _unit_of(quantity: dict) -> str | None:
+    unit = quantity.get("code") or quantity.get("unit")
+    if not isinstance(unit, str):
+        return None
+    return UNIT_ALIASES.get(unit.lower(), unit)
+
+
+def _epoch(value: Any) -> float | None:
+    """Seconds since the epoch of a FHIR date or dateTime (partial dates start the period)."""
+    if not isinstance(value, str) or len(value) < 4:
+        return None
+    if len(value) == 4:
+        value += "-01-01"
+    elif len(value) == 7:
+        value += "-01"
+    try:
+        instant = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=UTC)
+    return instant.timestamp()
+
+
+def _effective(observation: dict) -> str | None:
+    for name in ("effectiveDateTime", "effectiveInstant"):
+        if isinstance(observation.get(name), str):
+            return observation[name]
+    start = observation.get("effectivePeriod", {}).get("start")
+    return start if isinstance(start, str) else observation.get("issued")
+
+
+def _quantity(observation: dict, component_code: str | None) -> dict | None:
+    """The `valueQuantity` of the Observation, or of its component coded `component_code`."""
+    if component_code is None:
+        return observation.get("valueQuantity")
+    for component in observation.get("component", []):
+        codes = {coding.get("code") for coding in component.get("code", {}).get("coding", [])}
+        if component_code in codes:
+            return component.get("valueQuantity")
+    return None
+
+
+def _range_bound(observation: dict, name: str) -> float:
+    for reference_range in observation.get("referenceRange", [])[:1]:
+        value = reference_range.get(name, {}).get("value")
+        if isinstance(value, int | float):
+            return float(value)
+    return np.nan
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, per bucket, the point forming the largest triangle with
+    the previously kept point and the next bucket's average, so peaks and trends survive.
+    `x` must be sorted, and `threshold` at least 3.
+    """
+    if threshold < 3:
+        raise ValueError(f"LTTB keeps at least 3 points, not {threshold}")
+    size = len(x)
+    if threshold >= size:
+        return np.arange(size)
+
+    buckets = np.array_split(np.arange(1, size - 1), threshold - 2)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for index, bucket in enumerate(buckets):
+        following = buckets[index + 1] if index + 1 < len(buckets) else np.array([size - 1])
+        average_x, average_y = x[following].mean(), y[following].mean()
+        areas = np.abs(
+            (x[previous] - average_x) * (y[bucket] - y[previous])
+            - (x[previous] - x[bucket]) * (average_y - y[previous]),
+        )
+        previous = bucket[np.argmax(areas)]
+        selected[index + 1] = previous
+    return selected
+
+
+class ObservationAnalysisService:
+    """Summarizes every matching Observation of a patient instead of returning the raw Bundles.
+
+    All result pages are streamed; only the date, value, unit and reference range of each
+    reading are kept, as NumPy arrays. Values are converted to a single unit (the requested one,
+    else the most frequent), so the statistics and the downsampled series have a fixed size
+    however many readings exist.
+
+    Args:
+        client (FhirClient): Client used for the searches
+        max_entries (int): Maximum number of Observations read per analysis
+        max_bytes (int): Maximum size of the pages read per analysis
+    """
+
+    def __init__(
+        self,
+        client: FhirClient,
+        max_entries: int = settings.OBSERVATION_ANALYSIS_MAX_ENTRIES,
+        max_bytes: int = settings.OBSERVATION_ANALYSIS_MAX_BYTES,
+    ):
+        self.client = client
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    async def _search_path(
+        self,
+        patient_id: str,
+        code: str,
+        since: str | None,
+        until: str | None,
+    ) -> str:
+        params = [("patient", patient_id), ("code", code)]
+        if since:
+            params.append(("date", f"ge{since}"))
+        if until:
+            params.append(("date", f"le{until}"))
+        capabilities = await self.client.get_capabilities()
+        if capabilities is not None and capabilities.supports_search_param(
+            "Observation",
+            "_summary",
+        ):
+            params.append(("_summary", "data"))  # the narrative is never analyzed
+        return f"/Observation?{urlencode(params)}"
+
+    async def analyze(
+        self,
+        patient_id: str,
+        code: str,
+        component_code: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        unit: str | None = None,
+        low: float | None = None,
+        high: float | None = None,
+        max_points: int = settings.OBSERVATION_ANALYSIS_MAX_POINTS,
+    ) -> ObservationAnalysis:
+        if max_points < 3:
+            raise ValueError("max_points must be at least 3")
+
+        dates: list[str] = []
+        times: list[float] = []
+        values: list[float] = []
+        units: list[str | None] = []
+        lows: list[float] = []
+        highs: list[float] = []
+        skipped = 0
+        truncated = False
+
+        path = await self._search_path(patient_id, code, since, until)
+        async for page in self.client.iter_pages(path, self.max_entries, self.max_bytes):
+            truncated = page.truncated
+            for entry in page.entries:
+                observation = entry.get("resource", {})
+                if observation.get("resourceType") != "Observation":
+                    continue  # e.g. an OperationOutcome with search warnings
+                quantity = _quantity(observation, component_code) or {}
+                value = quantity.get("value")
+                date = _effective(observation)
+                instant = _epoch(date)
+                if (
+                    observation.get("status") in EXCLUDED_STATUSES
+                    or not isinstance(value, int | float)
+                    or date is None
+                    or instant is None
+                ):
+                    skipped += 1
+                    continue
+                dates.append(date)
+                times.append(instant)
+                values.append(float(value))
+                units.append(_unit_of(quantity))
+                lows.append(_range_bound(observation, "low"))
+                highs.append(_range_bound(observation, "high"))
+
+        target = UNIT_ALIASES.get(unit.lower(), unit) if unit else None
+        if target is None and units:
+            target = Counter(units).most_common(1)[0][0]
+        analysis = ObservationAnalysis(
+            code=code,
+            component_code=component_code,
+            unit=target,
+            skipped=skipped,
+            truncated=truncated,
+        )
+        if not values:
+            return analysis
+
+        converted, unconvertible = self._normalize(
+            np.array(values),
+            np.array(lows),
+            np.array(highs),
+            units,
+            target,
+        )
+        value_array, low_array, high_array = converted
+        keep = ~unconvertible
+        analysis.skipped += int(unconvertible.sum())
+        analysis.other_units = sorted(
+            {str(units[i]) for i in np.flatnonzero(unconvertible)},
+        )
+        if not keep.any():
+            return analysis
+
+        time_array = np.array(times)[keep]
+        value_array, low_array, high_array = value_array[keep], low_array[keep], high_array[keep]
+        kept_dates = [date for date, kept in zip(dates, keep, strict=True) if kept]
+        order = np.argsort(time_array, kind="stable")
+        time_array, value_array = time_array[order], value_array[order]
+        low_array, high_array = low_array[order], high_array[order]
+        if low is not None:
+            low_array = np.full_like(value_array, low)
+        if high is not None:
+            high_array = np.full_like(value_array, high)
+
+        def point(index: int) -> ObservationPoint:
+            return ObservationPoint(date=kept_dates[order[index]], value=float(value_array[index]))
+
+        analysis.count = len(value_array)
+        analysis.first = point(0)
+        analysis.latest = point(len(value_array) - 1)
+        analysis.min = point(int(np.argmin(value_array)))
+        analysis.max = point(int(np.argmax(value_array)))
+        analysis.mean = float(value_array.mean())
+        analysis.std = float(value_array.std())
+        analysis.percentiles = {
+            f"p{p}": float(v)
+            for p, v in zip(PERCENTILES, np.percentile(value_array, PERCENTILES), strict=True)
+        }
+        if np.ptp(time_array) > 0:
+            years = (time_array - time_array[0]) / SECONDS_PER_YEAR
+            analysis.slope_per_year = float(np.polyfit(years, value_array, 1)[0])
+        # comparisons with NaN (no range known) are False
+        with np.errstate(invalid="ignore"):
+            analysis.below_range = int((value_array < low_array).sum())
+            analysis.above_range = int((value_array > high_array).sum())
+        analysis.with_range = int((~np.isnan(low_array) | ~np.isnan(high_array)).sum())
+        analysis.series = [point(int(index)) for index in lttb(time_array, value_array, max_points)]
+        return analysis
+
+    @staticmethod
+    def _normalize(
+        values: np.ndarray,
+        lows: np.ndarray,
+        highs: np.ndarray,
+        units: list[str | None],
+        target: str | None,
+    ) -> tuple[tuple[np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+        """Convert values and ranges to `target`; also returns the mask of unconvertible ones."""
+        names = sorted({str(name) for name in units})
+        index = np.array([names.index(str(name)) for name in units])
+        factors = np.ones(len(names))
+        offsets = np.zeros(len(names))
+        convertible = np.zeros(len(names), dtype=bool)
+        to_base = UNIT_CONVERSIONS.get(target) if target is not None else None
+        for position, name in enumerate(names):
+            from_base = UNIT_CONVERSIONS.get(name)
+            if name == str(target):
+                convertible[position] = True
+            elif to_base is not None and from_base is not None and from_base[0] == to_base[0]:
+                # value * f1 + o1 = base = target * f2 + o2
+                factors[position] = from_base[1] / to_base[1]
+                offsets[position] = (from_base[2] - to_base[2]) / to_base[1]
+                convertible[position] = True
+
+        factor, offset = factors[index], offsets[index]
+        return (
+            (values * factor + offset, lows * factor + offset, highs * factor + offset),
+            ~convertible[index],
+        )
+
+
+observation_analysis_service = ObservationAnalysisService(fhir_client)
@@ -0,0 +1,101 @@
+import asyncio
+from typing import Any
+from urllib.parse import quote
+
+from app.config import settings
+from app.schemas.fhir_schemas import FhirProjection, PatientSummary, PatientSummarySection
+from app.services.fhir.fhir_client import FhirClient, fhir_client
+
+# section name -> search path template; every search is limited and sorted newest first
+# where the resource has a sensible date to sort on
+SUMMARY_SEARCHES: dict[str, str] = {
+    "conditions": "/Condition?patient={patient_id}",
+    "medications": "/MedicationRequest?patient={patient_id}&_sort=-authoredon",
+    "allergies": "/AllergyIntolerance?patient={patient_id}",
+    "immunizations": "/Immunization?patient={patient_id}&_sort=-date",
+    "encounters": "/Encounter?patient={patient_id}&_sort=-date",
+    "observations": "/Observation?patient={patient_id}&_sort=-date",
+}
+
+# resources in a summary only need their clinically relevant elements
+DEFAULT_PROJECTION = FhirProjection(preset="clinical-minimal")
+
+
+class PatientSummaryService:
+    """Builds a patient overview by running the per-resource searches concurrently.
+
+    Latency is roughly that of the slowest search instead of the sum of all of them. Each
+    search runs under a deadline, and failures are reported per section instead of failing
+    the whole summary. Resources are projected, by default to the clinical-minimal elements.
+
+    Args:
+        client (FhirClient): Client used for the searches
+        concurrency (int): Maximum number of searches in flight
+        timeout (float): Deadline of a single search in seconds
+        max_entries (int): Maximum number of resources per section
+    """
+
+    def __init__(
+        self,
+        client: FhirClient,
+        concurrency: int = settings.PATIENT_SUMMARY_CONCURRENCY,
+        timeout: float = settings.PATIENT_SUMMARY_TIMEOUT,
+        max_entries: int = settings.PATIENT_SUMMARY_MAX_ENTRIES,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_entries = max_entries
+
+    def _describe_error(self, e: BaseException) -> str:
+        if isinstance(e, TimeoutError):
+            return f"Timed out after {self.timeout} s"
+        return getattr(e, "message", None) or str(e) or type(e).__name__
+
+    async def _fetch(
+        self,
+        semaphore: asyncio.Semaphore,
+        path: str,
+        projection: FhirProjection,
+    ) -> Any:
+        async with semaphore:
+            async with asyncio.timeout(self.timeout):
+                response = await self.client.request("GET", path, projection=projection)
+        return response.response
+
+    async def get_summary(
+        self,
+        patient_id: str,
+        projection: FhirProjection | None = None,
+    ) -> PatientSummary:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        patient_id = quote(patient_id, safe="")
+        paths = {"patient": f"/Patient/{patient_id}"}
+        for name, template in SUMMARY_SEARCHES.items():
+            paths[name] = f"{template.format(patient_id=patient_id)}&_count={self.max_entries}"
+
+        projection = projection or DEFAULT_PROJECTION
+        results = await asyncio.gather(
+            *(self._fetch(semaphore, path, projection) for path in paths.values()),
+            return_exceptions=True,
+        )
+
+        summary = PatientSummary()
+        for name, result in zip(paths, results):
+            if isinstance(result, BaseException):
+                summary.errors[name] = self._describe_error(result)
+            elif name == "patient":
+                summary.patient = result
+            else:
+                summary.sections[name] = PatientSummarySection(
+                    total=result.get("total"),
+                    resources=[
+                        entry["resource"]
+                        for entry in result.get("entry", [])[: self.max_entries]
+                        if "resource" in entry
+                    ],
+                )
+        return summary
+
+
+patient_summary_service = PatientSummaryService(fhir_client)
@@ -0,0 +1,220 @@
+"""Field projection for FHIR responses.
+
+A projection keeps only the requested elements of each resource. Where the server advertises
+support for `_elements`/`_summary` in its CapabilityStatement, the projection is pushed to the
+server so less data crosses the wire; the result is then always pruned locally with a compiled
+field-path filter, which also handles nested paths and servers that ignore the parameters.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+from app.schemas.fhir_schemas import FhirProjection
+
+# Elements every projected resource keeps, as the spec requires for `_elements`.
+MANDATORY_ELEMENTS = ("resourceType", "id")
+
+# Element paths kept per resource type by each preset. `[x]` marks a choice element
+# (`value[x]` matches `valueQuantity`, `valueString`, ...).
+PRESETS: dict[str, dict[str, tuple[str, ...]]] = {
+    "clinical-minimal": {
+        "Observation": (
+            "status",
+            "category",
+            "code",
+            "subject",
+            "encounter",
+            "effective[x]",
+            "issued",
+            "value[x]",
+            "dataAbsentReason",
+            "interpretation",
+            "referenceRange",
+            "component",
+        ),
+        "Condition": (
+            "clinicalStatus",
+            "verificationStatus",
+            "category",
+            "severity",
+            "code",
+            "subject",
+            "onset[x]",
+            "abatement[x]",
+            "recordedDate",
+        ),
+        "MedicationRequest": (
+            "status",
+            "intent",
+            "medication[x]",
+            "subject",
+            "authoredOn",
+            "dosageInstruction",
+            "reasonCode",
+        ),
+        "MedicationStatement": ("status", "medication[x]", "subject", "effective[x]", "dosage"),
+        "Medication": ("code", "status", "form", "ingredient"),
+        "AllergyIntolerance": (
+            "clinicalStatus",
+            "verificationStatus",
+            "type",
+            "category",
+            "criticality",
+            "code",
+            "patient",
+            "onset[x]",
+            "reaction",
+        ),
+        "Immunization": (
+            "status",
+            "vaccineCode",
+            "patient",
+            "occurrence[x]",
+            "lotNumber",
+            "doseQuantity",
+        ),
+        "Encounter": ("status", "class", "type", "subject", "period", "reasonCode"),
+        "Patient": (
+            "identifier",
+            "active",
+            "name",
+            "telecom",
+            "gender",
+            "birthDate",
+            "deceased[x]",
+            "address",
+        ),
+        "FamilyMemberHistory": ("status", "patient", "relationship", "sex", "condition"),
+        "DocumentReference": (
+            "status",
+            "type",
+            "category",
+            "subject",
+            "date",
+            "description",
+            "content",
+        ),
+    },
+    # Drops the narrative only, the local equivalent of `_summary=data`.
+    "no-narrative": {},
+}
+
+type FieldTree = dict[str, "FieldTree | None"]
+
+
+@lru_cache(maxsize=256)
+def compile_field_paths(paths: tuple[str, ...]) -> FieldTree:
+    """Compile dotted element paths into a tree; a `None` leaf keeps the whole element.
+
+    Example:
+        ("code.coding.code", "status") -> {"code": {"coding": {"code": None}}, "status": None}
+    """
+    tree: FieldTree = {}
+    for path in sorted(paths, key=len):
+        node = tree
+        *parents, leaf = path.split(".")
+        for name in parents:
+            child = node.setdefault(name, {})
+            if child is None:  # an ancestor is already kept whole
+                break
+            node = child
+        else:
+            node[leaf] = None
+    return tree
+
+
+def _match(tree: FieldTree, key: str) -> tuple[bool, "FieldTree | None"]:
+    if key in tree:
+        return True, tree[key]
+    for name, subtree in tree.items():
+        prefix = name.removesuffix("[x]")
+        if (
+            prefix != name
+            and key.startswith(prefix)
+            and key[len(prefix) : len(prefix) + 1].isupper()
+        ):
+            return True, subtree
+    return False, None
+
+
+def prune(value: Any, tree: FieldTree) -> Any:
+    """Return a copy of `value` holding only the elements selected by `tree`."""
+    if isinstance(value, list):
+        return [prune(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    pruned = {}
+    for key, item in value.items():
+        matched, subtree = _match(tree, key)
+        if matched:
+            pruned[key] = item if subtree is None else prune(item, subtree)
+    return pruned
+
+
+class Projector:
+    """A projection compiled for one request.
+
+    Args:
+        projection: Requested preset and/or element paths
+        resource_type: Resource type the request targets, used for explicit element paths
+    """
+
+    def __init__(self, projection: FhirProjection, resource_type: str | None):
+        self.resource_type = resource_type
+        self.drop_narrative = projection.preset == "no-narrative"
+        self.preset = PRESETS.get(projection.preset or "", {})
+        self.elements = tuple(projection.elements or ())
+
+    def paths_for(self, resource_type: str | None) -> tuple[str, ...] | None:
+        """Element paths kept for `resource_type`, or None to keep every element."""
+        paths = self.preset.get(resource_type or "", ())
+        if self.elements and resource_type == self.resource_type:
+            paths = (*paths, *self.elements)
+        if not paths:
+            return None
+        return (*MANDATORY_ELEMENTS, *paths)
+
+    def server_parameter(self) -> tuple[str, str] | None:
+        """The `_elements` or `_summary` parameter that can safely be pushed to the server.
+
+        `_elements` only accepts top-level names and servers disagree on how choice elements are
+        spelled, so when that cannot be expressed exactly `_summary=data` is used to at least
+        strip the narrative (if the projection does not keep it).
+        """
+        paths = self.paths_for(self.resource_type)
+        if paths is None:
+            return ("_summary", "data") if self.drop_narrative else None
+
+        names = dict.fromkeys(path.split(".", 1)[0] for path in paths if path != "resourceType")
+        if not any(name.endswith("[x]") for name in names):
+            return "_elements", ",".join(names)
+        if "text" not in names:
+            return "_summary", "data"
+        return None
+
+    def _apply_resource(self, resource: Any) -> Any:
+        if not isinstance(resource, dict):
+            return resource
+        paths = self.paths_for(resource.get("resourceType"))
+        if paths is not None:
+            return prune(resource, compile_field_paths(paths))
+        if self.drop_narrative and "text" in resource:
+            return {key: value for key, value in resource.items() if key != "text"}
+        return resource
+
+    def apply(self, data: Any) -> Any:
+        """Project a resource, or every resource of a Bundle. The input is never modified."""
+        if not isinstance(data, dict) or data.get("resourceType") != "Bundle":
+            return self._apply_resource(data)
+
+        if "entry" not in data:
+            return data
+        bundle = dict(data)
+        bundle["entry"] = [
+            {**entry, "resource": self._apply_resource(entry["resource"])}
+            if isinstance(entry, dict) and "resource" in entry
+            else entry
+            for entry in data.get("entry", [])
+        ]
+        return bundle
@@ -0,0 +1,268 @@
+"""Load protection for a FHIR host: adaptive concurrency limit, circuit breaker and backoff."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager, suppress
+from typing import Literal, LiteralString, cast
+
+from fastapi import status
+
+from app.mcp.exceptions import APICustomError
+from app.schemas.error_codes import ErrorCode
+
+type CircuitState = Literal["closed", "open", "half_open"]
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# The limit is cut at most once per interval, so a burst of 429s caused by the same overload
+# does not collapse it to the minimum.
+DECREASE_INTERVAL = 1.0
+
+
+def rate_limit_error(message: str, retry_after: float | None = None) -> APICustomError:
+    """Error returned for a request that was shed (or rate limited) instead of being sent."""
+    if retry_after is not None:
+        message = f"{message} Retry in {retry_after:.1f} s."
+    return APICustomError(
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        code=cast(LiteralString, ErrorCode.RATE_LIMIT_EXCEEDED.value),
+        message=message,
+        ctx={"retry_after": retry_after},
+    )
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter.
+
+    The limit grows by one per limit's worth of successful requests (additive increase) and is
+    multiplied by `backoff_ratio` when the server signals overload (multiplicative decrease).
+    Requests over the limit wait in a FIFO queue; they are shed when the queue is full or the
+    wait exceeds `queue_timeout`.
+
+    Args:
+        initial_limit: Starting concurrency limit
+        min_limit: Lower bound of the limit
+        max_limit: Upper bound of the limit
+        max_queue: Maximum number of waiting requests
+        queue_timeout: Maximum seconds a request waits for a slot
+        backoff_ratio: Factor applied to the limit on overload
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        backoff_ratio: float = 0.5,
+    ):
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff_ratio = backoff_ratio
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._last_decrease = 0.0
+
+        self.rejected = 0
+        self.overloads = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> None:
+        """Wait for a slot; raises a rate-limit error if the request is shed."""
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            if pause > self.queue_timeout:
+                self.rejected += 1
+                raise rate_limit_error("FHIR server asked to slow down.", pause)
+            await asyncio.sleep(pause)
+
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise rate_limit_error("Too many FHIR requests queued.", self.queue_timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over just as we gave up
+            else:
+                with suppress(ValueError):
+                    self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                self.rejected += 1
+                raise rate_limit_error(
+                    "Timed out waiting for a FHIR request slot.",
+                    self.queue_timeout,
+                ) from None
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        self.overloads += 1
+        now = time.monotonic()
+        if now - self._last_decrease >= DECREASE_INTERVAL:
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back new requests for `seconds` (e.g. as requested by `Retry-After`)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+            "paused_for": round(max(self.paused_until - time.monotonic(), 0.0), 2),
+        }
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host after `failure_threshold` consecutive failures.
+
+    While open, requests are rejected for `reset_timeout` seconds; after that the breaker is
+    half-open: a single probe request is let through, whose outcome closes or reopens it, and
+    the others are rejected until it is over.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state: CircuitState = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.opens = 0
+        self.rejected = 0
+
+    def check(self) -> bool:
+        """Raise a rate-limit error unless the request may be sent; True if it is the probe.
+
+        The caller must call `end_probe` once the probe is over, whatever its outcome.
+        """
+        if self.state == "closed":
+            return False
+        if self.state == "open":
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise rate_limit_error("FHIR server is failing, requests are paused.", remaining)
+            self.state = "half_open"
+        if self.probing:
+            self.rejected += 1
+            raise rate_limit_error("FHIR server is recovering, requests are paused.")
+        self.probing = True
+        return True
+
+    def end_probe(self) -> None:
+        """Let another probe through if the breaker is still half-open (e.g. it was cancelled)."""
+        self.probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or (
+            self.state == "closed" and self.failures >= self.failure_threshold
+        ):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+    def stats(self) -> dict[str, str | int]:
+        return {
+            "state": self.state,
+            "probing": self.probing,
+            "failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+
+class HostGuard:
+    """Limiter and circuit breaker protecting one FHIR host."""
+
+    def __init__(self, limiter: AdaptiveLimiter, breaker: CircuitBreaker):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.retries = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[None]:
+        probe = self.breaker.check()
+        try:
+            await self.limiter.acquire()
+            try:
+                yield
+            finally:
+                self.limiter.release()
+        finally:
+            if probe:
+                self.breaker.end_probe()
+
+    def record_success(self) -> None:
+        self.breaker.record_success()
+        self.limiter.on_success()
+
+    def record_failure(self, overload: bool) -> None:
+        """A server error or transport failure; `overload` if it also signals congestion."""
+        self.breaker.record_failure()
+        if overload:
+            self.limiter.on_overload()
+
+    def record_throttled(self) -> None:
+        """A 429: the server is healthy but wants less traffic, so only the limit shrinks."""
+        self.limiter.on_overload()
+
+    def stats(self) -> dict:
+        return {
+            **self.limiter.stats(),
+            "retries": self.retries,
+            "circuit": self.breaker.stats(),
+        }
@@ -0,0 +1,240 @@
+"""FHIR Subscriptions (rest-hook) that push server-side changes to the cache and the mirror."""
+
+import asyncio
+import hmac
+import secrets
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+import orjson
+
+from app.services.fhir.utils import get_next_link, parse_resource_path
+
+if TYPE_CHECKING:
+    from app.services.fhir.fhir_client import FhirClient
+
+# Notification Bundles (R4B/R5 topic-based) carry these next to the changed resources.
+NOTIFICATION_METADATA_TYPES = {"SubscriptionStatus", "Parameters"}
+
+# `meta.tag` of the Subscriptions created by this server
+SUBSCRIPTION_TAG = {"system": "urn:fhir-mcp-server", "code": "cache-notifications"}
+# statuses of Subscriptions the server gave up delivering to
+FAILED_STATUSES = {"error", "off"}
+
+
+def _entry_reference(entry: dict) -> tuple[str | None, str | None]:
+    """Type and id of the resource a notification Bundle entry is about."""
+    resource = entry.get("resource")
+    if isinstance(resource, dict) and resource.get("resourceType") and resource.get("id"):
+        return resource["resourceType"], resource["id"]
+    url = entry.get("request", {}).get("url")
+    if isinstance(url, str):
+        resource_type, resource_id = parse_resource_path(url)
+        if resource_id is not None:
+            return resource_type, resource_id
+    full_url = entry.get("fullUrl")
+    if isinstance(full_url, str):
+        return parse_resource_path("/".join(full_url.split("?", 1)[0].split("/")[-2:]))
+    return None, None
+
+
+class SubscriptionManager:
+    """Keeps one rest-hook Subscription per resource type and applies its notifications.
+
+    Each server process has its own Subscriptions: they post to `{endpoint}/{instance_id}/{type}`
+    with a random bearer secret that the notification route checks, and are deleted by `stop`
+    when the process shuts down. Notifications are accepted in the R4 forms (an empty ping, or
+    the changed resource PUT to `{endpoint}/{type}/{type}/{id}`) and as Bundles (R4B/R5
+    notifications, history Bundles). Cached responses of a changed type are dropped, and the
+    mirror takes the new version of the resources it holds or covers; a ping, which does not
+    say what changed, drops the whole type.
+
+    Subscriptions left over by a process that did not shut down cleanly are deleted on start
+    once the server has marked them failed (`error` or `off`); those of other running processes
+    are left alone.
+
+    Args:
+        client (FhirClient): Client used to manage the Subscriptions
+        endpoint (str): Public URL of the notification route, as seen by the FHIR server
+        resource_types (list[str]): Types to subscribe to
+    """
+
+    def __init__(self, client: "FhirClient", endpoint: str, resource_types: list[str]):
+        self.client = client
+        self.endpoint = endpoint.rstrip("/")
+        self.resource_types = resource_types
+        self.instance_id = secrets.token_hex(8)
+        self.secret = secrets.token_urlsafe(32)
+        self.subscription_ids: dict[str, str] = {}
+        self._task: asyncio.Task | None = None
+
+        self.notifications = 0
+        self.changes = 0
+        self.rejected = 0
+        self.last_error: str | None = None
+
+    def start(self) -> None:
+        """Create the Subscriptions in the background (no-op if already done or running)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._subscribe_all())
+
+    async def stop(self) -> None:
+        """Delete the Subscriptions created by `start`."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for resource_type, subscription_id in list(self.subscription_ids.items()):
+            try:
+                await self.client.send(
+                    "DELETE",
+                    f"{self.client.base_url}/Subscription/{subscription_id}",
+                )
+            except Exception as e:
+                self._record_error(e)
+            del self.subscription_ids[resource_type]
+
+    def _record_error(self, e: Exception) -> None:
+        self.last_error = getattr(e, "message", None) or str(e) or type(e).__name__
+
+    async def _subscribe_all(self) -> None:
+        try:
+            await self._delete_failed()
+        except Exception as e:
+            self._record_error(e)
+        for resource_type in self.resource_types:
+            try:
+                await self._subscribe(resource_type)
+            except Exception as e:
+                self._record_error(e)
+
+    async def _delete_failed(self) -> None:
+        """Delete our endpoint's Subscriptions the FHIR server can no longer deliver to."""
+        tag = f"{SUBSCRIPTION_TAG['system']}|{SUBSCRIPTION_TAG['code']}"
+        url: str | None = (
+            f"{self.client.base_url}/Subscription?{urlencode({'_tag': tag, '_count': 100})}"
+        )
+        while url is not None:
+            bundle = orjson.loads((await self.client.send("GET", url)).content)
+            for entry in bundle.get("entry", []):
+                stale = entry.get("resource", {})
+                endpoint = stale.get("channel", {}).get("endpoint", "")
+                if (
+                    stale.get("id")
+                    and endpoint.startswith(f"{self.endpoint}/")
+                    and stale.get("status") in FAILED_STATUSES
+                ):
+                    await self.client.send(
+                        "DELETE",
+                        f"{self.client.base_url}/Subscription/{stale['id']}",
+                    )
+            url = get_next_link(bundle)
+
+    async def _subscribe(self, resource_type: str) -> None:
+        response = await self.client.send(
+            "POST",
+            f"{self.client.base_url}/Subscription",
+            json={
+                "resourceType": "Subscription",
+                "meta": {"tag": [SUBSCRIPTION_TAG]},
+                "status": "requested",
+                "reason": "Keep the MCP server's cached resources current",
+                "criteria": f"{resource_type}?",
+                "channel": {
+                    "type": "rest-hook",
+                    "endpoint": f"{self.endpoint}/{self.instance_id}/{resource_type}",
+                    "payload": "application/fhir+json",
+                    "header": [f"Authorization: Bearer {self.secret}"],
+                },
+            },
+        )
+        if subscription_id := response.json().get("id"):
+            self.subscription_ids[resource_type] = subscription_id
+
+    def is_subscriber(self, path: str) -> bool:
+        """True if a notification to `{endpoint}/{path}` is for this process's Subscriptions."""
+        return path.partition("/")[0] == self.instance_id
+
+    def is_authorized(self, authorization: str | None) -> bool:
+        """True if the notification carries the secret of our Subscriptions."""
+        authorized = authorization is not None and hmac.compare_digest(
+            authorization.encode(),
+            f"Bearer {self.secret}".encode(),
+        )
+        if not authorized:
+            self.rejected += 1
+        return authorized
+
+    async def handle(self, path: str, body: bytes) -> int:
+        """Apply one notification received at `{endpoint}/{path}`.
+
+        Returns:
+            The number of changed resources it reported (0 for a ping)
+        """
+        _, _, path = path.partition("/")  # the instance id, checked by `is_subscriber`
+        self.notifications += 1
+        subscribed_type, _ = parse_resource_path(path)
+        payload = orjson.loads(body) if body.strip() else None
+        if payload is not None and not isinstance(payload, dict):
+            raise ValueError("Notification body is not a FHIR resource")
+
+        changed: dict[tuple[str, str], dict] = {}
+        deleted: set[tuple[str, str]] = set()
+        if payload is None:
+            # a ping only says that something of the subscribed type changed
+            if subscribed_type is not None:
+                self._invalidate(subscribed_type, None)
+            return 0
+        if payload.get("resourceType") == "Bundle":
+            entries = payload.get("entry", [])
+        else:
+            entries = [{"resource": payload}]
+        for entry in entries:
+            resource_type, resource_id = _entry_reference(entry)
+            if (
+                resource_type is None
+                or resource_id is None
+                or resource_type in NOTIFICATION_METADATA_TYPES
+            ):
+                continue
+            key = (resource_type, resource_id)
+            if key in changed or key in deleted:
+                continue  # history Bundles list the newest version first
+            if entry.get("request", {}).get("method") == "DELETE" or "resource" not in entry:
+                deleted.add(key)
+            else:
+                changed[key] = entry["resource"]
+
+        for resource_type, resource_id in changed.keys() | deleted:
+            self._invalidate(resource_type, resource_id)
+        mirror = self.client.mirror
+        if mirror is not None and (changed or deleted):
+            principal = await self.client.principal()
+            for resource_type in {key[0] for key in changed.keys() | deleted}:
+                await mirror.run(
+                    mirror.apply_notification,
+                    principal,
+                    resource_type,
+                    [resource for key, resource in changed.items() if key[0] == resource_type],
+                    [key[1] for key in deleted if key[0] == resource_type],
+                )
+        self.changes += len(changed) + len(deleted)
+        return len(changed) + len(deleted)
+
+    def _invalidate(self, resource_type: str, resource_id: str | None) -> None:
+        """Drop the cached responses a change may affect; the mirror only for unknown changes."""
+        if self.client.cache is not None:
+            self.client.cache.invalidate(resource_type, resource_id)
+        if resource_id is None and self.client.mirror is not None:
+            self.client.mirror.submit(self.client.mirror.invalidate, resource_type)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "subscriptions": len(self.subscription_ids),
+            "notifications": self.notifications,
+            "changes": self.changes,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,122 @@
+"""Encrypted on-disk cache of OAuth access tokens, shared by server processes on one machine.
+
+In stdio mode every client launch starts a new server process; with the cache it reuses the
+token a previous (or sibling) process obtained instead of doing its own OAuth exchange.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime
+from pathlib import Path
+
+import orjson
+from cryptography.fernet import InvalidToken
+from filelock import FileLock, Timeout
+
+from app.services.fhir.models import Token
+from app.utils.config_utils import FernetDecryptorField
+from app.utils.token_utils import is_token_expired
+
+
+class TokenCache:
+    """Access tokens persisted in one Fernet-encrypted file.
+
+    Every read and write happens under an inter-process file lock, and `locked()` lets a token
+    manager hold that lock around its token request, so processes starting together share a
+    single OAuth exchange. An unreadable file (other master key, corrupted) counts as empty.
+
+    Args:
+        path: Cache file; the lock file is created next to it
+        cipher: Encrypts the file with the master key
+        lock_timeout: Seconds to wait for the file lock
+    """
+
+    def __init__(self, path: Path, cipher: FernetDecryptorField, lock_timeout: float):
+        self.path = path
+        self.cipher = cipher
+        self.lock_timeout = lock_timeout
+        # not thread-local: the lock is acquired in a worker thread and released in the loop
+        self._file_lock = FileLock(f"{path}.lock", thread_local=False)
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def key(host: str, client_id: str) -> str:
+        """Cache key of a client on a host; neither is stored in clear."""
+        return hashlib.sha256(f"{host}\0{client_id}".encode()).hexdigest()
+
+    @asynccontextmanager
+    async def locked(self) -> AsyncGenerator[None]:
+        """Hold the cache lock, across this process's tasks and other processes.
+
+        If the file lock cannot be taken in time the body runs anyway: a stuck process must not
+        block authentication, and writes stay atomic without the lock.
+        """
+        async with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                await asyncio.to_thread(self._file_lock.acquire, timeout=self.lock_timeout)
+                acquired = True
+            except (Timeout, OSError):
+                acquired = False
+            try:
+                yield
+            finally:
+                if acquired:
+                    self._file_lock.release()
+
+    def load(self, key: str) -> Token | None:
+        """The cached token for `key`, or None if there is none or it has expired."""
+        entry = self._read().get(key) or {}
+        expires_at = _expires_at(entry)
+        if expires_at is None or is_token_expired(expires_at):
+            return None
+        access_token = entry.get("access_token")
+        return Token(access_token, expires_at) if isinstance(access_token, str) else None
+
+    def store(self, key: str, token: Token) -> None:
+        """Save `token` under `key`, dropping expired entries. Write failures are ignored."""
+        if token.access_token is None or token.expires_at is None:
+            return
+        entries = {
+            other: entry
+            for other, entry in self._read().items()
+            if other != key and not is_token_expired(_expires_at(entry))
+        }
+        entries[key] = {
+            "access_token": token.access_token,
+            "expires_at": token.expires_at.isoformat(),
+        }
+        with suppress(OSError):
+            self._write(self.cipher.encrypt(orjson.dumps(entries)))
+
+    def _read(self) -> dict:
+        try:
+            data = orjson.loads(self.cipher.decrypt(self.path.read_bytes()))
+        except (OSError, InvalidToken, orjson.JSONDecodeError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self, content: bytes) -> None:
+        """Replace the file atomically, readable by the owner only."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+
+def _expires_at(entry: object) -> datetime | None:
+    value = entry.get("expires_at") if isinstance(entry, dict) else None
+    if isinstance(value, str):
+        with suppress(ValueError):
+            return datetime.fromisoformat(value)
+    return None
@@ -1,19 +1,37 @@
+import asyncio
+import time
 from abc import ABC
+from contextlib import suppress
+from typing import Any
 
 from app.config import settings
 from app.services.fhir.models import AuthMethod, Token
 from app.services.fhir.oauth_client import OAuthClient
+from app.services.fhir.token_cache import TokenCache
 from app.utils.token_utils import (
     build_authorization_url,
     calculate_token_expiry,
     is_token_expired,
+    seconds_until_refresh,
     should_refresh_token,
     validate_token_response,
 )
 
+# Lower bound between two refreshes, so short-lived tokens do not hammer the token endpoint.
+REFRESH_MIN_INTERVAL = 5.0
+
 
 class TokenLifecycleMixin(ABC):
-    """Mixin for token lifecycle management."""
+    """Mixin for token lifecycle management.
+
+    A token that is still valid is returned immediately. Once it enters the refresh window it
+    is renewed by a background task (also scheduled ahead of time after every refresh), so
+    callers only wait for the OAuth server when there is no usable token at all. Refreshes are
+    serialized by a lock: concurrent callers share a single token request. With a token cache,
+    a token still valid in the cache (saved by an earlier or a sibling process) is reused.
+    In the authorization code flow a token can only be renewed with a refresh token, so
+    without one nothing is refreshed ahead of time.
+    """
 
     def _process_token_response(self, token_data: dict) -> None:
         validate_token_response(token_data)
@@ -21,6 +39,14 @@ class TokenLifecycleMixin(ABC):
         self.token.access_token = token_data["access_token"]
         expires_in = token_data.get("expires_in", 3600)
         self.token.expires_at = calculate_token_expiry(expires_in)
+        # servers may keep the refresh token and not send it again
+        self.token.refresh_token = token_data.get("refresh_token", self.token.refresh_token)
+
+    def _can_refresh(self) -> bool:
+        """Whether a new token can be fetched without the user signing in again."""
+        if self.auth_method != AuthMethod.AUTHORIZATION_CODE:
+            return True
+        return self.token.refresh_token is not None or self.authorization_code is not None
 
     def _is_expired(self) -> bool:
         return is_token_expired(self.token.expires_at)
@@ -28,37 +54,139 @@ class TokenLifecycleMixin(ABC):
     def _should_refresh_token(self) -> bool:
         return should_refresh_token(self.token.expires_at)
 
-    def get_token(self) -> str:
-        if self.token.access_token is None or self._should_refresh_token():
-            self._fetch_token()
+    async def get_token(self) -> str:
+        if self.token.access_token is not None and not self._is_expired():
+            if self._should_refresh_token():
+                self._start_background_refresh()
+            return self.token.access_token
+
+        self.blocked_calls += 1
+        await self._refresh()
         assert self.token.access_token is not None
         return self.token.access_token
 
+    async def _refresh(self) -> None:
+        async with self._refresh_lock:
+            # another caller may have refreshed the token while we waited for the lock
+            if self.token.access_token is not None and not self._should_refresh_token():
+                return
+
+            started = time.perf_counter()
+            self._not_before = time.monotonic() + REFRESH_MIN_INTERVAL
+            try:
+                if self.token_cache is not None:
+                    await self._load_or_fetch_token(self.token_cache)
+                else:
+                    await self._fetch_token()
+            except Exception as e:
+                self.refresh_failures += 1
+                self.last_refresh_error = f"{type(e).__name__}: {e}"
+                raise
+
+            latency = time.perf_counter() - started
+            self.refreshes += 1
+            self.refresh_latency_total += latency
+            self.refresh_latency_max = max(self.refresh_latency_max, latency)
+            self.last_refresh_latency = latency
+            self.last_refresh_error = None
+        self._schedule_refresh()
+
+    async def _load_or_fetch_token(self, token_cache: TokenCache) -> None:
+        key = token_cache.key(self.base_url, self.client_id)
+        async with token_cache.locked():
+            cached = token_cache.load(key)
+            if cached is not None and not should_refresh_token(cached.expires_at):
+                self.token = cached
+                self.cache_hits += 1
+                return
+            await self._fetch_token()
+            token_cache.store(key, self.token)
+
+    def _start_background_refresh(self) -> None:
+        running = self._refresh_task is not None and not self._refresh_task.done()
+        if running or time.monotonic() < self._not_before or not self._can_refresh():
+            return
+        self.background_refreshes += 1
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        # failures are counted in `_refresh`; the current token stays in use until it expires
+        with suppress(Exception):
+            await self._refresh()
+
+    def _schedule_refresh(self) -> None:
+        """Start a background refresh when the token enters its refresh window."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if not self._can_refresh():
+            return
+        delay = max(seconds_until_refresh(self.token.expires_at), REFRESH_MIN_INTERVAL)
+        self._refresh_timer = asyncio.get_running_loop().call_later(
+            delay,
+            self._start_background_refresh,
+        )
+
+    def close(self) -> None:
+        """Stop background refreshing (the manager is being discarded)."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "background_refreshes": self.background_refreshes,
+            "blocked_calls": self.blocked_calls,
+            "cache_hits": self.cache_hits,
+            "last_refresh_latency": self.last_refresh_latency,
+            "avg_refresh_latency": (
+                self.refresh_latency_total / self.refreshes if self.refreshes else None
+            ),
+            "max_refresh_latency": self.refresh_latency_max,
+            "last_refresh_error": self.last_refresh_error,
+        }
+
 
 class TokenFetcherMixin(ABC):
     """Mixin for token fetching logic."""
 
-    def _fetch_token(self) -> None:
+    async def _fetch_token(self) -> None:
         if self.auth_method == AuthMethod.CLIENT_CREDENTIALS:
-            self._fetch_client_credentials_token()
+            await self._fetch_client_credentials_token()
         elif self.auth_method == AuthMethod.AUTHORIZATION_CODE:
-            self._fetch_authorization_code_token()
+            await self._fetch_authorization_code_token()
         else:
             raise ValueError(f"Unsupported authentication method: {self.auth_method}")
 
-    def _fetch_client_credentials_token(self) -> None:
-        token_data = self.oauth_client.exchange_client_credentials(
+    async def _fetch_client_credentials_token(self) -> None:
+        token_data = await self.oauth_client.exchange_client_credentials(
             self.client_id,
             self.client_secret,
         )
         self._process_token_response(token_data)
 
-    def _fetch_authorization_code_token(self) -> None:
-        token_data = self.oauth_client.exchange_authorization_code(
-            self.client_id,
-            self.authorization_code,
-            self.redirect_uri,
-        )
+    async def _fetch_authorization_code_token(self) -> None:
+        """Renew with the refresh token if there is one, else redeem the authorization code.
+
+        A code can only be redeemed once, so it is forgotten as soon as it has been sent.
+        """
+        if self.token.refresh_token is not None:
+            token_data = await self.oauth_client.exchange_refresh_token(
+                self.client_id,
+                self.token.refresh_token,
+            )
+        else:
+            code, self.authorization_code = self.authorization_code, None
+            token_data = await self.oauth_client.exchange_authorization_code(
+                self.client_id,
+                code,
+                self.redirect_uri,
+            )
         self._process_token_response(token_data)
 
 
@@ -78,8 +206,12 @@ class AuthorizationCodeMixin(ABC):
         )
 
     def set_authorization_code(self, code: str) -> None:
-        """Set the authorization code for token exchange."""
+        """Set the authorization code for token exchange.
+
+        The user signed in again, so the current token (and refresh token) is replaced too.
+        """
         self.authorization_code = code
+        self.token = Token()
 
 
 class AccessTokenManager(TokenLifecycleMixin, TokenFetcherMixin, AuthorizationCodeMixin):
@@ -95,6 +227,9 @@ class AccessTokenManager(TokenLifecycleMixin, TokenFetcherMixin, AuthorizationCo
         auth_method (AuthMethod): The authentication method to use
         redirect_uri (str, optional): Required for authorization code flow
         authorization_code (str, optional): Required for authorization code flow
+        token (Token, optional): Initial token
+        oauth_client (OAuthClient, optional): Token endpoint client, shareable between managers
+        token_cache (TokenCache, optional): On-disk cache the token is loaded from and saved to
     """
 
     def __init__(
@@ -106,6 +241,8 @@ class AccessTokenManager(TokenLifecycleMixin, TokenFetcherMixin, AuthorizationCo
         redirect_uri: str | None = None,
         authorization_code: str | None = None,
         token: Token | None = None,
+        oauth_client: OAuthClient | None = None,
+        token_cache: TokenCache | None = None,
     ):
         self.client_id = client_id
         self.client_secret = client_secret
@@ -114,4 +251,20 @@ class AccessTokenManager(TokenLifecycleMixin, TokenFetcherMixin, AuthorizationCo
         self.redirect_uri = redirect_uri
         self.authorization_code = authorization_code
         self.token = token if token else Token()
-        self.oauth_client = OAuthClient(base_url)
+        self.oauth_client = oauth_client or OAuthClient(base_url)
+        self.token_cache = token_cache
+
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._refresh_timer: asyncio.TimerHandle | None = None
+        self._not_before = 0.0
+
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.background_refreshes = 0
+        self.blocked_calls = 0
+        self.cache_hits = 0
+        self.refresh_latency_total = 0.0
+        self.refresh_latency_max = 0.0
+        self.last_refresh_latency: float | None = None
+        self.last_refresh_error: str | None = None
@@ -0,0 +1,125 @@
+"""Token managers keyed by MCP session, so one process can serve many authenticated users."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any
+
+from app.services.fhir.models import Token
+from app.services.fhir.token_manager import AccessTokenManager
+from app.utils.token_utils import is_token_expired
+
+# MCP session of the tool call being served; None for stdio and in-process calls.
+current_session: ContextVar[str | None] = ContextVar("current_session", default=None)
+
+# Sessions whose credentials outlive their evicted manager, per manager the pool holds.
+CREDENTIALS_PER_MANAGER = 10
+
+
+class TokenManagerPool:
+    """Bounded LRU pool of `AccessTokenManager`s with idle eviction.
+
+    Each manager refreshes its own token under its own lock, so sessions never wait for each
+    other's OAuth round-trips. An evicted manager's credentials (its token, refresh token or
+    unredeemed authorization code) are kept, up to `CREDENTIALS_PER_MANAGER * max_size`
+    sessions, and handed to the manager created when its session comes back.
+
+    Args:
+        factory: Creates the token manager for a new key
+        max_size: Maximum number of managers; the least recently used one is evicted beyond it
+        idle_timeout: Seconds after which an unused manager is evicted
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], AccessTokenManager],
+        max_size: int,
+        idle_timeout: float,
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._managers: OrderedDict[str | None, tuple[AccessTokenManager, float]] = OrderedDict()
+        self._credentials: OrderedDict[str | None, tuple[Token, str | None]] = OrderedDict()
+
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+        self.restored = 0
+        # counters of evicted managers, so the totals below never go backwards
+        self._retired_refreshes = 0
+        self._retired_failures = 0
+
+    def __len__(self) -> int:
+        return len(self._managers)
+
+    def get(self, key: str | None) -> AccessTokenManager:
+        """Return the manager for `key`, creating it (and evicting others) if needed."""
+        now = time.monotonic()
+        item = self._managers.pop(key, None)
+        manager = item[0] if item is not None else None
+        if manager is None:
+            manager = self.factory()
+            self.created += 1
+            if (credentials := self._credentials.pop(key, None)) is not None:
+                manager.token, manager.authorization_code = credentials
+                self.restored += 1
+        self._managers[key] = (manager, now)
+
+        self._evict(now)
+        return manager
+
+    def _evict(self, now: float) -> None:
+        while self._managers:
+            key, (manager, last_used) = next(iter(self._managers.items()))
+            if len(self._managers) > self.max_size:
+                self.evicted_lru += 1
+            elif now - last_used > self.idle_timeout:
+                self.evicted_idle += 1
+            else:
+                break
+            del self._managers[key]
+            self._retire(manager)
+            self._keep_credentials(key, manager)
+
+    def _keep_credentials(self, key: str | None, manager: AccessTokenManager) -> None:
+        token = manager.token
+        usable = (
+            manager.authorization_code is not None
+            or token.refresh_token is not None
+            or (token.access_token is not None and not is_token_expired(token.expires_at))
+        )
+        if not usable:
+            return
+        self._credentials[key] = (token, manager.authorization_code)
+        while len(self._credentials) > CREDENTIALS_PER_MANAGER * self.max_size:
+            self._credentials.popitem(last=False)
+
+    def _retire(self, manager: AccessTokenManager) -> None:
+        self._retired_refreshes += manager.refreshes
+        self._retired_failures += manager.refresh_failures
+        manager.close()
+
+    def clear(self) -> None:
+        for manager, _ in self._managers.values():
+            self._retire(manager)
+        self._managers.clear()
+        self._credentials.clear()
+
+    def stats(self) -> dict[str, Any]:
+        managers = [manager for manager, _ in self._managers.values()]
+        return {
+            "sessions": len(managers),
+            "max_sessions": self.max_size,
+            "created": self.created,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+            "restored": self.restored,
+            "refreshes": self._retired_refreshes + sum(m.refreshes for m in managers),
+            "refresh_failures": self._retired_failures + sum(m.refresh_failures for m in managers),
+            "background_refreshes": sum(m.background_refreshes for m in managers),
+            "blocked_calls": sum(m.blocked_calls for m in managers),
+            "cache_hits": sum(m.cache_hits for m in managers),
+            "max_refresh_latency": max((m.refresh_latency_max for m in managers), default=0.0),
+        }
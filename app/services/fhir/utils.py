@@ -0,0 +1,123 @@
+"""Helpers for FHIR URLs and Bundles."""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL for use as a cache key (lowercase host, sorted query)."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""),
+    )
+
+
+def token_principal(token: str) -> str:
+    """Stable, non-reversible identifier of a principal (its access token or client id)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_resource_path(path: str) -> tuple[str | None, str | None]:
+    """Extract the resource type and id from a path relative to the FHIR base URL.
+
+    A compartment search is about the type it searches, not the compartment's resource.
+
+    Examples:
+        "/Patient/123" -> ("Patient", "123")
+        "/Condition?patient=123" -> ("Condition", None)
+        "/Patient/123/Observation?code=2339-0" -> ("Observation", None)
+        "/Patient/$match" -> ("Patient", None)
+        "/" -> (None, None)
+    """
+    segments = [segment for segment in urlsplit(path).path.split("/") if segment]
+    if not segments or not segments[0][:1].isupper():
+        return None, None
+    if len(segments) > 2 and segments[2][:1].isupper():
+        return segments[2], None
+
+    resource_id = None
+    if len(segments) > 1 and not segments[1].startswith(("_", "$")):
+        resource_id = segments[1]
+    return segments[0], resource_id
+
+
+def get_next_link(bundle: dict) -> str | None:
+    """Return the `link[relation=next]` URL of a Bundle, if any."""
+    for link in bundle.get("link", []):
+        if link.get("relation") == "next" and link.get("url"):
+            return link["url"]
+    return None
+
+
+def set_query_param(url: str, name: str, value: str) -> str:
+    """Return `url` with the query parameter `name` set to `value` (added or replaced)."""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != name]
+    query.append((name, value))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def get_query_param(url: str, name: str) -> str | None:
+    """Return the first value of the query parameter `name`, if present."""
+    for key, value in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+        if key == name:
+            return value
+    return None
+
+
+def adapt_page_size(
+    page_bytes: int,
+    page_entries: int,
+    target_bytes: int,
+    min_size: int,
+    max_size: int,
+) -> int:
+    """Pick the next `_count` so that a page weighs roughly `target_bytes`.
+
+    Args:
+        page_bytes: Size of the page that was just received
+        page_entries: Number of entries on that page
+        target_bytes: Desired page size in bytes
+        min_size: Lower bound for `_count`
+        max_size: Upper bound for `_count`
+
+    Returns:
+        The page size to request next
+    """
+    if page_entries <= 0:
+        return max_size
+    bytes_per_entry = max(page_bytes / page_entries, 1)
+    return max(min_size, min(max_size, int(target_bytes / bytes_per_entry)))
+
+
+def build_bundle_entry(method: str, path: str, body: dict | None) -> dict:
+    """Build a `batch`/`transaction` Bundle entry for a request path relative to the base URL."""
+    entry: dict = {"request": {"method": method, "url": path.lstrip("/")}}
+    if body is not None and method in ("POST", "PUT"):
+        entry["resource"] = body
+    return entry
+
+
+def get_status_code(status: str) -> int | None:
+    """Parse the HTTP status code from a Bundle `entry.response.status` (e.g. "201 Created")."""
+    code = status.strip().split(" ", 1)[0]
+    return int(code) if code.isdigit() else None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait according to a `Retry-After` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
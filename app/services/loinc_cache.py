@@ -0,0 +1,129 @@
+"""Disk cache of LOINC search API responses, which hardly ever change."""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import orjson
+
+# bumped when the table changes; older tables are dropped, it is only a cache
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS loinc_searches (
+    query TEXT NOT NULL,
+    sort_order TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    content BLOB NOT NULL,
+    PRIMARY KEY (query, sort_order, rows, start)
+);
+CREATE INDEX IF NOT EXISTS loinc_searches_accessed ON loinc_searches (accessed_at);
+"""
+
+
+class LoincCache:
+    """LOINC search responses in SQLite, keyed on query, sort order, rows and offset.
+
+    Entries expire after `ttl` seconds; beyond `max_entries` the least recently used ones are
+    evicted. The database is shared by server processes, and all calls run in a worker thread
+    so the event loop never waits for the disk. A read or write that fails (e.g. the database
+    stayed locked by another process) is counted in `stats` and treated as a miss.
+
+    Args:
+        path: Database file (`:memory:` for a per-process cache)
+        ttl: Seconds an entry is served
+        max_entries: Maximum number of entries kept
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS loinc_searches")
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(query: str, sort_order: str, rows: int, offset: int) -> tuple[str, str, int, int]:
+        return " ".join(query.lower().split()), sort_order, rows, offset
+
+    async def get(self, query: str, sort_order: str, rows: int, offset: int = 0) -> dict | None:
+        """The cached response of a search, or None if absent, expired or unreadable."""
+        try:
+            return await asyncio.to_thread(self._get, self._key(query, sort_order, rows, offset))
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+
+    def _get(self, key: tuple[str, str, int, int]) -> dict | None:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT content FROM loinc_searches WHERE query = ? AND sort_order = ?"
+                " AND rows = ? AND start = ? AND stored_at >= ?",
+                (*key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE loinc_searches SET accessed_at = ? WHERE query = ? AND sort_order = ?"
+                " AND rows = ? AND start = ?",
+                (now, *key),
+            )
+        self.hits += 1
+        return orjson.loads(row[0])
+
+    async def put(
+        self,
+        query: str,
+        sort_order: str,
+        rows: int,
+        offset: int,
+        response: dict,
+    ) -> None:
+        try:
+            await asyncio.to_thread(self._put, self._key(query, sort_order, rows, offset), response)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _put(self, key: tuple[str, str, int, int], response: dict) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO loinc_searches VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, now, now, orjson.dumps(response)),
+            )
+            self._db.execute(
+                "DELETE FROM loinc_searches WHERE stored_at < ?",
+                (now - self.ttl,),
+            )
+            self._db.execute(
+                "DELETE FROM loinc_searches WHERE rowid IN (SELECT rowid FROM loinc_searches"
+                " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries = self._db.execute("SELECT count(*) FROM loinc_searches").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
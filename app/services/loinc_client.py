@@ -1,81 +1,221 @@
-import requests
-from requests.auth import HTTPBasicAuth
-from requests.exceptions import RequestException
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import httpx
 
 from app.config import settings
+from app.services.loinc_cache import LoincCache
+from app.services.loinc_index import LoincIndex
+from app.utils.http_utils import build_async_client
 
 
 class LoincClient:
-    def __init__(self):
+    """Async client of the LOINC search API.
+
+    Requests share one pooled keep-alive connection, and successful responses are kept in a
+    `LoincCache`, so repeated lookups (the same names come up again and again) cost no
+    round trip. With a local `LoincIndex` the API is not used at all.
+
+    Args:
+        cache (LoincCache | None): Response cache, None to always ask the API
+        index (LoincIndex | None): Offline index answering instead of the API
+        max_records (int): Records scanned at most for active codes per lookup
+        page_concurrency (int): Result pages requested at once
+    """
+
+    def __init__(
+        self,
+        cache: LoincCache | None = None,
+        index: LoincIndex | None = None,
+        max_records: int = settings.LOINC_MAX_RECORDS,
+        page_concurrency: int = settings.LOINC_PAGE_CONCURRENCY,
+    ):
         self.base_url = settings.LOINC_ENDPOINT
-        self.auth = HTTPBasicAuth(settings.LOINC_USERNAME, settings.LOINC_PASSWORD)
-        self.code_record_url = f"{self.base_url}?query="
+        self.auth = httpx.BasicAuth(settings.LOINC_USERNAME, str(settings.LOINC_PASSWORD))
+        self.cache = cache
+        self.index = index
+        self.max_records = max_records
+        self.page_concurrency = max(1, page_concurrency)
+        self._http_client: httpx.AsyncClient | None = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared connection pool, created lazily inside the running event loop."""
+        if self._http_client is None:
+            self._http_client = build_async_client(
+                timeout=settings.LOINC_TIMEOUT,
+                max_connections=settings.LOINC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LOINC_MAX_CONNECTIONS,
+                keepalive_expiry=settings.FHIR_SERVER_KEEPALIVE_EXPIRY,
+                auth=self.auth,
+            )
+        return self._http_client
 
-    def _get_loinc_code(
+    async def aclose(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def _search(
+        self,
+        component_name: str,
+        rows: int,
+        sort_order: str,
+        offset: int = 0,
+    ) -> dict:
+        """The API response of a search, from the cache if possible. Errors are not cached."""
+        if self.index is not None:
+            return await self.index.search(component_name, rows, sort_order, offset)
+        if self.cache is not None:
+            cached = await self.cache.get(component_name, sort_order, rows, offset)
+            if cached is not None:
+                return cached
+
+        params = {"query": component_name, "rows": str(rows), "sortorder": sort_order}
+        if offset:
+            params["offset"] = str(offset)
+        response = await self.http_client.get(self.base_url, params=params)
+        data = response.json()
+        if self.cache is not None and isinstance(data, dict) and "Error" not in data:
+            await self.cache.put(component_name, sort_order, rows, offset, data)
+        return data
+
+    @staticmethod
+    def _error(data: dict) -> list[dict] | None:
+        if "Error" not in data:
+            return None
+        error_msg = data["Error"]
+        if "Authentication Failed" in error_msg or "authorization" in error_msg.lower():
+            error_desc = data.get("ErrorDescription", "")
+            return [{"Error": f"Authentication failed: {error_msg}. {error_desc}"}]
+        return [{"Error": error_msg}]
+
+    @staticmethod
+    def _active(data: dict) -> list[dict]:
+        return [item for item in data.get("Results") or [] if item.get("STATUS") == "ACTIVE"]
+
+    async def _get_loinc_code(
         self,
         component_name: str,
         max_codes: int = settings.LOINC_MAX_CODES,
         max_fetch: int = settings.LOINC_MAX_FETCH,
         sort_order: str = "common_test_rank asc",  # lower rank = more common
     ) -> list[dict]:
-        url = self.code_record_url + component_name
-        params = {
-            "query": str(component_name),
-            "rows": str(max_fetch),
-            "sortorder": str(sort_order),
-        }
+        """The first `max_codes` active codes in `sort_order`, paging through the matches.
+
+        Pages of `max_fetch` records are read until enough active codes are found, all
+        matches were seen or `max_records` is reached. After the first page, which tells how
+        many records match, up to `page_concurrency` pages are requested at once.
+        """
+        max_fetch = max(1, max_fetch)
+        records_found = searched = 0
+        active_codes: list[dict] = []
         try:
-            response = requests.get(
-                url,
-                auth=self.auth,
-                params=params,
-                timeout=settings.LOINC_TIMEOUT,
-            )
-            data = response.json()
+            data = await self._search(component_name, max_fetch, sort_order)
             # Check for authentication errors
-            if "Error" in data:
-                error_msg = data["Error"]
-                if "Authentication Failed" in error_msg or "authorization" in error_msg.lower():
-                    error_desc = data.get("ErrorDescription", "")
-                    return [{"Error": f"Authentication failed: {error_msg}. {error_desc}"}]
-                return [{"Error": error_msg}]
-        except RequestException as e:
-            return [{"Error": f"Request failed: {str(e)}"}]
-        except ValueError as e:
-            return [{"Error": f"Invalid JSON response: {str(e)}"}]
-
-        if not (records_found := data.get("ResponseSummary", {}).get("RecordsFound", 0)):
-            return [{"RecordsFound": 0, "Error": "No LOINC codes found"}]
-
-        # get only active codes
-        active_codes = []
+            if error := self._error(data):
+                return error
+            if not (records_found := data.get("ResponseSummary", {}).get("RecordsFound", 0)):
+                return [{"RecordsFound": 0, "Error": "No LOINC codes found"}]
+            searched = min(records_found, max_fetch)
+            active_codes = self._active(data)
 
-        if "Results" in data and data["Results"]:
-            active_codes = [item for item in data["Results"] if item.get("STATUS") == "ACTIVE"]
+            offsets = list(range(max_fetch, min(records_found, self.max_records), max_fetch))
+            while offsets and len(active_codes) < max_codes:
+                batch, offsets = offsets[: self.page_concurrency], offsets[self.page_concurrency :]
+                pages = await asyncio.gather(
+                    *(
+                        self._search(component_name, max_fetch, sort_order, offset)
+                        for offset in batch
+                    ),
+                )
+                # taken in order, so the codes stay sorted
+                for page in pages:
+                    if error := self._error(page):
+                        return active_codes[:max_codes] or error
+                    searched = min(records_found, searched + max_fetch)
+                    active_codes.extend(self._active(page))
+        except httpx.HTTPError as e:
+            return active_codes[:max_codes] or [{"Error": f"Request failed: {str(e)}"}]
+        except ValueError as e:
+            return active_codes[:max_codes] or [{"Error": f"Invalid JSON response: {str(e)}"}]
+        except sqlite3.Error as e:
+            return active_codes[:max_codes] or [{"Error": f"LOINC database error: {str(e)}"}]
 
         # No active codes found
         if not active_codes:
             return [
                 {
                     "AllRecordsFound": records_found,
-                    "Error": "No active LOINC codes found in current fetch",
+                    "RecordsSearched": searched,
+                    "Error": "No active LOINC codes found",
                 },
             ]
 
         return active_codes[:max_codes]
 
-    def get_common_loinc_codes(
+    async def get_common_loinc_codes(
         self,
         component_name: str,
         max_codes: int = settings.LOINC_MAX_CODES,
         max_fetch: int = settings.LOINC_MAX_FETCH,
     ) -> list[dict]:
-        return self._get_loinc_code(
+        return await self._get_loinc_code(
             component_name,
             max_codes,
             max_fetch,
             sort_order="common_test_rank asc",
         )
 
+    async def get_common_loinc_codes_batch(
+        self,
+        component_names: list[str],
+        max_codes: int = settings.LOINC_MAX_CODES,
+        max_fetch: int = settings.LOINC_MAX_FETCH,
+        concurrency: int = settings.LOINC_BATCH_CONCURRENCY,
+    ) -> dict[str, list[dict]]:
+        """`get_common_loinc_codes` of each name, with up to `concurrency` lookups at once.
+
+        Repeated names are looked up once. Each lookup fails on its own, with the "Error"
+        result of a single lookup.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        names = list(dict.fromkeys(name.strip() for name in component_names if name.strip()))
+
+        async def lookup(name: str) -> list[dict]:
+            async with semaphore:
+                return await self.get_common_loinc_codes(name, max_codes, max_fetch)
+
+        results = await asyncio.gather(*(lookup(name) for name in names))
+        return dict(zip(names, results, strict=True))
+
+
+def _load_index() -> LoincIndex | None:
+    """The configured offline index; the API is used if there is none or it cannot be read."""
+    if not settings.LOINC_INDEX_PATH:
+        return None
+    try:
+        return LoincIndex(Path(settings.LOINC_INDEX_PATH).expanduser())
+    except (OSError, sqlite3.Error) as e:
+        print(f"SETUP -> LOINC index not used: {e}", file=sys.stderr)
+        return None
+
+
+def _load_cache() -> LoincCache | None:
+    """The configured response cache; lookups go uncached if it cannot be opened."""
+    if not settings.LOINC_CACHE_ENABLED:
+        return None
+    try:
+        return LoincCache(
+            str(Path(settings.LOINC_CACHE_PATH).expanduser()),
+            ttl=settings.LOINC_CACHE_TTL,
+            max_entries=settings.LOINC_CACHE_MAX_ENTRIES,
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"SETUP -> LOINC cache not used: {e}", file=sys.stderr)
+        return None
+
 
-loinc_client = LoincClient()
+loinc_client = LoincClient(_load_cache(), _load_index())
@@ -0,0 +1,175 @@
+"""Offline LOINC search over a local SQLite FTS5 index of the official LOINC table."""
+
+import asyncio
+import csv
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import orjson
+
+# LOINC table columns kept in the records; the search API returns the same names.
+RECORD_FIELDS = (
+    "LOINC_NUM",
+    "COMPONENT",
+    "PROPERTY",
+    "TIME_ASPCT",
+    "SYSTEM",
+    "SCALE_TYP",
+    "METHOD_TYP",
+    "CLASS",
+    "STATUS",
+    "SHORTNAME",
+    "LONG_COMMON_NAME",
+    "DisplayName",
+    "EXAMPLE_UCUM_UNITS",
+    "ORDER_OBS",
+    "COMMON_TEST_RANK",
+    "COMMON_ORDER_RANK",
+)
+# COMMON_TEST_RANK 0 means "not ranked"; those codes sort after all ranked ones
+UNRANKED = 2**31
+
+SCHEMA = """
+CREATE TABLE loinc (
+    rowid INTEGER PRIMARY KEY,
+    loinc_num TEXT NOT NULL,
+    component TEXT,
+    shortname TEXT,
+    long_common_name TEXT,
+    status TEXT,
+    sort_rank INTEGER NOT NULL,
+    record BLOB NOT NULL
+);
+CREATE VIRTUAL TABLE loinc_fts USING fts5(
+    loinc_num, component, shortname, long_common_name,
+    content='loinc', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _rank(value: str | None) -> int:
+    try:
+        rank = int(value or 0)
+    except ValueError:
+        return UNRANKED
+    return rank if rank > 0 else UNRANKED
+
+
+def build_index(csv_path: Path, index_path: Path) -> int:
+    """Build the index from the LOINC table CSV (`LoincTable/Loinc.csv` of the release).
+
+    The file is written next to `index_path` and moved into place when complete, so a
+    running server never sees a half-built index.
+
+    Returns:
+        The number of LOINC codes indexed
+    """
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=index_path.parent, prefix=f".{index_path.name}.")
+    os.close(fd)
+    try:
+        db = sqlite3.connect(tmp_path)
+        try:
+            db.executescript(SCHEMA)
+            with csv_path.open(newline="", encoding="utf-8-sig") as file:
+                rows = (
+                    (
+                        row["LOINC_NUM"],
+                        row.get("COMPONENT"),
+                        row.get("SHORTNAME"),
+                        row.get("LONG_COMMON_NAME"),
+                        row.get("STATUS"),
+                        _rank(row.get("COMMON_TEST_RANK")),
+                        orjson.dumps({name: row[name] for name in RECORD_FIELDS if name in row}),
+                    )
+                    for row in csv.DictReader(file)
+                )
+                db.executemany(
+                    "INSERT INTO loinc (loinc_num, component, shortname, long_common_name,"
+                    " status, sort_rank, record) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            db.execute("CREATE INDEX loinc_sort_rank ON loinc (sort_rank)")
+            db.execute("INSERT INTO loinc_fts (loinc_fts) VALUES ('rebuild')")
+            db.execute("INSERT INTO loinc_fts (loinc_fts) VALUES ('optimize')")
+            count = db.execute("SELECT count(*) FROM loinc").fetchone()[0]
+            db.commit()
+            db.execute("VACUUM")
+        finally:
+            db.close()
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return count
+
+
+def match_expression(query: str) -> str | None:
+    """FTS5 query matching records that contain every word of `query` (as a prefix)."""
+    words = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+class LoincIndex:
+    """Read-only LOINC search over an index built with `build_index`.
+
+    Answers with the response shape of the LOINC search API (`ResponseSummary` and `Results`),
+    so `LoincClient` treats both backends alike. Sorting by `common_test_rank` puts unranked
+    codes last; any other sort order ranks by text relevance (BM25).
+
+    Args:
+        path: Index file
+    """
+
+    def __init__(self, path: Path):
+        if not path.is_file():
+            raise FileNotFoundError(f"LOINC index not found: {path}")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    async def search(self, query: str, rows: int, sort_order: str, offset: int = 0) -> dict:
+        return await asyncio.to_thread(self._search, query, rows, sort_order, offset)
+
+    def _search(self, query: str, rows: int, sort_order: str, offset: int = 0) -> dict:
+        expression = match_expression(query)
+        if expression is None:
+            return {"ResponseSummary": {"RecordsFound": 0}, "Results": []}
+
+        if sort_order.lower().startswith("common_test_rank"):
+            descending = sort_order.lower().endswith("desc")
+            order = f"l.sort_rank {'DESC' if descending else 'ASC'}, l.rowid"
+        else:
+            order = "loinc_fts.rank"
+        with self._lock:
+            found = self._db.execute(
+                "SELECT count(*) FROM loinc_fts WHERE loinc_fts MATCH ?",
+                (expression,),
+            ).fetchone()[0]
+            records = self._db.execute(
+                "SELECT l.record FROM loinc_fts JOIN loinc l ON l.rowid = loinc_fts.rowid"
+                f" WHERE loinc_fts MATCH ? ORDER BY {order} LIMIT ? OFFSET ?",
+                (expression, rows, offset),
+            ).fetchall()
+        return {
+            "ResponseSummary": {
+                "Query": query,
+                "RecordsFound": found,
+                "RowsReturned": len(records),
+                "StartingRow": offset,
+            },
+            "Results": [orjson.loads(record) for (record,) in records],
+        }
+
+    def get_records(self, rowids: list[int]) -> dict[int, dict]:
+        """The records of index rows, by rowid."""
+        placeholders = ",".join("?" * len(rowids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT rowid, record FROM loinc WHERE rowid IN ({placeholders})",
+                rowids,
+            ).fetchall()
+        return {rowid: orjson.loads(record) for rowid, record in rows}
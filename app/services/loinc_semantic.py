@@ -0,0 +1,185 @@
+"""Semantic LOINC search: embedded long common names ranked by similarity to the query."""
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.config import settings
+from app.services.loinc_client import loinc_client
+from app.services.loinc_index import UNRANKED, LoincIndex
+
+if TYPE_CHECKING:
+    from app.services.rag.semantic_embedder import SemanticEmbedder
+
+VECTORS_FILE = "vectors.npy"
+ROWIDS_FILE = "rowids.npy"
+CODES_FILE = "codes.npy"
+RANKS_FILE = "ranks.npy"
+META_FILE = "meta.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def build_embeddings(
+    index_path: Path,
+    output_dir: Path,
+    embedder: "SemanticEmbedder",
+    batch_size: int = settings.EMBED_BATCH_SIZE,
+) -> int:
+    """Embed the long common names of the active codes of a `LoincIndex` file.
+
+    Writes unit-length float32 vectors, the index rowid, LOINC number and COMMON_TEST_RANK
+    of each code and the model name to `output_dir`, replacing it only when complete.
+
+    Returns:
+        The number of codes embedded
+    """
+    db = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            "SELECT rowid, loinc_num, coalesce(long_common_name, component, loinc_num), sort_rank"
+            " FROM loinc WHERE status = 'ACTIVE' ORDER BY rowid",
+        ).fetchall()
+    finally:
+        db.close()
+    if not rows:
+        raise ValueError(f"No active LOINC codes in {index_path}")
+
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=output_dir.parent, prefix=f".{output_dir.name}."))
+    try:
+        vectors = None
+        for start in range(0, len(rows), batch_size):
+            texts = [name for _, _, name, _ in rows[start : start + batch_size]]
+            batch = np.asarray(embedder.embed_texts(texts).vectors, dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    tmp_dir / VECTORS_FILE,
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(len(rows), batch.shape[1]),
+                )
+            vectors[start : start + len(batch)] = _normalize(batch)
+        assert vectors is not None
+        vectors.flush()
+        dimensions = vectors.shape[1]
+        del vectors
+
+        np.save(tmp_dir / ROWIDS_FILE, np.array([row[0] for row in rows], dtype=np.int64))
+        np.save(tmp_dir / CODES_FILE, np.array([row[1] for row in rows], dtype=np.str_))
+        np.save(tmp_dir / RANKS_FILE, np.array([row[3] for row in rows], dtype=np.int64))
+        meta = {"model": embedder.model_name, "count": len(rows), "dimensions": dimensions}
+        (tmp_dir / META_FILE).write_text(json.dumps(meta))
+
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        os.replace(tmp_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return len(rows)
+
+
+class LoincSemanticMatcher:
+    """Ranks active LOINC codes by the meaning of their long common name.
+
+    The vectors written by `build_embeddings` are memory-mapped, so the matrix is shared
+    through the page cache and costs no heap. A query is embedded with the same model and
+    scored against all codes with one matrix-vector product. The cosine similarity is
+    blended with a popularity prior from COMMON_TEST_RANK, and the top `k` are selected with
+    `argpartition`.
+
+    Args:
+        index (LoincIndex): Index the records are read from
+        path: Directory written by `build_embeddings`
+        embedder (SemanticEmbedder): Embedder of the model the vectors were built with
+        rank_weight: Weight of the popularity prior (0 ranks by similarity only)
+    """
+
+    def __init__(
+        self,
+        index: LoincIndex,
+        path: Path,
+        embedder: "SemanticEmbedder",
+        rank_weight: float = settings.LOINC_SEMANTIC_RANK_WEIGHT,
+    ):
+        meta = json.loads((path / META_FILE).read_text())
+        if meta["model"] != embedder.model_name:
+            raise ValueError(
+                f"LOINC embeddings were built with {meta['model']}, not {embedder.model_name}",
+            )
+        self.index = index
+        self.embedder = embedder
+        self.rank_weight = rank_weight
+        self.vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        self.rowids = np.load(path / ROWIDS_FILE)
+        self.codes = np.load(path / CODES_FILE)
+        ends = [0, len(self.rowids) - 1]
+        found = index.get_records([int(self.rowids[end]) for end in ends])
+        if any(
+            found.get(int(self.rowids[end]), {}).get("LOINC_NUM") != self.codes[end] for end in ends
+        ):
+            raise ValueError("LOINC embeddings do not match the LOINC index, rebuild them")
+        ranks = np.load(path / RANKS_FILE).astype(np.float64)
+        # 1 for the most common test, towards 0 for rare ones, 0 when unranked
+        ranked = ranks < UNRANKED
+        scale = np.log(ranks[ranked].max() + 1) if ranked.any() else 1.0
+        self.popularity = np.where(ranked, 1.0 - np.log(ranks) / scale, 0.0).astype(np.float32)
+
+    async def search(self, query: str, max_codes: int) -> list[dict]:
+        return await asyncio.to_thread(self._search, query, max_codes)
+
+    def _search(self, query: str, max_codes: int) -> list[dict]:
+        embedded = np.asarray(self.embedder.embed_texts([query]).vectors[0], dtype=np.float32)
+        similarity = self.vectors @ _normalize(embedded[np.newaxis])[0]
+        scores = similarity + self.rank_weight * self.popularity
+
+        k = min(max(1, max_codes), len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        found = self.index.get_records([int(rowid) for rowid in self.rowids[top]])
+        records = []
+        for position in top:
+            record = found.get(int(self.rowids[position]))
+            # a rebuilt index may number the rows differently than the embeddings
+            if record is None or record.get("LOINC_NUM") != self.codes[position]:
+                continue
+            record["Similarity"] = round(float(similarity[position]), 4)
+            record["Score"] = round(float(scores[position]), 4)
+            records.append(record)
+        return records
+
+
+def _load_matcher() -> LoincSemanticMatcher | None:
+    """The configured semantic matcher; it needs the offline index and the embeddings."""
+    if not settings.LOINC_EMBEDDINGS_PATH:
+        return None
+    if loinc_client.index is None:
+        print("SETUP -> LOINC semantic search needs LOINC_INDEX_PATH", file=sys.stderr)
+        return None
+    try:
+        from app.services.rag.semantic_embedder import SemanticEmbedder
+
+        return LoincSemanticMatcher(
+            loinc_client.index,
+            Path(settings.LOINC_EMBEDDINGS_PATH).expanduser(),
+            SemanticEmbedder(model_name=settings.EMBEDDING_MODEL),
+        )
+    except (OSError, ValueError, KeyError, ImportError) as e:
+        print(f"SETUP -> LOINC semantic search not used: {e}", file=sys.stderr)
+        return None
+
+
+loinc_semantic_matcher = _load_matcher()
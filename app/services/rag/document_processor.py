@@ -1,9 +1,9 @@
 from app.config import settings
 from app.schemas.document_schemas import Document
 from app.services.rag.document_service import (
-    bytes_to_text,
-    chunk_text,
-    download_bytes,
+    chunk_pages,
+    download_file,
+    iter_file_text,
 )
 from app.services.rag.vector_store_service import (
     get_chunks_embeddings,
@@ -17,9 +17,8 @@ class DocumentProcessor:
         document: Document,
         namespace: str = settings.PINECONE_NAMESPACE,
     ) -> None:
-        pdf_bytes = download_bytes(url=document.url)
-        text = bytes_to_text(file_bytes=pdf_bytes, filetype=document.format)
-        chunks = chunk_text(text)
+        with download_file(url=document.url) as path:
+            chunks = list(chunk_pages(iter_file_text(path=path, filetype=document.format)))
         embeddings = get_chunks_embeddings(chunks)
 
         upload_embeddings(
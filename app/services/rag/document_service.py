@@ -1,16 +1,24 @@
 import csv
-import io
 import json
+import tempfile
+import time
+from collections.abc import Generator, Iterable, Iterator
+from contextlib import contextmanager
 from functools import lru_cache
+from pathlib import Path
 
 import chardet
-import fitz
 import requests
 from llama_index.core.node_parser import SemanticSplitterNodeParser
 from llama_index.core.schema import Document
 
+from app.config import settings
+from app.services.rag.pdf_extraction import iter_pdf_pages
 from app.services.rag.pinecone_client import pinecone_client
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+ENCODING_SAMPLE_SIZE = 4 * DOWNLOAD_CHUNK_SIZE
+
 
 @lru_cache(maxsize=1)
 def get_text_splitter() -> SemanticSplitterNodeParser:
@@ -23,35 +31,79 @@ def get_text_splitter() -> SemanticSplitterNodeParser:
     )
 
 
-def download_bytes(url: str) -> bytes:
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.content
-
-
-def detect_encoding(byte_data: bytes) -> str:
-    result = chardet.detect(byte_data)
-    return result["encoding"] or "utf-8"
+@contextmanager
+def download_file(
+    url: str,
+    max_bytes: int = settings.DOCUMENT_MAX_BYTES,
+    timeout: float = settings.DOCUMENT_DOWNLOAD_TIMEOUT,
+) -> Generator[Path]:
+    """Stream a document to a temporary file, deleted when the context exits.
+
+    The body is written in chunks, so it is never held in memory. Downloads larger than
+    `max_bytes` or lasting longer than `timeout` seconds are aborted; connecting and each read
+    are bounded by `DOCUMENT_CONNECT_TIMEOUT` and `DOCUMENT_READ_TIMEOUT`.
+    """
+    deadline = time.monotonic() + timeout
+    directory = settings.DOCUMENT_DOWNLOAD_DIR or None
+    with (
+        requests.get(
+            url,
+            stream=True,
+            timeout=(settings.DOCUMENT_CONNECT_TIMEOUT, settings.DOCUMENT_READ_TIMEOUT),
+        ) as response,
+        tempfile.NamedTemporaryFile(dir=directory, prefix="document-") as file,
+    ):
+        response.raise_for_status()
+        length = response.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) > max_bytes:
+            raise ValueError(f"Document is larger than {max_bytes} bytes ({length} bytes)")
+
+        size = 0
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"Document is larger than {max_bytes} bytes")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Document download took longer than {timeout} s")
+            file.write(chunk)
+        file.flush()
+        yield Path(file.name)
+
+
+def detect_encoding(path: Path) -> str:
+    """Encoding of a text file, detected from its beginning."""
+    detector = chardet.UniversalDetector()
+    with path.open("rb") as file:
+        while not detector.done and file.tell() < ENCODING_SAMPLE_SIZE:
+            chunk = file.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            detector.feed(chunk)
+    return detector.close()["encoding"] or "utf-8"
+
+
+def iter_file_text(path: Path, filetype: str | None = None) -> Iterator[str]:
+    """The text of a document in pieces: page by page for PDFs, else all at once."""
+    if filetype == "pdf":
+        yield from iter_pdf_pages(path)
+    else:
+        yield file_to_text(path, filetype)
 
 
-def bytes_to_text(file_bytes: bytes, filetype: str | None = None) -> str:
+def file_to_text(path: Path, filetype: str | None = None) -> str:
     if filetype == "pdf":
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-        return "\n".join([page.get_text() for page in doc])
+        return "\n".join(iter_pdf_pages(path))
 
     if filetype == "txt":
-        encoding = detect_encoding(file_bytes)
-        return file_bytes.decode(encoding)
+        return path.read_text(encoding=detect_encoding(path), errors="replace")
 
     if filetype == "csv":
-        encoding = detect_encoding(file_bytes)
-        f = io.StringIO(file_bytes.decode(encoding))
-        reader = csv.reader(f)
-        return "\n".join([", ".join(row) for row in reader])
+        with path.open(encoding=detect_encoding(path), errors="replace", newline="") as f:
+            return "\n".join(", ".join(row) for row in csv.reader(f))
 
     if filetype == "json":
-        encoding = detect_encoding(file_bytes)
-        data = json.loads(file_bytes.decode(encoding))
+        with path.open(encoding=detect_encoding(path)) as f:
+            data = json.load(f)
         return json.dumps(data, indent=2, ensure_ascii=False)
 
     raise ValueError("Filetype is required")
@@ -61,3 +113,24 @@ def chunk_text(text: str) -> list[str]:
     text_splitter = get_text_splitter()
     nodes = text_splitter.get_nodes_from_documents([Document(text=text)])
     return [node.get_content() for node in nodes]
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    segment_chars: int = settings.CHUNK_SEGMENT_CHARS,
+) -> Iterator[str]:
+    """Chunks of a document arriving in pieces (pages), split as soon as enough text arrived.
+
+    Pieces are grouped into segments of at least `segment_chars` characters, each split on
+    its own, so the whole text is never assembled; chunks do not span segment boundaries.
+    """
+    segment: list[str] = []
+    size = 0
+    for page in pages:
+        segment.append(page)
+        size += len(page)
+        if size >= segment_chars:
+            yield from chunk_text("\n".join(segment))
+            segment, size = [], 0
+    if size:
+        yield from chunk_text("\n".join(segment))
@@ -0,0 +1,93 @@
+"""Page-parallel PDF text extraction in a pool of worker processes."""
+
+import multiprocessing
+import os
+import sys
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import fitz
+
+from app.config import settings
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def start_pool() -> None:
+    """Start the extraction workers now; call at startup, before any thread is started.
+
+    On Linux the workers are forked, which is only safe while the process has a single
+    thread, and cheap: spawned workers re-import the main module, the server with its
+    embedding model. All of them are forked by the first task, so none is forked later.
+    """
+    global _pool
+    if _pool is None and sys.platform == "linux":
+        _pool = ProcessPoolExecutor(
+            max_workers=extract_workers(),
+            mp_context=multiprocessing.get_context("fork"),
+        )
+        _pool.submit(os.getpid).result()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The shared extraction pool; spawned on first use if `start_pool` was not called."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=extract_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def extract_workers() -> int:
+    return settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+
+def _extract_pages(path: str, start: int, stop: int) -> list[str]:
+    with fitz.open(path) as doc:
+        return [doc[number].get_text() for number in range(start, stop)]
+
+
+def iter_pdf_pages(
+    path: Path,
+    pages_per_task: int = settings.PDF_EXTRACT_PAGES_PER_TASK,
+) -> Iterator[str]:
+    """The text of each page of a PDF, in page order.
+
+    Page ranges of `pages_per_task` are extracted by the pool's workers, each opening the
+    file itself. Pages are yielded as soon as their range and all earlier ones are done; at
+    most two ranges per worker are in flight, so a slow consumer bounds the text held.
+    Small documents, or a single worker, are extracted in this process.
+    """
+    pages_per_task = max(1, pages_per_task)
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+        if page_count <= pages_per_task or extract_workers() == 1:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    pool = get_pool()
+    ranges = deque(
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    )
+    in_flight: deque[Future[list[str]]] = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < 2 * extract_workers():
+                in_flight.append(pool.submit(_extract_pages, str(path), *ranges.popleft()))
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
@@ -1,15 +1,14 @@
-from requests import PreparedRequest
-from requests.auth import AuthBase
-from requests.structures import CaseInsensitiveDict
+from typing import Generator
 
+import httpx
 
-class BearerAuth(AuthBase):
+
+class BearerAuth(httpx.Auth):
     """Attaches HTTP Bearer Authentication to the given Request object."""
 
     def __init__(self, token: str):
         self.token = token
 
-    def __call__(self, r: PreparedRequest) -> PreparedRequest:
-        r.headers = r.headers or CaseInsensitiveDict()
-        r.headers["Authorization"] = f"Bearer {self.token}"
-        return r
+    def auth_flow(self, request: httpx.Request) -> Generator[httpx.Request, httpx.Response, None]:
+        request.headers["Authorization"] = f"Bearer {self.token}"
+        yield request
@@ -27,6 +27,9 @@ class Decryptor(Protocol):
 
 
 class FakeFernet:
+    def encrypt(self, value: bytes) -> bytes:
+        return value
+
     def decrypt(self, value: bytes) -> bytes:
         return value
 
@@ -61,11 +64,20 @@ class EncryptedField(str):
 class FernetDecryptorField:
     def __init__(self, value: str):
         master_key = os.environ.get(value)
+        self._decryptor: Fernet | FakeFernet
         if not master_key:
             self._decryptor = FakeFernet()
         else:
             self._decryptor = Fernet(master_key.encode())
 
+    @property
+    def has_master_key(self) -> bool:
+        """False when no master key is set and values pass through unencrypted."""
+        return isinstance(self._decryptor, Fernet)
+
+    def encrypt(self, value: bytes) -> bytes:
+        return self._decryptor.encrypt(value)
+
     def decrypt(self, value: bytes) -> bytes:
         return self._decryptor.decrypt(value)
 
@@ -0,0 +1,36 @@
+"""Shared HTTP client helpers."""
+
+import httpx
+
+
+def build_async_client(
+    timeout: float,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    http2: bool = False,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """Build a pooled, keep-alive async HTTP client.
+
+    Args:
+        timeout: Read/write/connect timeout in seconds
+        max_connections: Maximum number of concurrent connections in the pool
+        max_keepalive_connections: Maximum number of idle connections kept open
+        keepalive_expiry: Time in seconds after which idle connections are closed
+        http2: Whether to negotiate HTTP/2 (multiplexes requests over one connection)
+        **kwargs: Extra arguments for `httpx.AsyncClient`
+
+    Returns:
+        Configured async client; the caller owns it and must close it with `aclose()`
+    """
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        **kwargs,
+    )
@@ -85,6 +85,22 @@ def should_refresh_token(expires_at: datetime | None, buffer_minutes: int = 5) -
     return datetime.now(timezone.utc) >= (expires_at - buffer_time)
 
 
+def seconds_until_refresh(expires_at: datetime | None, buffer_minutes: int = 5) -> float:
+    """Seconds until `should_refresh_token` starts returning True (0 if it already does).
+
+    Args:
+        expires_at: Token expiry datetime
+        buffer_minutes: Buffer time before expiry
+
+    Returns:
+        Delay in seconds
+    """
+    if not expires_at:
+        return 0.0
+    refresh_at = expires_at - timedelta(minutes=buffer_minutes)
+    return max((refresh_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
 def is_token_expired(expires_at: datetime | None) -> bool:
     """Check if token is expired.
 
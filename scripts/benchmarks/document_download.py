@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory high-water mark of ingesting a large PDF.
+
+Serves a generated PDF (noise images, so it does not compress) from a local HTTP server and
+extracts its text twice, each in a fresh process, reporting the growth of the peak resident
+set size:
+
+- buffered: the whole body in memory (`requests.get(url).content`), opened from the bytes
+- streamed: `download_file` to a temporary file, opened from disk by `file_to_text`
+
+Usage:
+    uv run scripts/benchmarks/document_download.py --size-mb 200
+"""
+
+import argparse
+import functools
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import fitz
+import numpy as np
+import requests
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+PAGE_IMAGE_SIZE = 1024  # pixels per side, about 3 MB of RGB noise per page
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def build_pdf(path: Path, size_mb: int) -> None:
+    rng = np.random.default_rng(0)
+    pages = max(1, size_mb * 1_000_000 // (PAGE_IMAGE_SIZE * PAGE_IMAGE_SIZE * 3))
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Page {number + 1}: discharge summary text " * 2)
+            samples = rng.integers(0, 256, PAGE_IMAGE_SIZE * PAGE_IMAGE_SIZE * 3, dtype=np.uint8)
+            pixmap = fitz.Pixmap(fitz.csRGB, PAGE_IMAGE_SIZE, PAGE_IMAGE_SIZE, samples.tobytes(), 0)
+            page.insert_image(fitz.Rect(72, 100, 540, 568), pixmap=pixmap)
+        doc.save(path)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+
+
+def run_worker(mode: str, url: str) -> None:
+    from app.services.rag.document_service import download_file, file_to_text
+
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "buffered":
+        content = requests.get(url).content
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            text = "\n".join([page.get_text() for page in doc])
+    else:
+        with download_file(url) as path:
+            text = file_to_text(path, "pdf")
+    result = {
+        "seconds": time.perf_counter() - started,
+        "peak_growth_mb": peak_rss_mb() - before,
+        "characters": len(text),
+    }
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark memory use of document ingestion")
+    parser.add_argument("--size-mb", type=int, default=200, help="Size of the generated PDF")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_pdf(Path(directory) / "chart.pdf", args.size_mb)
+        size = (Path(directory) / "chart.pdf").stat().st_size
+        handler = functools.partial(QuietHandler, directory=directory)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/chart.pdf"
+        print(f"PDF: {size / 1e6:.0f} MB")
+
+        try:
+            for mode in ("buffered", "streamed"):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, url],
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output.splitlines()[-1])
+                print(
+                    f"{mode:>8}: peak RSS +{result['peak_growth_mb']:.0f} MB, "
+                    f"{result['seconds']:.2f} s, {result['characters']} characters",
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent MCP session throughput against the FHIR stub server.
+
+Compares the previous client behaviour (a blocking HTTP call on a fresh connection inside an
+`async def` tool, which stalls the event loop) with the pooled async `FhirClient`.
+
+Usage:
+    uv run scripts/benchmarks/fhir_client_concurrency.py --sessions 20 --requests 10
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "scripts" / "stubs"))
+
+from fhir_stub_server import BASE_PATH, StubConfig, start_stub_server  # noqa: E402
+
+from app.services.fhir.fhir_client import fhir_client  # noqa: E402
+from app.services.fhir.models import Token  # noqa: E402
+
+SEARCH_PATH = "/Observation?patient=1"
+
+
+async def blocking_session(base_url: str, requests: int) -> None:
+    for _ in range(requests):
+        # deliberately blocking: this is the behaviour being measured
+        with urllib.request.urlopen(f"{base_url}{SEARCH_PATH}", timeout=20) as response:  # noqa: ASYNC210
+            json.loads(response.read())
+
+
+async def pooled_session(requests: int) -> None:
+    for _ in range(requests):
+        await fhir_client.request("GET", SEARCH_PATH)
+
+
+async def measure(label: str, sessions: list, total_requests: int) -> None:
+    started = time.perf_counter()
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {elapsed:8.2f} s  {total_requests / elapsed:10.1f} req/s")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="FhirClient concurrency benchmark")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent MCP sessions")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per session")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency in seconds")
+    args = parser.parse_args()
+
+    server = start_stub_server(config=StubConfig(latency=args.latency))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}{BASE_PATH}"
+
+    fhir_client.base_url = base_url
+    fhir_client.token_manager.token = Token(
+        access_token="benchmark",
+        expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+    )
+
+    total = args.sessions * args.requests
+    print(f"{args.sessions} sessions x {args.requests} requests, latency {args.latency} s")
+    await measure(
+        "blocking",
+        [blocking_session(base_url, args.requests) for _ in range(args.sessions)],
+        total,
+    )
+    await measure(
+        "pooled",
+        [pooled_session(args.requests) for _ in range(args.sessions)],
+        total,
+    )
+
+    await fhir_client.aclose()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of turning a large FHIR Bundle into an MCP tool result.
+
+Compares the model path (decode the body, wrap it in `FhirQueryResponse`, let FastMCP dump it
+as text and structured content) with the passthrough path (`FhirRawResponse` spliced into the
+tool result as raw bytes). Reports wall time and peak traced memory per conversion.
+
+Usage:
+    uv run scripts/benchmarks/fhir_response_serialization.py --sizes 5 20 --repeat 5
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import pydantic_core
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.mcp.utils import raw_tool_result  # noqa: E402
+from app.schemas.fhir_schemas import FhirQueryResponse  # noqa: E402
+from app.services.fhir.models import FhirRawResponse  # noqa: E402
+
+URL = "https://fhir.example.com/fhir/R4/Observation?patient=1"
+
+
+def build_bundle(target_bytes: int) -> bytes:
+    """A searchset Bundle of Observations weighing roughly `target_bytes`."""
+    entries = []
+    size = 0
+    while size < target_bytes:
+        index = len(entries)
+        resource = {
+            "resourceType": "Observation",
+            "id": str(index),
+            "meta": {"versionId": "1", "lastUpdated": "2025-01-01T00:00:00Z"},
+            "text": {"status": "generated", "div": f"<div>Observation {index}</div>" * 8},
+            "status": "final",
+            "code": {"coding": [{"system": "http://loinc.org", "code": "2339-0"}]},
+            "subject": {"reference": "Patient/1"},
+            "effectiveDateTime": "2025-01-01T00:00:00Z",
+            "valueQuantity": {"value": 90 + index % 50, "unit": "mg/dL"},
+        }
+        entries.append({"fullUrl": f"Observation/{index}", "resource": resource})
+        size += len(json.dumps(resource))
+    return json.dumps({"resourceType": "Bundle", "type": "searchset", "entry": entries}).encode()
+
+
+def model_path(content: bytes) -> int:
+    response = FhirQueryResponse(method="GET", path=URL, body=None, response=json.loads(content))
+    # what FastMCP does for a tool with an output schema: text content plus structured content
+    text = pydantic_core.to_json(response).decode()
+    structured = pydantic_core.to_jsonable_python(response)
+    return len(text) + len(structured)
+
+
+def passthrough_path(content: bytes) -> int:
+    result = raw_tool_result(FhirRawResponse("GET", URL, None, content))
+    return len(result.content)
+
+
+def measure(label: str, func: Callable[[bytes], int], content: bytes, repeat: int) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<12} {elapsed * 1000:9.1f} ms  peak {peak / 1_000_000:8.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FHIR response serialization benchmark")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[5, 20], help="Bundle MB")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for megabytes in args.sizes:
+        content = build_bundle(int(megabytes * 1_000_000))
+        print(f"Bundle of {len(content) / 1_000_000:.1f} MB")
+        measure("model", model_path, content, args.repeat)
+        measure("passthrough", passthrough_path, content, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
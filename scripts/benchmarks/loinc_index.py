@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark lookups in the offline LOINC index.
+
+Builds an index from a LOINC table CSV (or, without one, from a synthetic table of the same
+size and shape as a LOINC release) and measures the latency of `get_loinc_codes`-style
+searches through `LoincClient`, for comparison with the hundreds of milliseconds of a call to
+the LOINC search API.
+
+Usage:
+    uv run scripts/benchmarks/loinc_index.py
+    uv run scripts/benchmarks/loinc_index.py --csv LoincTable/Loinc.csv --queries 2000
+"""
+
+import argparse
+import asyncio
+import csv
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.loinc_client import LoincClient  # noqa: E402
+from app.services.loinc_index import RECORD_FIELDS, LoincIndex, build_index  # noqa: E402
+
+QUERIES = [
+    "glucose",
+    "hemoglobin A1c",
+    "creatinine",
+    "potassium",
+    "cholesterol in LDL",
+    "thyrotropin",
+    "bilirubin",
+    "leukocytes",
+    "vitamin D",
+    "body weight",
+    "gluc",
+    "hemo",
+]
+ANALYTES = [
+    "Glucose",
+    "Hemoglobin A1c/Hemoglobin.total",
+    "Creatinine",
+    "Potassium",
+    "Sodium",
+    "Cholesterol in LDL",
+    "Thyrotropin",
+    "Bilirubin.total",
+    "Leukocytes",
+    "Calcidiol",
+    "Body weight",
+    "Albumin",
+    "Ferritin",
+    "Troponin I.cardiac",
+]
+SYSTEMS = ["Ser/Plas", "Bld", "Urine", "CSF", "^Patient", "Ser", "Plas", "BldC"]
+PROPERTIES = ["MCnc", "SCnc", "MFr", "NCnc", "Mass", "ACnc"]
+
+
+def write_synthetic_table(path: Path, size: int) -> None:
+    random.seed(0)
+    with path.open("w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RECORD_FIELDS)
+        writer.writeheader()
+        for number in range(size):
+            component = random.choice(ANALYTES)
+            if number % 3:
+                component = f"{component}^{random.choice(['post CFst', 'pre dose', '2H'])}"
+            system = random.choice(SYSTEMS)
+            prop = random.choice(PROPERTIES)
+            writer.writerow(
+                {
+                    "LOINC_NUM": f"{number}-{number % 10}",
+                    "COMPONENT": component,
+                    "PROPERTY": prop,
+                    "SYSTEM": system,
+                    "STATUS": random.choice(["ACTIVE"] * 8 + ["DEPRECATED", "DISCOURAGED"]),
+                    "SHORTNAME": f"{component.split('/')[0][:12]} {system} {prop}",
+                    "LONG_COMMON_NAME": f"{component} [{prop}] in {system}",
+                    "COMMON_TEST_RANK": str(random.choice([0, 0, 0, random.randint(1, 20000)])),
+                },
+            )
+
+
+async def measure(client: LoincClient, queries: int) -> list[float]:
+    latencies = []
+    for number in range(queries):
+        started = time.perf_counter()
+        await client.get_common_loinc_codes(QUERIES[number % len(QUERIES)])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the offline LOINC index")
+    parser.add_argument("--csv", type=Path, help="Loinc.csv (default: synthetic table)")
+    parser.add_argument("--size", type=int, default=100_000, help="Rows of the synthetic table")
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = Path(directory) / "Loinc.csv"
+            write_synthetic_table(csv_path, args.size)
+
+        index_path = Path(directory) / "loinc-index.sqlite"
+        started = time.perf_counter()
+        count = build_index(csv_path, index_path)
+        print(
+            f"build: {count} codes in {time.perf_counter() - started:.1f} s, "
+            f"{index_path.stat().st_size / 1e6:.1f} MB",
+        )
+
+        client = LoincClient(index=LoincIndex(index_path))
+        latencies = asyncio.run(measure(client, args.queries))
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"lookup: mean {statistics.mean(latencies):.2f} ms, p50 {quantiles[49]:.2f} ms, "
+            f"p95 {quantiles[94]:.2f} ms, max {max(latencies):.2f} ms over {args.queries} queries",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark page-parallel PDF text extraction.
+
+Generates a text-heavy PDF and extracts it page by page in one process (the former
+`bytes_to_text`), then with `iter_pdf_pages` and 1, 2, 4, ... worker processes up to the
+number of cores.
+
+Usage:
+    uv run scripts/benchmarks/pdf_extraction.py --pages 400
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings  # noqa: E402
+from app.services.rag.pdf_extraction import iter_pdf_pages, shutdown_pool  # noqa: E402
+
+LINE = "Patient tolerated the procedure well; vital signs stable, plan discussed with family. "
+
+
+def build_pdf(path: Path, pages: int) -> None:
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page()
+            text = f"Discharge summary, page {number + 1}\n" + "\n".join([LINE] * 60)
+            page.insert_textbox(fitz.Rect(36, 36, 576, 756), text, fontsize=7)
+        doc.save(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark page-parallel PDF extraction")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--pages-per-task", type=int, default=settings.PDF_EXTRACT_PAGES_PER_TASK)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "summary.pdf"
+        build_pdf(path, args.pages)
+
+        started = time.perf_counter()
+        with fitz.open(path) as doc:
+            expected = "\n".join([page.get_text() for page in doc])
+        baseline = time.perf_counter() - started
+        print(f"{args.pages} pages, sequential: {baseline:.2f} s")
+
+        cores = os.cpu_count() or 1
+        workers = 1
+        while True:
+            settings.PDF_EXTRACT_WORKERS = workers
+            started = time.perf_counter()
+            text = "\n".join(iter_pdf_pages(path, args.pages_per_task))
+            elapsed = time.perf_counter() - started
+            shutdown_pool()
+            assert text == expected
+            print(f"{workers:>3} workers: {elapsed:.2f} s ({baseline / elapsed:.1f}x)")
+            if workers >= cores:
+                break
+            workers = min(workers * 2, cores)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Embed the active codes of the offline LOINC index for semantic LOINC search (`find_loinc_codes`).
+
+Build the index first (`scripts/loinc/build_index.py`); the embeddings use `EMBEDDING_MODEL`,
+which must stay the same while they are served. Set `LOINC_EMBEDDINGS_PATH` to the output
+directory.
+
+Usage:
+    uv run scripts/loinc/build_embeddings.py
+    uv run scripts/loinc/build_embeddings.py --output /data/loinc-embeddings
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings  # noqa: E402
+from app.services.loinc_semantic import build_embeddings  # noqa: E402
+from app.services.rag.semantic_embedder import SemanticEmbedder  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed the LOINC index for semantic search")
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=Path(settings.LOINC_INDEX_PATH or "~/.cache/fhir-mcp-server/loinc-index.sqlite"),
+        help="Index built by build_index.py (default: LOINC_INDEX_PATH)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(settings.LOINC_EMBEDDINGS_PATH or "~/.cache/fhir-mcp-server/loinc-embeddings"),
+        help="Output directory (default: LOINC_EMBEDDINGS_PATH)",
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.EMBED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    output = args.output.expanduser()
+    started = time.perf_counter()
+    count = build_embeddings(
+        args.index.expanduser(),
+        output,
+        SemanticEmbedder(model_name=settings.EMBEDDING_MODEL),
+        batch_size=args.batch_size,
+    )
+    print(f"Embedded {count} LOINC codes in {time.perf_counter() - started:.0f} s: {output}")
+    if not settings.LOINC_EMBEDDINGS_PATH:
+        print(f"Set LOINC_EMBEDDINGS_PATH={output} to use them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Build the offline LOINC index from the LOINC table CSV of an official release.
+
+Download the release from https://loinc.org/downloads/ (account required), then point this at
+`LoincTable/Loinc.csv` and set `LOINC_INDEX_PATH` to the output file.
+
+Usage:
+    uv run scripts/loinc/build_index.py LoincTable/Loinc.csv
+    uv run scripts/loinc/build_index.py LoincTable/Loinc.csv --output /data/loinc-index.sqlite
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings  # noqa: E402
+from app.services.loinc_index import build_index  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the offline LOINC index")
+    parser.add_argument("csv", type=Path, help="Loinc.csv of a LOINC release")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(settings.LOINC_INDEX_PATH or "~/.cache/fhir-mcp-server/loinc-index.sqlite"),
+        help="Index file (default: LOINC_INDEX_PATH)",
+    )
+    args = parser.parse_args()
+
+    output = args.output.expanduser()
+    started = time.perf_counter()
+    count = build_index(args.csv, output)
+    print(
+        f"Indexed {count} LOINC codes in {time.perf_counter() - started:.1f} s: {output} "
+        f"({output.stat().st_size / 1e6:.1f} MB)",
+    )
+    if not settings.LOINC_INDEX_PATH:
+        print(f"Set LOINC_INDEX_PATH={output} to use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Pre-populate the LOINC cache with the searches the most common lab components trigger.
+
+Runs the same lookup as the `get_loinc_codes` tool (same sort order and rows) for the top N
+components, so the first users after a deployment do not wait for the LOINC API.
+
+Usage:
+    uv run scripts/loinc/warm_cache.py --top 50
+    uv run scripts/loinc/warm_cache.py --file components.txt --max-fetch 100
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings  # noqa: E402
+from app.services.loinc_client import loinc_client  # noqa: E402
+
+# Most frequently ordered laboratory tests and vital signs, most common first.
+TOP_COMPONENTS = [
+    "glucose",
+    "hemoglobin A1c",
+    "creatinine",
+    "potassium",
+    "sodium",
+    "chloride",
+    "carbon dioxide",
+    "urea nitrogen",
+    "calcium",
+    "hemoglobin",
+    "hematocrit",
+    "leukocytes",
+    "platelets",
+    "erythrocytes",
+    "cholesterol",
+    "triglyceride",
+    "cholesterol in HDL",
+    "cholesterol in LDL",
+    "alanine aminotransferase",
+    "aspartate aminotransferase",
+    "alkaline phosphatase",
+    "bilirubin",
+    "albumin",
+    "protein",
+    "thyrotropin",
+    "thyroxine free",
+    "glomerular filtration rate",
+    "MCV",
+    "MCH",
+    "MCHC",
+    "RDW",
+    "neutrophils",
+    "lymphocytes",
+    "monocytes",
+    "eosinophils",
+    "basophils",
+    "magnesium",
+    "phosphate",
+    "ferritin",
+    "iron",
+    "vitamin D",
+    "vitamin B12",
+    "folate",
+    "C reactive protein",
+    "INR",
+    "prothrombin time",
+    "troponin",
+    "natriuretic peptide B",
+    "urate",
+    "prostate specific antigen",
+    "body weight",
+    "body height",
+    "body mass index",
+    "heart rate",
+    "respiratory rate",
+    "body temperature",
+    "systolic blood pressure",
+    "diastolic blood pressure",
+    "oxygen saturation",
+]
+
+
+async def warm(components: list[str], max_fetch: int, concurrency: int) -> None:
+    started = time.perf_counter()
+    results = await loinc_client.get_common_loinc_codes_batch(
+        components,
+        max_fetch=max_fetch,
+        concurrency=concurrency,
+    )
+    failures = 0
+    for component, codes in results.items():
+        if codes and "Error" in codes[0] and codes[0].get("RecordsFound") != 0:
+            failures += 1
+            print(f"  {component}: {codes[0]['Error']}")
+    await loinc_client.aclose()
+
+    assert loinc_client.cache is not None
+    stats = loinc_client.cache.stats()
+    print(
+        f"{len(components)} components in {time.perf_counter() - started:.1f} s: "
+        f"{stats['misses']} fetched, {stats['hits']} already cached, {failures} failed; "
+        f"{stats['entries']} entries in the cache",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-populate the LOINC lookup cache")
+    parser.add_argument("--top", type=int, default=len(TOP_COMPONENTS), help="Components")
+    parser.add_argument("--file", type=Path, help="Component names, one per line")
+    parser.add_argument("--max-fetch", type=int, default=settings.LOINC_MAX_FETCH, help="Rows")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lookups in flight")
+    args = parser.parse_args()
+
+    if loinc_client.cache is None:
+        sys.exit("LOINC_CACHE_ENABLED is off, there is nothing to warm up")
+
+    if args.file is not None:
+        lines = args.file.read_text().splitlines()
+        components = [line.strip() for line in lines if line.strip()]
+    else:
+        components = TOP_COMPONENTS
+    asyncio.run(warm(components[: args.top], args.max_fetch, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
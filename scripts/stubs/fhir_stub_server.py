@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Minimal FHIR server stub for benchmarks and local manual testing.
+
+Serves synthetic resources and paged searchset Bundles under `/fhir/R4` with a configurable
+per-request latency, so client-side behaviour can be measured without a real FHIR server.
+`/metadata` advertises `_summary`/`_elements`, which are honoured on reads and searches, and
+`/oauth2/token` issues tokens for any client credentials. Bulk Data `$export` (system, patient
+and group level) completes after `--export-delay` seconds and serves one streamed NDJSON file
+per requested type. Subscriptions with a `rest-hook` channel are kept, and every write of a
+subscribed type is notified to the channel endpoint: the written resource is PUT to
+`{endpoint}/{type}/{id}` and a delete posts an empty ping, as an R4 server does.
+
+Usage:
+    uv run scripts/stubs/fhir_stub_server.py --port 8090 --latency 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import suppress
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+BASE_PATH = "/fhir/R4"
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.05
+    total: int = 100
+    page_size: int = 20
+    # answer 429 with Retry-After when more requests than this are in progress (0: no limit)
+    max_concurrency: int = 0
+    retry_after: int = 1
+    token_expires_in: int = 3600
+    # bulk export: seconds until an export is ready, and resources per NDJSON file
+    export_delay: float = 1.0
+    export_resources: int = 1000
+
+
+def build_resource(resource_type: str, resource_id: str) -> dict:
+    return {
+        "resourceType": resource_type,
+        "id": resource_id,
+        "meta": {"versionId": "1", "lastUpdated": "2025-01-01T00:00:00Z"},
+        "text": {"status": "generated", "div": "<div>" + "x" * 256 + "</div>"},
+        "status": "final",
+        "subject": {"reference": "Patient/1"},
+    }
+
+
+def build_capability_statement() -> dict:
+    return {
+        "resourceType": "CapabilityStatement",
+        "status": "active",
+        "kind": "instance",
+        "fhirVersion": "4.0.1",
+        "format": ["json"],
+        "rest": [
+            {
+                "mode": "server",
+                "searchParam": [
+                    {"name": "_summary", "type": "token"},
+                    {"name": "_elements", "type": "string"},
+                ],
+            },
+        ],
+    }
+
+
+def project_resource(resource: dict, query: dict[str, list[str]]) -> dict:
+    """Apply `_summary=data` and `_elements` the way a real server would."""
+    if query.get("_summary") == ["data"]:
+        resource = {key: value for key, value in resource.items() if key != "text"}
+    if elements := query.get("_elements"):
+        keep = {"resourceType", "id", "meta", *elements[0].split(",")}
+        resource = {key: value for key, value in resource.items() if key in keep}
+    return resource
+
+
+class FhirStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = StubConfig()
+    active = 0
+    active_lock = threading.Lock()
+    # export id -> (ready at, exported types)
+    exports: dict[str, tuple[float, list[str]]] = {}
+    # subscription id -> Subscription resource
+    subscriptions: dict[str, dict] = {}
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _overloaded(self) -> bool:
+        """Answer 429 if more than `max_concurrency` GETs are in progress."""
+        if not self.config.max_concurrency:
+            return False
+        with self.active_lock:
+            if type(self).active >= self.config.max_concurrency:
+                overloaded = True
+            else:
+                overloaded = False
+                type(self).active += 1
+        if overloaded:
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.config.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        return overloaded
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/fhir+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _search(self, resource_type: str, query: dict[str, list[str]]) -> dict:
+        count = int(query.get("_count", [self.config.page_size])[0])
+        offset = int(query.get("_offset", ["0"])[0])
+        end = min(offset + count, self.config.total)
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": self.config.total,
+            "link": [],
+            "entry": [
+                {"resource": project_resource(build_resource(resource_type, str(i)), query)}
+                for i in range(offset, end)
+            ],
+        }
+        if end < self.config.total:
+            next_query = {k: v[0] for k, v in query.items()}
+            next_query.update({"_count": str(count), "_offset": str(end)})
+            next_url = (
+                f"http://{self.headers['Host']}{BASE_PATH}/{resource_type}?{urlencode(next_query)}"
+            )
+            bundle["link"].append({"relation": "next", "url": next_url})
+        return bundle
+
+    def do_GET(self) -> None:
+        if self._overloaded():
+            return
+        try:
+            self._get()
+        finally:
+            if self.config.max_concurrency:
+                with self.active_lock:
+                    type(self).active -= 1
+
+    def _send_empty(self, status: int, headers: dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _kick_off_export(self, query: dict[str, list[str]]) -> None:
+        export_id = uuid.uuid4().hex
+        types = query.get("_type", ["Patient,Observation"])[0].split(",")
+        self.exports[export_id] = (time.monotonic() + self.config.export_delay, types)
+        location = f"http://{self.headers['Host']}/bulk-status/{export_id}"
+        self._send_empty(202, {"Content-Location": location})
+
+    def _export_status(self, export_id: str) -> None:
+        if export_id not in self.exports:
+            self._send_json({"resourceType": "OperationOutcome"}, status=404)
+            return
+        ready_at, types = self.exports[export_id]
+        remaining = ready_at - time.monotonic()
+        if remaining > 0:
+            self._send_empty(202, {"X-Progress": "in progress", "Retry-After": "1"})
+            return
+        host = self.headers["Host"]
+        self._send_json(
+            {
+                "transactionTime": "2025-01-01T00:00:00Z",
+                "request": f"http://{host}{BASE_PATH}/$export",
+                "requiresAccessToken": True,
+                "output": [
+                    {
+                        "type": resource_type,
+                        "url": f"http://{host}/bulk-files/{export_id}/{resource_type}.ndjson",
+                        "count": self.config.export_resources,
+                    }
+                    for resource_type in types
+                ],
+                "error": [],
+            },
+        )
+
+    def _export_file(self, resource_type: str) -> None:
+        """Stream the file with chunked encoding, as large exports are served."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/fhir+ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        lines = []
+        for i in range(self.config.export_resources):
+            lines.append(json.dumps(build_resource(resource_type, str(i))) + "\n")
+            if len(lines) == 100 or i == self.config.export_resources - 1:
+                chunk = "".join(lines).encode("utf-8")
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                lines = []
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _get(self) -> None:
+        time.sleep(self.config.latency)
+        url = urlsplit(self.path)
+        parts = url.path.removeprefix(BASE_PATH).strip("/").split("/")
+        query = parse_qs(url.query)
+        if parts[-1] == "$export":
+            self._kick_off_export(query)
+        elif parts[0] == "bulk-status" and len(parts) == 2:
+            self._export_status(parts[1])
+        elif parts[0] == "bulk-files" and len(parts) == 3:
+            self._export_file(parts[2].removesuffix(".ndjson"))
+        elif parts == ["Subscription"]:
+            self._search_subscriptions(query)
+        elif parts == ["metadata"]:
+            self._send_json(build_capability_statement())
+        elif len(parts) == 1 and parts[0]:
+            self._send_json(self._search(parts[0], query))
+        elif len(parts) == 2:
+            self._send_json(project_resource(build_resource(parts[0], parts[1]), query))
+        else:
+            self._send_json({"resourceType": "OperationOutcome"}, status=404)
+
+    def _bundle_entry_response(self, entry: dict) -> dict:
+        request = entry.get("request", {})
+        url = urlsplit(request.get("url", ""))
+        parts = url.path.strip("/").split("/")
+        if request.get("method") == "GET":
+            if len(parts) == 2:
+                resource = build_resource(parts[0], parts[1])
+            else:
+                resource = self._search(parts[0], parse_qs(url.query))
+            return {"resource": resource, "response": {"status": "200 OK"}}
+        if request.get("method") == "DELETE":
+            return {"response": {"status": "204 No Content"}}
+        resource = {**entry.get("resource", {}), "id": entry.get("resource", {}).get("id", "new")}
+        status = "201 Created" if request.get("method") == "POST" else "200 OK"
+        return {"resource": resource, "response": {"status": status}}
+
+    def _issue_token(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send_json(
+            {
+                "access_token": f"stub-{time.monotonic_ns()}",
+                "token_type": "Bearer",
+                "expires_in": self.config.token_expires_in,
+            },
+        )
+
+    def _search_subscriptions(self, query: dict[str, list[str]]) -> None:
+        endpoint = query.get("url", [None])[0]
+        self._send_json(
+            {
+                "resourceType": "Bundle",
+                "type": "searchset",
+                "total": len(self.subscriptions),
+                "entry": [
+                    {"resource": subscription}
+                    for subscription in self.subscriptions.values()
+                    if endpoint is None or subscription["channel"].get("endpoint") == endpoint
+                ],
+            },
+        )
+
+    def _notify(self, resource_type: str, resource: dict | None, resource_id: str) -> None:
+        """Notify the subscriptions of `resource_type` of a write, in the background."""
+        for subscription in list(self.subscriptions.values()):
+            channel = subscription.get("channel", {})
+            if subscription.get("criteria", "").split("?")[0] != resource_type:
+                continue
+            headers = dict(header.split(": ", 1) for header in channel.get("header", []))
+            if resource is None:
+                request = urllib.request.Request(
+                    channel["endpoint"],
+                    data=b"",
+                    headers=headers,
+                    method="POST",
+                )
+            else:
+                request = urllib.request.Request(
+                    f"{channel['endpoint']}/{resource_type}/{resource_id}",
+                    data=json.dumps(resource).encode("utf-8"),
+                    headers={**headers, "Content-Type": "application/fhir+json"},
+                    method="PUT",
+                )
+            threading.Thread(target=_deliver, args=(request,), daemon=True).start()
+
+    def do_POST(self) -> None:
+        time.sleep(self.config.latency)
+        if self.path == "/oauth2/token":
+            self._issue_token()
+            return
+        resource = self._read_json()
+        if resource.get("resourceType") == "Bundle" and self.path.rstrip("/") == BASE_PATH:
+            self._send_json(
+                {
+                    "resourceType": "Bundle",
+                    "type": f"{resource.get('type', 'batch')}-response",
+                    "entry": [self._bundle_entry_response(e) for e in resource.get("entry", [])],
+                },
+            )
+            return
+        if resource.get("resourceType") == "Subscription":
+            resource.update(id=uuid.uuid4().hex, status="active")
+            self.subscriptions[resource["id"]] = resource
+        resource.setdefault("id", "new")
+        self._send_json(resource, status=201)
+        self._notify(resource.get("resourceType", ""), resource, resource["id"])
+
+    def do_PUT(self) -> None:
+        time.sleep(self.config.latency)
+        resource = self._read_json()
+        self._send_json(resource)
+        parts = self.path.removeprefix(BASE_PATH).strip("/").split("/")
+        if len(parts) == 2:
+            self._notify(parts[0], resource, parts[1])
+
+    def do_DELETE(self) -> None:
+        time.sleep(self.config.latency)
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "bulk-status" and len(parts) == 2:
+            self.exports.pop(parts[1], None)
+            self._send_empty(202, {})
+            return
+        parts = self.path.removeprefix(BASE_PATH).strip("/").split("/")
+        if parts[0] == "Subscription" and len(parts) == 2:
+            self.subscriptions.pop(parts[1], None)
+        self._send_json({"resourceType": "OperationOutcome", "issue": []})
+        if len(parts) == 2:
+            self._notify(parts[0], None, parts[1])
+
+
+def _deliver(request: urllib.request.Request) -> None:
+    # like a real server, give up on unreachable endpoints
+    with suppress(OSError):
+        urllib.request.urlopen(request, timeout=10).close()
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def start_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    config: StubConfig | None = None,
+) -> ThreadingHTTPServer:
+    """Start the stub in a daemon thread; the bound port is `server.server_address[1]`."""
+    handler = type(
+        "StubHandler",
+        (FhirStubHandler,),
+        {
+            "config": config or StubConfig(),
+            "active": 0,
+            "active_lock": threading.Lock(),
+            "exports": {},
+            "subscriptions": {},
+        },
+    )
+    server = StubHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a FHIR server stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--total", type=int, default=100, help="Search result size")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=0,
+        help="Answer 429 above this many concurrent requests (0: no limit)",
+    )
+    parser.add_argument("--export-delay", type=float, default=1.0, help="Seconds per $export")
+    parser.add_argument("--export-resources", type=int, default=1000, help="Lines per file")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        total=args.total,
+        page_size=args.page_size,
+        max_concurrency=args.max_concurrency,
+        export_delay=args.export_delay,
+        export_resources=args.export_resources,
+    )
+    server = start_stub_server(args.host, args.port, config)
+    print(f"FHIR stub listening on http://{args.host}:{args.port}{BASE_PATH}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any
+
+import httpx
+import orjson
+import pytest
+
+from app.schemas.fhir_schemas import FhirError, FhirQueryRequest, FhirQueryResponse
+from app.services.fhir.fhir_client import FhirClient
+
+
+class BundleServer:
+    """Answers each entry of a posted Bundle, the later bundles first."""
+
+    def __init__(self, failing: set[str] | None = None):
+        self.failing = failing or set()
+        self.bundles: list[dict] = []
+
+    async def send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        bundle = kwargs["json"]
+        self.bundles.append(bundle)
+        # delay earlier bundles so that their responses arrive last
+        await asyncio.sleep(0.01 / len(self.bundles))
+        entries = []
+        for entry in bundle["entry"]:
+            path = entry["request"]["url"]
+            status = "404 Not Found" if path in self.failing else "200 OK"
+            entries.append({"response": {"status": status}, "resource": {"id": path}})
+        return httpx.Response(200, content=orjson.dumps({"entry": entries}))
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> BundleServer:
+    monkeypatch.setattr("app.services.fhir.fhir_client.settings.FHIR_BATCH_MAX_ENTRIES", 2)
+    return BundleServer()
+
+
+def client_for(server: BundleServer, monkeypatch: pytest.MonkeyPatch) -> FhirClient:
+    client = FhirClient()
+    monkeypatch.setattr(client, "_send", server.send)
+    return client
+
+
+def reads(count: int) -> list[FhirQueryRequest]:
+    return [FhirQueryRequest(method="GET", path=f"/Patient/{index}") for index in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_batch_is_split_and_answered_in_request_order(
+    server: BundleServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client = client_for(server, monkeypatch)
+
+    results = await client.batch(reads(5))
+
+    assert [len(bundle["entry"]) for bundle in server.bundles] == [2, 2, 1]
+    assert all(isinstance(result, FhirQueryResponse) for result in results)
+    assert [result.path for result in results] == [
+        f"{client.base_url}/Patient/{index}" for index in range(5)
+    ]
+    assert [result.response for result in results] == [
+        {"id": f"Patient/{index}"} for index in range(5)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_transaction_is_never_split(
+    server: BundleServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client = client_for(server, monkeypatch)
+
+    await client.batch(reads(5), "transaction")
+
+    assert len(server.bundles) == 1
+    assert server.bundles[0]["type"] == "transaction"
+
+
+@pytest.mark.asyncio
+async def test_failed_entries_become_errors_in_place(
+    server: BundleServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    server.failing = {"Patient/1"}
+    client = client_for(server, monkeypatch)
+
+    results = await client.batch(reads(3))
+
+    assert [type(result) for result in results] == [FhirQueryResponse, FhirError, FhirQueryResponse]
+    assert "404 Not Found" in results[1].error_message
+
+
+@pytest.mark.asyncio
+async def test_failed_bundle_fails_only_its_own_entries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.services.fhir.fhir_client.settings.FHIR_BATCH_MAX_ENTRIES", 2)
+    server = BundleServer()
+    answer = server.send
+
+    async def send(method: str, url: str, **kwargs: Any) -> httpx.Response:
+        if kwargs["json"]["entry"][0]["request"]["url"] == "Patient/2":
+            raise httpx.ConnectError("connection refused")
+        return await answer(method, url, **kwargs)
+
+    client = FhirClient()
+    monkeypatch.setattr(client, "_send", send)
+
+    results = await client.batch(reads(4))
+
+    assert [type(result) for result in results] == [
+        FhirQueryResponse,
+        FhirQueryResponse,
+        FhirError,
+        FhirError,
+    ]
+    assert "connection refused" in results[2].error_message
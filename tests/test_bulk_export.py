@@ -0,0 +1,122 @@
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, cast
+
+import httpx
+import pytest
+
+from app.schemas.fhir_schemas import BulkExportStatus
+from app.services.fhir import bulk_export
+from app.services.fhir.bulk_export import BulkExportJob, BulkExportService
+from app.services.fhir.fhir_client import FhirClient
+
+
+class StreamResponse:
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    async def aiter_bytes(self) -> AsyncIterator[bytes]:
+        for chunk in self.chunks:
+            yield chunk
+
+
+class StreamingClient:
+    base_url = "https://fhir.example.com/fhir"
+
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    @asynccontextmanager
+    async def stream(self, url: str, **kwargs: Any) -> AsyncGenerator[StreamResponse]:
+        yield StreamResponse(self.chunks)
+
+
+def finished_job(directory: Path, finished_at: float | None) -> BulkExportJob:
+    return BulkExportJob(
+        status=BulkExportStatus(job_id="job", state="completed", output_dir=str(directory)),
+        directory=directory,
+        finished_at=finished_at,
+    )
+
+
+def test_finished_jobs_are_forgotten_after_the_ttl(tmp_path: Path) -> None:
+    service = BulkExportService(cast(FhirClient, StreamingClient([])), tmp_path, job_ttl=60.0)
+    service.jobs["expired"] = finished_job(tmp_path, time.monotonic() - 61.0)
+    service.jobs["recent"] = finished_job(tmp_path, time.monotonic())
+    service.jobs["running"] = finished_job(tmp_path, None)
+
+    assert service.get_status("recent").state == "completed"
+    assert set(service.jobs) == {"recent", "running"}
+    with pytest.raises(ValueError, match="Unknown bulk export job"):
+        service.get_status("expired")
+
+
+@pytest.mark.asyncio
+async def test_download_writes_ndjson_lines_in_chunks(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(bulk_export, "WRITE_BUFFER_SIZE", 16)
+    lines = [b'{"resourceType":"Patient","id":"%d"}' % index for index in range(5)]
+    client = StreamingClient([b"\n".join(lines[:3]) + b"\n\n", b"\n".join(lines[3:])])
+    service = BulkExportService(cast(FhirClient, client), tmp_path)
+    job = finished_job(tmp_path, None)
+    path = tmp_path / "Patient-0.ndjson"
+
+    await service._download_file(job, path, "Patient", "https://files/1", True)
+
+    assert path.read_bytes().splitlines() == lines
+    assert job.status.resources == {"Patient": 5}
+    assert job.status.bytes_downloaded == path.stat().st_size
+
+
+class KickoffClient:
+    base_url = "https://fhir.example.com/fhir"
+
+    def __init__(self) -> None:
+        self.calls: list[dict[str, Any]] = []
+
+    async def send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        self.calls.append({"method": method, "url": url, **kwargs})
+        return httpx.Response(
+            202,
+            headers={"Content-Location": "/fhir/status/1"},
+            request=httpx.Request(method, url),
+        )
+
+
+@pytest.mark.asyncio
+async def test_kickoff_is_sent_once_without_retries(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client = KickoffClient()
+    service = BulkExportService(cast(FhirClient, client), tmp_path)
+
+    async def run(job: BulkExportJob) -> None:
+        pass
+
+    monkeypatch.setattr(service, "_run", run)
+
+    status = await service.start(["Patient"])
+
+    assert [call["retry"] for call in client.calls] == [False]
+    assert service.jobs[status.job_id].status_url == "https://fhir.example.com/fhir/status/1"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("resource_type", ["../../etc/passwd", "Patient/x", "Patient\n", None])
+async def test_manifest_with_an_invalid_resource_type_is_refused(
+    tmp_path: Path,
+    resource_type: str | None,
+) -> None:
+    service = BulkExportService(cast(FhirClient, StreamingClient([])), tmp_path)
+    job = finished_job(tmp_path / "job", None)
+    manifest = {"output": [{"type": resource_type, "url": "https://files/1"}]}
+
+    with pytest.raises(ValueError, match="invalid resource type"):
+        await service._download_all(job, manifest)
+
+    assert not job.directory.exists()
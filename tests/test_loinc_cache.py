@@ -0,0 +1,27 @@
+import pytest
+
+from app.services.loinc_cache import LoincCache
+
+RESPONSE = {"ResponseSummary": {"RecordsFound": 1}, "Results": [{"LOINC_NUM": "4548-4"}]}
+
+
+@pytest.mark.asyncio
+async def test_cached_response_is_served_for_the_same_search() -> None:
+    cache = LoincCache(":memory:", ttl=60.0, max_entries=10)
+
+    assert await cache.get("HbA1c", "common_test_rank asc", 10) is None
+    await cache.put(" hba1c ", "common_test_rank asc", 10, 0, RESPONSE)
+
+    assert await cache.get("HbA1c", "common_test_rank asc", 10) == RESPONSE
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "errors": 0}
+
+
+@pytest.mark.asyncio
+async def test_database_failures_are_counted_as_misses() -> None:
+    cache = LoincCache(":memory:", ttl=60.0, max_entries=10)
+    cache._db.close()
+
+    await cache.put("HbA1c", "common_test_rank asc", 10, 0, RESPONSE)
+    assert await cache.get("HbA1c", "common_test_rank asc", 10) is None
+
+    assert cache.errors == 2
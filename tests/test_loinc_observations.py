@@ -0,0 +1,9 @@
+import pytest
+
+from app.services.fhir.loinc_observations import loinc_observation_service
+
+
+@pytest.mark.asyncio
+async def test_search_without_resolved_codes_is_rejected() -> None:
+    with pytest.raises(ValueError, match="No LOINC codes resolved"):
+        await loinc_observation_service.search("1", loinc_codes=[""])
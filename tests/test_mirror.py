@@ -0,0 +1,236 @@
+import time
+from collections.abc import Iterator
+
+import orjson
+import pytest
+
+from app.services.fhir.mirror import ResourceMirror
+from app.services.fhir.utils import parse_resource_path
+
+BASE_URL = "https://fhir.example.com/fhir"
+PRINCIPAL = "principal"
+
+
+def observation(resource_id: str, patient: str = "1", code: str = "2339-0") -> dict:
+    return {
+        "resourceType": "Observation",
+        "id": resource_id,
+        "status": "final",
+        "code": {"coding": [{"system": "http://loinc.org", "code": code}]},
+        "subject": {"reference": f"Patient/{patient}"},
+        "effectiveDateTime": "2025-01-01T00:00:00Z",
+        "valueQuantity": {"value": 90, "unit": "mg/dL"},
+    }
+
+
+def bundle(*resources: dict) -> dict:
+    return {
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "entry": [{"resource": resource} for resource in resources],
+    }
+
+
+@pytest.fixture
+def mirror() -> Iterator[ResourceMirror]:
+    mirror = ResourceMirror(":memory:", BASE_URL, 60.0, ["Patient", "Observation"])
+    yield mirror
+    mirror.close()
+
+
+def record(mirror: ResourceMirror, path: str, data: dict, complete: bool) -> None:
+    mirror.record(PRINCIPAL, path, data, complete, mirror.generation(parse_resource_path(path)[0]))
+
+
+def lookup_resources(mirror: ResourceMirror, path: str) -> list[dict] | None:
+    result = mirror.lookup(PRINCIPAL, path)
+    if result is None:
+        return None
+    data = orjson.loads(result[0])
+    if data["resourceType"] != "Bundle":
+        return [data]
+    return [entry["resource"] for entry in data["entry"]]
+
+
+def test_complete_compartment_is_served(mirror: ResourceMirror) -> None:
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") == [observation("o1")]
+    assert lookup_resources(mirror, "/Observation/o1") == [observation("o1")]
+
+
+def test_read_with_elements_is_not_recorded(mirror: ResourceMirror) -> None:
+    record(
+        mirror,
+        "/Patient/1?_elements=id",
+        {"resourceType": "Patient", "id": "1"},
+        True,
+    )
+
+    assert lookup_resources(mirror, "/Patient/1") is None
+
+
+def test_search_with_elements_does_not_cover_the_compartment(mirror: ResourceMirror) -> None:
+    stripped = {"resourceType": "Observation", "id": "o1", "subject": {"reference": "Patient/1"}}
+    record(mirror, "/Observation?patient=1&_elements=subject", bundle(stripped), True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o1") is None
+
+
+@pytest.mark.parametrize(
+    "modifier",
+    ["_summary=true", "_include=Observation:subject", "_revinclude:iterate=X", "_contained=true"],
+)
+def test_result_modifiers_are_not_recorded(mirror: ResourceMirror, modifier: str) -> None:
+    record(mirror, f"/Observation?patient=1&{modifier}", bundle(observation("o1")), True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o1") is None
+
+
+def test_subsetted_resources_are_not_recorded(mirror: ResourceMirror) -> None:
+    subsetted = observation("o1")
+    subsetted["meta"] = {"tag": [{"code": "SUBSETTED"}]}
+    record(mirror, "/Observation?patient=1", bundle(subsetted, observation("o2")), True)
+    record(mirror, "/Observation/o3", {**subsetted, "id": "o3"}, True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o3") is None
+
+
+def test_filtered_searches_are_served_from_a_covered_compartment(mirror: ResourceMirror) -> None:
+    glucose, hba1c = observation("o1", code="2339-0"), observation("o2", code="4548-4")
+    record(mirror, "/Observation?patient=1", bundle(glucose, hba1c), True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1&code=4548-4") == [hba1c]
+    assert lookup_resources(mirror, "/Observation?patient=1&code=http://loinc.org|2339-0") == [
+        glucose,
+    ]
+    assert lookup_resources(mirror, "/Observation?patient=Patient/1&code=1-1") == []
+
+
+def test_recorded_compartment_replaces_the_stored_one(mirror: ResourceMirror) -> None:
+    record(
+        mirror,
+        "/Observation?patient=1",
+        bundle(observation("o1"), observation("o2")),
+        True,
+    )
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") == [observation("o1")]
+    assert lookup_resources(mirror, "/Observation/o2") is None
+
+
+def test_incomplete_result_does_not_cover_the_compartment(mirror: ResourceMirror) -> None:
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), False)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o1") == [observation("o1")]
+
+
+def test_page_with_a_next_link_does_not_cover_the_compartment(mirror: ResourceMirror) -> None:
+    page = bundle(observation("o1"))
+    page["link"] = [{"relation": "next", "url": f"{BASE_URL}/Observation?page=2"}]
+    record(mirror, "/Observation?patient=1", page, True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+
+
+def test_filtered_result_does_not_cover_the_compartment(mirror: ResourceMirror) -> None:
+    record(mirror, "/Observation?patient=1&code=2339-0", bundle(observation("o1")), True)
+
+    assert lookup_resources(mirror, "/Observation?patient=1&code=2339-0") is None
+    assert lookup_resources(mirror, "/Observation/o1") == [observation("o1")]
+
+
+def test_compartment_searches_go_to_the_server(mirror: ResourceMirror) -> None:
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), True)
+    record(mirror, "/Patient/2/Observation", bundle(observation("o2", "2")), True)
+
+    assert lookup_resources(mirror, "/Patient/1/Observation") is None
+    assert lookup_resources(mirror, "/Observation?patient=2") is None
+    assert lookup_resources(mirror, "/Observation/o2") == [observation("o2", "2")]
+
+
+def test_page_smaller_than_the_result_goes_to_the_server(mirror: ResourceMirror) -> None:
+    record(
+        mirror,
+        "/Observation?patient=1",
+        bundle(observation("o1"), observation("o2")),
+        True,
+    )
+
+    assert lookup_resources(mirror, "/Observation?patient=1&_count=1") is None
+    assert len(lookup_resources(mirror, "/Observation?patient=1&_count=2") or []) == 2
+
+
+def test_other_principals_are_not_served(mirror: ResourceMirror) -> None:
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), True)
+
+    assert mirror.lookup("other", "/Observation?patient=1") is None
+    assert mirror.lookup("other", "/Observation/o1") is None
+
+
+def test_write_drops_the_resource_and_the_coverage_of_its_type(mirror: ResourceMirror) -> None:
+    record(
+        mirror,
+        "/Observation?patient=1",
+        bundle(observation("o1"), observation("o2")),
+        True,
+    )
+
+    mirror.invalidate("Observation", "o1")
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o1") is None
+    assert lookup_resources(mirror, "/Observation/o2") == [observation("o2")]
+
+
+def test_write_of_unknown_type_clears_the_mirror(mirror: ResourceMirror) -> None:
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), True)
+
+    mirror.invalidate(None)
+
+    assert lookup_resources(mirror, "/Observation/o1") is None
+
+
+def test_expired_resources_and_coverage_are_not_served(
+    mirror: ResourceMirror,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    record(mirror, "/Observation?patient=1", bundle(observation("o1")), True)
+    now = time.time()
+
+    monkeypatch.setattr(time, "time", lambda: now + mirror.max_age + 1)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o1") is None
+
+
+def test_search_started_before_a_write_is_not_recorded(mirror: ResourceMirror) -> None:
+    generation = mirror.generation("Observation")
+    # the search is sent, then a write of an Observation is invalidated before it is recorded
+    mirror.invalidate("Observation", "o2")
+
+    mirror.record(
+        PRINCIPAL,
+        "/Observation?patient=1",
+        bundle(observation("o1")),
+        True,
+        generation,
+    )
+
+    assert lookup_resources(mirror, "/Observation?patient=1") is None
+    assert lookup_resources(mirror, "/Observation/o1") is None
+    assert mirror.stats()["stale_records"] == 1
+
+
+def test_write_of_another_type_does_not_drop_a_search(mirror: ResourceMirror) -> None:
+    generation = mirror.generation("Observation")
+    mirror.invalidate("Condition", "c1")
+
+    mirror.record(PRINCIPAL, "/Observation?patient=1", bundle(observation("o1")), True, generation)
+
+    assert lookup_resources(mirror, "/Observation?patient=1") == [observation("o1")]
@@ -0,0 +1,142 @@
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any, cast
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import orjson
+import pytest
+
+from app.services.fhir.capabilities import ServerCapabilities
+from app.services.fhir.fhir_client import FhirClient
+from app.services.fhir.mirror import ResourceMirror
+from app.services.fhir.mirror_sync import MirrorSync
+
+BASE_URL = "https://fhir.example.com/fhir"
+PRINCIPAL = "principal"
+
+
+def observation(resource_id: str, value: int = 90) -> dict:
+    return {
+        "resourceType": "Observation",
+        "id": resource_id,
+        "status": "final",
+        "subject": {"reference": "Patient/1"},
+        "valueQuantity": {"value": value, "unit": "mg/dL"},
+    }
+
+
+class ChangeServer:
+    """Answers change queries with scripted pages, recording the URLs it was asked for."""
+
+    base_url = BASE_URL
+    cache = None
+
+    def __init__(self, pages: list[list[dict]], history: bool = True):
+        self.pages = pages
+        self.history = history
+        self.urls: list[str] = []
+
+    async def principal(self) -> str:
+        return PRINCIPAL
+
+    async def get_capabilities(self) -> ServerCapabilities:
+        interactions = [{"code": "history-type"}] if self.history else []
+        return ServerCapabilities(
+            {"rest": [{"resource": [{"type": "Observation", "interaction": interactions}]}]},
+        )
+
+    async def send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        self.urls.append(url)
+        page = int(url.rsplit("/", 1)[1]) if url.startswith(f"{BASE_URL}/page/") else 0
+        bundle: dict = {"resourceType": "Bundle", "entry": self.pages[page]}
+        if page + 1 < len(self.pages):
+            bundle["link"] = [{"relation": "next", "url": f"{BASE_URL}/page/{page + 1}"}]
+        return httpx.Response(200, content=orjson.dumps(bundle))
+
+
+@pytest.fixture
+def mirror() -> Iterator[ResourceMirror]:
+    mirror = ResourceMirror(":memory:", BASE_URL, 60.0, ["Observation"])
+    yield mirror
+    mirror.close()
+
+
+def sync(server: ChangeServer, mirror: ResourceMirror, max_entries: int = 100) -> MirrorSync:
+    return MirrorSync(cast(FhirClient, server), mirror, 60.0, 5.0, max_entries)
+
+
+def query(url: str) -> dict[str, str]:
+    return {name: values[0] for name, values in parse_qs(urlsplit(url).query).items()}
+
+
+def held(mirror: ResourceMirror, resource_id: str) -> dict | None:
+    result = mirror.lookup(PRINCIPAL, f"/Observation/{resource_id}")
+    return orjson.loads(result[0]) if result is not None else None
+
+
+@pytest.mark.asyncio
+async def test_history_changes_are_applied_newest_version_first(mirror: ResourceMirror) -> None:
+    mirror.upsert(PRINCIPAL, [observation("o1"), observation("o2")])
+    server = ChangeServer(
+        [
+            [
+                {"resource": observation("o1", 120), "request": {"method": "PUT"}},
+                {"resource": observation("o1", 100), "request": {"method": "PUT"}},
+            ],
+            [{"request": {"method": "DELETE", "url": "Observation/o2"}}],
+        ],
+    )
+
+    await sync(server, mirror).sync_once()
+
+    assert urlsplit(server.urls[0]).path == "/fhir/Observation/_history"
+    assert server.urls[1] == f"{BASE_URL}/page/1"
+    held_o1 = held(mirror, "o1")
+    assert held_o1 is not None
+    assert held_o1["valueQuantity"]["value"] == 120
+    assert held(mirror, "o2") is None
+
+
+@pytest.mark.asyncio
+async def test_next_pass_starts_at_the_high_water_mark_minus_the_overlap(
+    mirror: ResourceMirror,
+) -> None:
+    server = ChangeServer([[]])
+    changes = sync(server, mirror)
+
+    await changes.sync_once()
+    mark = mirror.get_high_water_mark(PRINCIPAL, "Observation")
+    await changes.sync_once()
+
+    assert mark is not None
+    assert time.time() - 60 < mark <= time.time()
+    since = datetime.fromisoformat(query(server.urls[1])["_since"]).timestamp()
+    assert since == pytest.approx(mark - 5.0, abs=1.0)
+    assert changes.stats()["passes"] == 2
+
+
+@pytest.mark.asyncio
+async def test_last_updated_search_is_used_without_history_support(
+    mirror: ResourceMirror,
+) -> None:
+    server = ChangeServer([[]], history=False)
+
+    await sync(server, mirror).sync_once()
+
+    assert urlsplit(server.urls[0]).path == "/fhir/Observation"
+    assert query(server.urls[0])["_lastUpdated"].startswith("ge")
+
+
+@pytest.mark.asyncio
+async def test_too_many_changes_reset_the_type(mirror: ResourceMirror) -> None:
+    mirror.upsert(PRINCIPAL, [observation("o1")])
+    server = ChangeServer([[{"resource": observation(f"o{index}")} for index in range(3)]])
+    changes = sync(server, mirror, max_entries=2)
+
+    await changes.sync_once()
+
+    assert held(mirror, "o1") is None
+    assert changes.resets == 1
+    assert mirror.get_high_water_mark(PRINCIPAL, "Observation") is not None
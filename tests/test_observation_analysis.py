@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from app.services.fhir.observation_analysis import lttb, observation_analysis_service
+
+
+def test_lttb_keeps_threshold_points_with_both_ends() -> None:
+    x = np.arange(100, dtype=np.float64)
+    y = np.sin(x / 5)
+
+    selected = lttb(x, y, 10)
+
+    assert len(selected) == 10
+    assert selected[0] == 0
+    assert selected[-1] == 99
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_keeps_short_series_whole() -> None:
+    x = np.arange(5, dtype=np.float64)
+
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 2])
+def test_lttb_rejects_thresholds_below_three(threshold: int) -> None:
+    x = np.arange(100, dtype=np.float64)
+
+    with pytest.raises(ValueError, match="at least 3"):
+        lttb(x, x, threshold)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_points", [-1, 0, 2])
+async def test_analysis_rejects_max_points_below_three(max_points: int) -> None:
+    # rejected before anything is fetched
+    with pytest.raises(ValueError, match="at least 3"):
+        await observation_analysis_service.analyze("1", "4548-4", max_points=max_points)
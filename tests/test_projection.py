@@ -0,0 +1,98 @@
+import pytest
+
+from app.schemas.fhir_schemas import FhirProjection
+from app.services.fhir.capabilities import ServerCapabilities
+from app.services.fhir.fhir_client import FhirClient
+from app.services.fhir.projection import Projector
+
+OBSERVATION = {
+    "resourceType": "Observation",
+    "id": "o1",
+    "text": {"status": "generated", "div": "<div>narrative</div>"},
+    "status": "final",
+    "code": {"coding": [{"system": "http://loinc.org", "code": "8867-4", "display": "Heart rate"}]},
+    "valueQuantity": {"value": 72, "unit": "/min"},
+    "note": [{"text": "resting"}],
+}
+
+
+def projector(resource_type: str = "Observation", **projection: object) -> Projector:
+    return Projector(FhirProjection.model_validate(projection), resource_type)
+
+
+def client_supporting(*search_params: str) -> FhirClient:
+    client = FhirClient()
+    client._capabilities = ServerCapabilities(
+        {"rest": [{"mode": "server", "searchParam": [{"name": name} for name in search_params]}]},
+    )
+    return client
+
+
+@pytest.mark.parametrize(
+    ("projection", "parameter"),
+    [
+        ({"elements": ["status", "code.coding.code"]}, ("_elements", "id,status,code")),
+        ({"elements": ["status", "value[x]"]}, ("_summary", "data")),
+        ({"elements": ["text", "value[x]"]}, None),
+        ({"preset": "no-narrative"}, ("_summary", "data")),
+        ({}, None),
+    ],
+)
+def test_server_parameter(projection: dict, parameter: tuple[str, str] | None) -> None:
+    assert projector(**projection).server_parameter() == parameter
+
+
+def test_nested_and_choice_elements_are_pruned_locally() -> None:
+    projected = projector(elements=["code.coding.code", "value[x]"]).apply(OBSERVATION)
+
+    assert projected == {
+        "resourceType": "Observation",
+        "id": "o1",
+        "code": {"coding": [{"code": "8867-4"}]},
+        "valueQuantity": {"value": 72, "unit": "/min"},
+    }
+    assert "text" in OBSERVATION  # the input is not modified
+
+
+def test_bundle_entries_are_pruned_by_their_own_type() -> None:
+    patient = {"resourceType": "Patient", "id": "p1", "gender": "female", "photo": [{}]}
+    bundle = {
+        "resourceType": "Bundle",
+        "entry": [{"resource": OBSERVATION}, {"resource": patient}],
+    }
+
+    projected = projector(preset="clinical-minimal").apply(bundle)
+
+    observation, patient = (entry["resource"] for entry in projected["entry"])
+    assert "note" not in observation
+    assert "text" not in observation
+    assert patient == {"resourceType": "Patient", "id": "p1", "gender": "female"}
+
+
+@pytest.mark.asyncio
+async def test_elements_are_pushed_to_a_server_that_supports_them() -> None:
+    client = client_supporting("_elements")
+
+    url, parameter = await client._push_projection(
+        "https://fhir.example.com/Observation?code=8867-4",
+        projector(elements=["status"]),
+    )
+
+    assert parameter == "_elements=id,status"
+    assert url == "https://fhir.example.com/Observation?code=8867-4&_elements=id%2Cstatus"
+
+
+@pytest.mark.asyncio
+async def test_projection_is_applied_locally_only_when_the_server_lacks_support() -> None:
+    client = client_supporting("_summary")
+    url = "https://fhir.example.com/Observation?code=8867-4"
+
+    assert await client._push_projection(url, projector(elements=["status"])) == (url, None)
+
+
+@pytest.mark.asyncio
+async def test_parameter_already_in_the_request_is_kept() -> None:
+    client = client_supporting("_elements", "_summary")
+    url = "https://fhir.example.com/Observation?_summary=true"
+
+    assert await client._push_projection(url, projector(elements=["status"])) == (url, None)
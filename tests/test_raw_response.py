@@ -0,0 +1,38 @@
+import orjson
+import pytest
+
+from app.services.fhir.models import FhirRawResponse
+
+
+def response_of(content: bytes, validated: bool = False) -> dict:
+    raw = FhirRawResponse("GET", "https://fhir.example.com/Patient/1", None, content)
+    raw.validated = validated
+    return orjson.loads(raw.to_json())["response"]
+
+
+def test_json_body_is_spliced_in_as_is() -> None:
+    assert response_of(b' {"resourceType": "Patient", "id": "1"}\n') == {
+        "resourceType": "Patient",
+        "id": "1",
+    }
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"{not json", b"[1, 2", b'{"a": 1} trailing', b"<html>Bad Gateway</html>", b"Bad Gateway"],
+)
+def test_body_that_is_not_json_is_passed_on_as_a_string(content: bytes) -> None:
+    assert response_of(content) == content.decode()
+
+
+def test_empty_body_is_null() -> None:
+    assert response_of(b"  ") is None
+
+
+def test_validated_body_is_not_decoded_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(content: bytes) -> bool:
+        raise AssertionError("validated content was decoded")
+
+    monkeypatch.setattr("app.services.fhir.models._is_json_document", fail)
+
+    assert response_of(b"[1, 2]", validated=True) == [1, 2]
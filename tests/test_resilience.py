@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.mcp.exceptions import APICustomError
+from app.services.fhir.resilience import AdaptiveLimiter, CircuitBreaker, HostGuard
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_half_open_breaker_admits_a_single_probe() -> None:
+    breaker = open_breaker()
+
+    assert breaker.check() is True
+    assert breaker.state == "half_open"
+    with pytest.raises(APICustomError):
+        breaker.check()
+    assert breaker.rejected == 1
+
+
+@pytest.mark.parametrize(
+    ("outcome", "state"),
+    [("record_success", "closed"), ("record_failure", "open")],
+)
+def test_probe_outcome_closes_or_reopens_the_breaker(outcome: str, state: str) -> None:
+    breaker = open_breaker()
+    breaker.check()
+
+    getattr(breaker, outcome)()
+    breaker.end_probe()
+
+    assert breaker.state == state
+
+
+def test_probe_without_outcome_lets_the_next_request_probe() -> None:
+    breaker = open_breaker()
+    breaker.check()
+
+    breaker.end_probe()
+
+    assert breaker.check() is True
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_is_ended_by_the_guard() -> None:
+    guard = HostGuard(
+        AdaptiveLimiter(
+            initial_limit=10,
+            min_limit=1,
+            max_limit=10,
+            max_queue=10,
+            queue_timeout=1.0,
+        ),
+        open_breaker(),
+    )
+
+    async def probe() -> None:
+        async with guard.slot():
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(probe())
+    await asyncio.sleep(0)
+    with pytest.raises(APICustomError):
+        async with guard.slot():
+            pass
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert not guard.breaker.probing
+    assert guard.limiter.in_flight == 0
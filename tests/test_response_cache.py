@@ -0,0 +1,77 @@
+import pytest
+
+from app.services.fhir.cache import CacheEntry, ResponseCache
+from app.services.fhir.utils import parse_resource_path
+
+PRINCIPAL = "principal"
+
+
+@pytest.fixture
+def cache() -> ResponseCache:
+    return ResponseCache(ttl=60.0, max_entries=100, max_bytes=1_000_000)
+
+
+def put(cache: ResponseCache, path: str) -> tuple[str, str]:
+    key = (PRINCIPAL, path)
+    cache.put(key, CacheEntry(b"{}", *parse_resource_path(path)), cache.generation)
+    return key
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/Patient/123", ("Patient", "123")),
+        ("/Condition?patient=123", ("Condition", None)),
+        ("/Patient/123/Observation?code=2339-0", ("Observation", None)),
+        ("/Patient/123/_history/2", ("Patient", "123")),
+        ("/Patient/$match", ("Patient", None)),
+        ("/", (None, None)),
+    ],
+)
+def test_parse_resource_path(path: str, expected: tuple[str | None, str | None]) -> None:
+    assert parse_resource_path(path) == expected
+
+
+def test_write_invalidates_compartment_searches_of_its_type(cache: ResponseCache) -> None:
+    compartment = put(cache, "/Patient/1/Observation")
+    patient = put(cache, "/Patient/1")
+
+    cache.invalidate("Observation", "o1")
+
+    assert cache.get(compartment) is None
+    assert cache.get(patient) is not None
+
+
+def test_write_invalidates_reads_of_the_written_resource_only(cache: ResponseCache) -> None:
+    written = put(cache, "/Observation/o1")
+    other = put(cache, "/Observation/o2")
+    search = put(cache, "/Observation?patient=1")
+
+    cache.invalidate("Observation", "o1")
+
+    assert cache.get(written) is None
+    assert cache.get(search) is None
+    assert cache.get(other) is not None
+
+
+def test_write_invalidates_entries_of_unknown_type(cache: ResponseCache) -> None:
+    everything = (PRINCIPAL, "/Patient/1/$everything")
+    cache.put(everything, CacheEntry(b"{}", None, None), cache.generation)
+
+    cache.invalidate("Condition", "c1")
+
+    assert cache.get(everything) is None
+
+
+def test_fill_started_before_an_invalidation_is_dropped(cache: ResponseCache) -> None:
+    generation = cache.generation
+    cache.invalidate("Observation", "o1")  # a write lands while the GET is in flight
+
+    cache.put(
+        (PRINCIPAL, "/Observation?patient=1"),
+        CacheEntry(b"{}", "Observation", None),
+        generation,
+    )
+
+    assert cache.get((PRINCIPAL, "/Observation?patient=1")) is None
+    assert cache.stats()["stale_fills"] == 1
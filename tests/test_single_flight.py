@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.services.fhir.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_with_the_same_key_share_one_execution() -> None:
+    flight = SingleFlight()
+    executions = 0
+    release = asyncio.Event()
+
+    async def fetch() -> str:
+        nonlocal executions
+        executions += 1
+        await release.wait()
+        return "body"
+
+    waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["body"] * 5
+    assert executions == 1
+    assert flight.stats() == {"calls": 1, "collapsed": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately() -> None:
+    flight = SingleFlight()
+
+    async def fetch(value: str) -> str:
+        await asyncio.sleep(0)
+        return value
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: fetch("a")),
+        flight.do("b", lambda: fetch("b")),
+    )
+
+    assert results == ["a", "b"]
+    assert flight.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_an_error_reaches_every_waiter_and_is_not_kept() -> None:
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail() -> str:
+        await release.wait()
+        raise ValueError("upstream failed")
+
+    waiters = [asyncio.create_task(flight.do("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def succeed() -> str:
+        return "body"
+
+    # the failed call is forgotten, so the next caller starts a new one
+    assert await flight.do("key", succeed) == "body"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_call_for_the_others() -> None:
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch() -> str:
+        await release.wait()
+        return "body"
+
+    cancelled = asyncio.create_task(flight.do("key", fetch))
+    other = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await other == "body"
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_call_finishes_even_if_every_waiter_is_cancelled() -> None:
+    flight = SingleFlight()
+    release = asyncio.Event()
+    finished = asyncio.Event()
+
+    async def fetch() -> str:
+        await release.wait()
+        finished.set()
+        raise ValueError("nobody is waiting")
+
+    waiter = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    await finished.wait()
+    await asyncio.sleep(0)
+
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,154 @@
+from collections.abc import Iterator
+from typing import cast
+
+import orjson
+import pytest
+
+from app.services.fhir.fhir_client import FhirClient
+from app.services.fhir.mirror import ResourceMirror
+from app.services.fhir.subscriptions import SubscriptionManager
+
+BASE_URL = "https://fhir.example.com/fhir"
+PRINCIPAL = "principal"
+
+
+def observation(resource_id: str, value: int = 90) -> dict:
+    return {
+        "resourceType": "Observation",
+        "id": resource_id,
+        "status": "final",
+        "subject": {"reference": "Patient/1"},
+        "valueQuantity": {"value": value, "unit": "mg/dL"},
+    }
+
+
+class RecordingCache:
+    def __init__(self) -> None:
+        self.invalidated: list[tuple[str | None, str | None]] = []
+
+    def invalidate(self, resource_type: str | None, resource_id: str | None = None) -> None:
+        self.invalidated.append((resource_type, resource_id))
+
+
+class NotifiedClient:
+    base_url = BASE_URL
+
+    def __init__(self, mirror: ResourceMirror):
+        self.cache = RecordingCache()
+        self.mirror = mirror
+
+    async def principal(self) -> str:
+        return PRINCIPAL
+
+
+@pytest.fixture
+def mirror() -> Iterator[ResourceMirror]:
+    mirror = ResourceMirror(":memory:", BASE_URL, 60.0, ["Observation"])
+    mirror.upsert(PRINCIPAL, [observation("o1"), observation("o2")])
+    yield mirror
+    mirror.close()
+
+
+@pytest.fixture
+def client(mirror: ResourceMirror) -> NotifiedClient:
+    return NotifiedClient(mirror)
+
+
+@pytest.fixture
+def subscriptions(client: NotifiedClient) -> SubscriptionManager:
+    return SubscriptionManager(
+        cast(FhirClient, client),
+        "https://mcp.example.com/notifications",
+        ["Observation"],
+    )
+
+
+def held(mirror: ResourceMirror, resource_id: str) -> dict | None:
+    result = mirror.lookup(PRINCIPAL, f"/Observation/{resource_id}")
+    return orjson.loads(result[0]) if result is not None else None
+
+
+def test_only_notifications_with_our_secret_are_authorized(
+    subscriptions: SubscriptionManager,
+) -> None:
+    assert subscriptions.is_authorized(f"Bearer {subscriptions.secret}")
+    assert not subscriptions.is_authorized("Bearer guessed")
+    assert not subscriptions.is_authorized(None)
+    assert subscriptions.stats()["rejected"] == 2
+
+
+def test_notifications_for_other_processes_are_not_ours(
+    subscriptions: SubscriptionManager,
+) -> None:
+    assert subscriptions.is_subscriber(f"{subscriptions.instance_id}/Observation")
+    assert not subscriptions.is_subscriber("other-instance/Observation")
+
+
+@pytest.mark.asyncio
+async def test_resource_put_by_an_r4_server_updates_the_mirror(
+    subscriptions: SubscriptionManager,
+    client: NotifiedClient,
+    mirror: ResourceMirror,
+) -> None:
+    path = f"{subscriptions.instance_id}/Observation/Observation/o1"
+
+    changes = await subscriptions.handle(path, orjson.dumps(observation("o1", 120)))
+
+    assert changes == 1
+    assert client.cache.invalidated == [("Observation", "o1")]
+    held_o1 = held(mirror, "o1")
+    assert held_o1 is not None
+    assert held_o1["valueQuantity"]["value"] == 120
+
+
+@pytest.mark.asyncio
+async def test_notification_bundle_applies_the_newest_version_and_deletions(
+    subscriptions: SubscriptionManager,
+    mirror: ResourceMirror,
+) -> None:
+    notification = {
+        "resourceType": "Bundle",
+        "entry": [
+            {"resource": {"resourceType": "SubscriptionStatus", "id": "status"}},
+            {"resource": observation("o1", 120), "request": {"method": "PUT"}},
+            {"resource": observation("o1", 100), "request": {"method": "PUT"}},
+            {"request": {"method": "DELETE", "url": "Observation/o2"}},
+        ],
+    }
+
+    changes = await subscriptions.handle(
+        f"{subscriptions.instance_id}/Observation",
+        orjson.dumps(notification),
+    )
+
+    assert changes == 2
+    held_o1 = held(mirror, "o1")
+    assert held_o1 is not None
+    assert held_o1["valueQuantity"]["value"] == 120
+    assert held(mirror, "o2") is None
+
+
+@pytest.mark.asyncio
+async def test_ping_drops_the_searches_of_the_whole_type(
+    subscriptions: SubscriptionManager,
+    client: NotifiedClient,
+    mirror: ResourceMirror,
+) -> None:
+    search = "/Observation?patient=1"
+    bundle = {"resourceType": "Bundle", "entry": [{"resource": observation("o1")}]}
+    mirror.record(PRINCIPAL, search, bundle, True, mirror.generation("Observation"))
+    assert mirror.lookup(PRINCIPAL, search) is not None
+
+    assert await subscriptions.handle(f"{subscriptions.instance_id}/Observation", b"") == 0
+    await mirror.run(lambda: None)  # let the queued mirror invalidation run
+
+    assert client.cache.invalidated == [("Observation", None)]
+    assert mirror.lookup(PRINCIPAL, search) is None
+
+
+@pytest.mark.asyncio
+async def test_body_that_is_not_a_resource_is_rejected(
+    subscriptions: SubscriptionManager,
+) -> None:
+    with pytest.raises(ValueError, match="not a FHIR resource"):
+        await subscriptions.handle(f"{subscriptions.instance_id}/Observation", b"[]")
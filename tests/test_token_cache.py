@@ -0,0 +1,81 @@
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from cryptography.fernet import Fernet
+
+from app.services.fhir.models import Token
+from app.services.fhir.token_cache import TokenCache
+from app.utils.config_utils import FernetDecryptorField
+
+KEY = TokenCache.key("https://auth.example.com", "client")
+
+
+def cache(path: Path, monkeypatch: pytest.MonkeyPatch, master_key: bytes) -> TokenCache:
+    monkeypatch.setenv("TOKEN_CACHE_TEST_KEY", master_key.decode())
+    return TokenCache(path, FernetDecryptorField("TOKEN_CACHE_TEST_KEY"), lock_timeout=1.0)
+
+
+@pytest.fixture
+def master_key() -> bytes:
+    return Fernet.generate_key()
+
+
+def token(expires_in: float, access_token: str = "access") -> Token:
+    return Token(access_token, datetime.now(UTC) + timedelta(seconds=expires_in))
+
+
+def test_stored_token_is_loaded_back(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    master_key: bytes,
+) -> None:
+    path = tmp_path / "tokens"
+    stored = token(3600)
+    cache(path, monkeypatch, master_key).store(KEY, stored)
+
+    loaded = cache(path, monkeypatch, master_key).load(KEY)
+
+    assert loaded is not None
+    assert (loaded.access_token, loaded.expires_at) == (stored.access_token, stored.expires_at)
+    assert b"access" not in path.read_bytes()  # encrypted at rest
+    assert cache(path, monkeypatch, master_key).load(TokenCache.key("other", "client")) is None
+
+
+def test_file_encrypted_with_another_key_is_a_miss(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    master_key: bytes,
+) -> None:
+    path = tmp_path / "tokens"
+    cache(path, monkeypatch, master_key).store(KEY, token(3600))
+
+    assert cache(path, monkeypatch, Fernet.generate_key()).load(KEY) is None
+
+
+def test_corrupt_file_is_a_miss_and_gets_replaced(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    master_key: bytes,
+) -> None:
+    path = tmp_path / "tokens"
+    path.write_bytes(b"not a fernet token")
+    tokens = cache(path, monkeypatch, master_key)
+
+    assert tokens.load(KEY) is None
+    tokens.store(KEY, token(3600))
+    assert tokens.load(KEY) is not None
+
+
+def test_expired_tokens_are_not_loaded_and_dropped_on_store(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    master_key: bytes,
+) -> None:
+    tokens = cache(tmp_path / "tokens", monkeypatch, master_key)
+    other = TokenCache.key("https://auth.example.com", "other")
+    tokens.store(KEY, token(-1))
+    tokens.store(other, token(3600))
+
+    assert tokens.load(KEY) is None
+    assert tokens._read().keys() == {other}
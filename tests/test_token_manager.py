@@ -0,0 +1,176 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
+import pytest
+
+from app.services.fhir.models import AuthMethod, Token
+from app.services.fhir.oauth_client import OAuthClient
+from app.services.fhir.token_manager import AccessTokenManager
+
+
+class FakeOAuthClient:
+    """Token endpoint answering from a script, recording the grants it was asked for."""
+
+    def __init__(self, expires_in: int = 3600, refresh_token: str | None = None):
+        self.expires_in = expires_in
+        self.refresh_token = refresh_token
+        self.grants: list[tuple[str, str | None]] = []
+        self.fail = False
+        self.delay = 0.0
+
+    async def _respond(self, grant: str, credential: str | None) -> dict:
+        self.grants.append((grant, credential))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("token endpoint down")
+        data: dict = {"access_token": f"token-{len(self.grants)}", "expires_in": self.expires_in}
+        if self.refresh_token is not None:
+            data["refresh_token"] = self.refresh_token
+        return data
+
+    async def exchange_client_credentials(self, client_id: str, client_secret: str) -> dict:
+        return await self._respond("client_credentials", None)
+
+    async def exchange_authorization_code(
+        self,
+        client_id: str,
+        code: str | None,
+        redirect_uri: str | None,
+    ) -> dict:
+        if not code:
+            raise ValueError("Authorization code is required.")
+        return await self._respond("authorization_code", code)
+
+    async def exchange_refresh_token(self, client_id: str, refresh_token: str) -> dict:
+        return await self._respond("refresh_token", refresh_token)
+
+
+def manager(
+    oauth: FakeOAuthClient,
+    auth_method: AuthMethod = AuthMethod.CLIENT_CREDENTIALS,
+) -> AccessTokenManager:
+    return AccessTokenManager(
+        "client",
+        "secret",
+        "https://auth.example.com",
+        auth_method=auth_method,
+        redirect_uri="https://mcp.example.com/oauth/callback",
+        oauth_client=cast(OAuthClient, oauth),
+    )
+
+
+def expiring_in(seconds: float) -> datetime:
+    return datetime.now(UTC) + timedelta(seconds=seconds)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_token_request() -> None:
+    oauth = FakeOAuthClient()
+    oauth.delay = 0.01
+    tokens = manager(oauth)
+
+    results = await asyncio.gather(*(tokens.get_token() for _ in range(10)))
+
+    assert results == ["token-1"] * 10
+    assert len(oauth.grants) == 1
+    assert tokens.blocked_calls == 10
+    tokens.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_scheduled_when_the_token_enters_its_refresh_window() -> None:
+    oauth = FakeOAuthClient(expires_in=3600)
+    tokens = manager(oauth)
+    await tokens.get_token()
+
+    timer = tokens._refresh_timer
+    assert timer is not None
+    # expiry is cut by a 5 minute buffer, and refreshing starts 5 minutes before that
+    delay = timer.when() - asyncio.get_running_loop().time()
+    assert 3600 - 600 - 5 < delay <= 3600 - 600
+    tokens.close()
+
+
+@pytest.mark.asyncio
+async def test_token_in_its_refresh_window_is_served_while_refreshed_in_the_background() -> None:
+    oauth = FakeOAuthClient()
+    tokens = manager(oauth)
+    tokens.token = Token("old", expiring_in(60))
+
+    assert await tokens.get_token() == "old"
+    assert tokens._refresh_task is not None
+    await tokens._refresh_task
+
+    assert await tokens.get_token() == "token-1"
+    assert tokens.background_refreshes == 1
+    assert tokens.blocked_calls == 0
+    tokens.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_keeps_the_current_token() -> None:
+    oauth = FakeOAuthClient()
+    oauth.fail = True
+    tokens = manager(oauth)
+    tokens.token = Token("old", expiring_in(60))
+
+    assert await tokens.get_token() == "old"
+    assert tokens._refresh_task is not None
+    await tokens._refresh_task
+
+    assert await tokens.get_token() == "old"
+    assert tokens.refresh_failures == 1
+    assert tokens.last_refresh_error == "ValueError: token endpoint down"
+    # no new attempt before the minimum interval has passed
+    tokens._start_background_refresh()
+    assert tokens._refresh_task.done()
+    assert len(oauth.grants) == 1
+    tokens.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_without_a_token_raises() -> None:
+    oauth = FakeOAuthClient()
+    oauth.fail = True
+    tokens = manager(oauth)
+
+    with pytest.raises(ValueError, match="token endpoint down"):
+        await tokens.get_token()
+    assert tokens.refresh_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_authorization_code_is_redeemed_once_then_the_refresh_token_is_used() -> None:
+    oauth = FakeOAuthClient(refresh_token="refresh")
+    tokens = manager(oauth, AuthMethod.AUTHORIZATION_CODE)
+    tokens.set_authorization_code("code")
+
+    await tokens.get_token()
+    tokens.token.expires_at = expiring_in(60)
+    tokens._not_before = 0.0  # past the minimum interval between refreshes
+    await tokens.get_token()
+    assert tokens._refresh_task is not None
+    await tokens._refresh_task
+
+    assert oauth.grants == [("authorization_code", "code"), ("refresh_token", "refresh")]
+    assert tokens.authorization_code is None
+    assert tokens.refresh_failures == 0
+    tokens.close()
+
+
+@pytest.mark.asyncio
+async def test_authorization_code_token_without_refresh_token_is_not_refreshed() -> None:
+    oauth = FakeOAuthClient()
+    tokens = manager(oauth, AuthMethod.AUTHORIZATION_CODE)
+    tokens.set_authorization_code("code")
+
+    await tokens.get_token()
+    assert tokens._refresh_timer is None
+    tokens.token.expires_at = expiring_in(60)
+    tokens._not_before = 0.0
+    await tokens.get_token()
+
+    assert tokens._refresh_task is None
+    assert oauth.grants == [("authorization_code", "code")]
+    assert tokens.refresh_failures == 0
@@ -0,0 +1,116 @@
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from app.services.fhir.fhir_client import FhirClient
+from app.services.fhir.models import AuthMethod, Token
+from app.services.fhir.token_manager import AccessTokenManager
+from app.services.fhir.token_pool import TokenManagerPool, current_session
+
+
+def create_manager() -> AccessTokenManager:
+    return AccessTokenManager(
+        "client",
+        "secret",
+        "https://auth.example.com",
+        auth_method=AuthMethod.AUTHORIZATION_CODE,
+        redirect_uri="https://mcp.example.com/oauth/callback",
+    )
+
+
+def pool(max_size: int = 10, idle_timeout: float = 60.0) -> TokenManagerPool:
+    return TokenManagerPool(create_manager, max_size=max_size, idle_timeout=idle_timeout)
+
+
+@pytest.fixture
+def client() -> Iterator[FhirClient]:
+    client = FhirClient()
+    client.auth_method = AuthMethod.AUTHORIZATION_CODE
+    yield client
+    client.token_managers.clear()
+
+
+def test_sessions_get_their_own_manager() -> None:
+    managers = pool()
+
+    managers.get("a").set_authorization_code("code-a")
+    managers.get("b").set_authorization_code("code-b")
+
+    assert managers.get("a") is not managers.get("b")
+    assert managers.get("a").authorization_code == "code-a"
+    assert managers.get("b").authorization_code == "code-b"
+
+
+def test_evicted_session_keeps_its_unredeemed_code() -> None:
+    managers = pool(max_size=1)
+    evicted = managers.get("a")
+    evicted.set_authorization_code("code-a")
+
+    managers.get("b")  # evicts "a", the least recently used
+
+    restored = managers.get("a")
+    assert restored is not evicted
+    assert restored.authorization_code == "code-a"
+    assert managers.stats()["restored"] == 1
+
+
+def test_idle_session_keeps_its_token() -> None:
+    managers = pool(idle_timeout=0.0)
+    token = Token("access", datetime.now(UTC) + timedelta(hours=1), "refresh")
+    managers.get("a").token = token
+
+    managers.get("b")  # "a" has been idle for longer than the timeout
+
+    assert managers.stats()["evicted_idle"] == 1
+    assert managers.get("a").token is token
+
+
+def test_evicted_session_without_usable_credentials_is_forgotten() -> None:
+    managers = pool(max_size=1)
+    managers.get("a").token = Token("access", datetime.now(UTC) - timedelta(minutes=1))
+
+    managers.get("b")
+
+    assert managers.get("a").token.access_token is None
+    assert managers.stats()["restored"] == 0
+
+
+def test_authorization_code_goes_to_the_session_that_requested_the_url(
+    client: FhirClient,
+) -> None:
+    session = current_session.set("a")
+    try:
+        url = client.get_authorization_url()
+    finally:
+        current_session.reset(session)
+    state = url.rsplit("state=", 1)[1]
+
+    client.set_authorization_code("code-a", state)  # e.g. the OAuth callback route
+
+    assert client.token_managers.get("a").authorization_code == "code-a"
+    assert client.token_managers.get(None).authorization_code is None
+    with pytest.raises(ValueError, match="Unknown or expired"):
+        client.set_authorization_code("code-a", state)  # the state is single-use
+
+
+def test_authorization_code_of_a_session_is_not_seen_by_others(client: FhirClient) -> None:
+    for session_id in ("a", "b"):
+        session = current_session.set(session_id)
+        try:
+            client.set_authorization_code(f"code-{session_id}")
+        finally:
+            current_session.reset(session)
+
+    assert client.token_managers.get("a").authorization_code == "code-a"
+    assert client.token_managers.get("b").authorization_code == "code-b"
+
+
+def test_authorization_code_needs_a_session_over_http(
+    client: FhirClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("app.services.fhir.fhir_client.settings.TRANSPORT_MODE", "http")
+
+    with pytest.raises(ValueError, match="only be set for an MCP session"):
+        client.set_authorization_code("code")